@@ -0,0 +1,227 @@
+"""
+Serveur unique LSTM + CamemBERT
+
+Un seul processus héberge les classifieurs du registre (SERVED_MODELS) avec un seul
+MetricsEngine, un seul runtime TensorFlow / ONNX Runtime et un seul cache de prédictions.
+Le modèle est choisi par requête :
+- champ "model" du body de POST /predict-category (DEFAULT_MODEL si absent)
+- ou chemin POST /predict-category/{model}
+- "cascade" : réponse du LSTM si sa confiance atteint CASCADE_THRESHOLD, sinon CamemBERT.
+  Le LSTM, bien moins coûteux, répond seul à la majorité des titres.
+
+Les forward passes tournent sur un InferenceExecutor borné (INFERENCE_WORKERS, INFERENCE_MAX_QUEUE) :
+file pleine -> 429 + Retry-After, profondeur de file sur GET /inference-queue.
+
+Instrumentation (instrumentation.py) : durées par étape, thématiques prédites, file d'inférence et
+temps de chargement sur GET /metrics (format texte Prometheus). Journalisation par le module
+logging, niveau LOG_LEVEL (INFO par défaut, DEBUG pour le détail de chaque requête).
+Profilage à la demande (profiler.py) : POST /admin/profile, protégé par ADMIN_TOKEN.
+
+api_lstm.py et api_camembert.py sont des raccourcis vers create_app() avec un seul modèle.
+L'import du module ne construit aucune application : create_app() est la fabrique.
+
+Utilisation (depuis /app) : python api.py
+                         ou uvicorn api:create_app --factory
+"""
+
+from lazy_loading import BackgroundLoader, add_health_routes, loading_lifespan
+import logging
+import os
+import time
+import uvicorn
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from inference_executor import InferenceExecutor, add_backpressure_routes
+from instrumentation import REQUEST_SECONDS, STAGE_SECONDS, add_metrics_route, record_predictions
+from metrics_engine import MetricsEngine
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache
+from profiler import SamplingProfiler, add_profiler_routes
+from schemas import BatchPredictRequest, BatchPredictResponse, PredictRequest, PredictResponse
+
+SERVED_MODELS = os.environ.get("SERVED_MODELS", "camembert,lstm").split(",")
+# Modèle utilisé quand la requête n'en précise pas (par défaut le premier de SERVED_MODELS)
+DEFAULT_MODEL = os.environ.get("DEFAULT_MODEL")
+CASCADE = "cascade"
+CASCADE_THRESHOLD = float(os.environ.get("CASCADE_THRESHOLD", "0.9"))
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+logger = logging.getLogger(__name__)
+
+
+def configure_logging():
+    # Sans effet si le processus a déjà configuré ses handlers
+    logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s : %(message)s")
+
+
+def load_metrics_engine():
+    # Lecture unique du dataset et précalcul des metrics par thématique
+    metrics_engine = MetricsEngine()
+    # Rechargement à chaud quand l'export open data est rafraîchi (METRICS_RELOAD_INTERVAL)
+    metrics_engine.startWatching()
+    return metrics_engine
+
+
+def create_app(models=None, default_model=None, cascade_threshold=CASCADE_THRESHOLD, executor=None, metrics_engine=None):
+    """
+    Application FastAPI servant les modèles demandés (noms du registre).
+    metrics_engine : moteur déjà construit par un processus parent (serve_multiprocess.py), qui
+    en assure aussi le rechargement ; sinon le dataset est chargé en arrière-plan au démarrage
+    et surveillé par ce processus.
+    """
+    configure_logging()
+    models = models or SERVED_MODELS
+    default_model = default_model or DEFAULT_MODEL or models[0]
+    # Un seul pool d'inférence pour tous les modèles : le CPU est partagé, pas sursouscrit
+    executor = executor or InferenceExecutor()
+    registry = ModelRegistry(models, executor)
+    cascade_available = "lstm" in registry and "camembert" in registry
+    if default_model not in registry and not (default_model == CASCADE and cascade_available):
+        raise ValueError(f"Modèle par défaut non servi : {default_model}")
+
+    # Chargement en arrière-plan : le serveur écoute tout de suite, /readyz indique quand il peut prédire
+    if metrics_engine is None:
+        metrics_loader = BackgroundLoader("metrics", load_metrics_engine)
+    else:
+        def load_inherited_metrics_engine():
+            # Snapshot hérité du parent, rechargé par le parent (pas de copie privée par processus)
+            return metrics_engine
+
+        metrics_loader = BackgroundLoader("metrics", load_inherited_metrics_engine)
+    loaders = [*registry.loaders.values(), metrics_loader]
+    owns_metrics_engine = metrics_engine is None
+
+    @asynccontextmanager
+    async def lifespan(app):
+        async with loading_lifespan(*loaders)(app):
+            yield
+        # Arrêt : fin de la surveillance du CSV (un moteur fourni par l'appelant reste à sa charge)
+        if owns_metrics_engine and metrics_loader.ready:
+            metrics_loader.value.stopWatching()
+
+    app = FastAPI(lifespan=lifespan)
+    # Chargements de l'application, attendus par serve_multiprocess.py avant d'ouvrir un worker relancé
+    app.state.loaders = loaders
+    # Configuration CORS pour permettre les requêtes du frontend
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Autorise toutes les origines en développement
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    add_health_routes(app, *loaders)
+    add_backpressure_routes(app, executor)
+    add_metrics_route(app, executor, loaders)
+    # Capture arrêtée après N requêtes de prédiction : chaque route le signale (sans effet hors capture)
+    profiler = SamplingProfiler()
+    add_profiler_routes(app, profiler)
+    # Probabilités déjà calculées, par modèle et titre normalisé (partagé par tous les modèles)
+    prediction_cache = PredictionCache()
+
+    def check_model(model_name):
+        if model_name == CASCADE and not cascade_available:
+            raise HTTPException(status_code=404, detail="La cascade nécessite les modèles lstm et camembert")
+        if model_name != CASCADE:
+            registry.get(model_name)
+
+    async def predict(model_name, title):
+        if model_name != CASCADE:
+            return await registry.get(model_name).predict(prediction_cache, title)
+        # Cascade : CamemBERT seulement quand le LSTM hésite
+        prediction = await registry.get("lstm").predict(prediction_cache, title)
+        if prediction.confidence >= cascade_threshold:
+            return prediction
+        return await registry.get("camembert").predict(prediction_cache, title)
+
+    def predict_batch(model_name, titles):
+        if model_name != CASCADE:
+            return registry.get(model_name).predict_batch(prediction_cache, titles)
+        predictions = registry.get("lstm").predict_batch(prediction_cache, titles)
+        escalated = [i for i, prediction in enumerate(predictions) if prediction.confidence < cascade_threshold]
+        if escalated:
+            camembert_model = registry.get("camembert")
+            for i, prediction in zip(escalated, camembert_model.predict_batch(prediction_cache, [titles[i] for i in escalated])):
+                predictions[i] = prediction
+        return predictions
+
+    async def predict_category(model_name, request):
+        # 503 immédiat tant que le modèle ou les metrics ne sont pas chargés
+        check_model(model_name)
+        metrics_engine = metrics_loader.get()
+        start = time.perf_counter()
+        # 429 immédiat si la file d'inférence est pleine
+        with executor.admit():
+            prediction_info = await predict(model_name, request.projectTitle)
+        record_predictions(model_name, [prediction_info])
+        with STAGE_SECONDS.time(model=model_name, stage="metrics"):
+            metrics_data = metrics_engine.getMetricsByCategory(prediction_info, request.projectTitle, request.estimatedBudget)
+        with STAGE_SECONDS.time(model=model_name, stage="validation"):
+            response = PredictResponse(**metrics_data)
+        REQUEST_SECONDS.observe(time.perf_counter() - start, model=model_name)
+        profiler.request_done()
+        logger.debug("%s : %r -> %s (%.2f)", model_name, request.projectTitle, prediction_info.name, prediction_info.confidence)
+        return response
+
+    async def predict_category_batch(model_name, request):
+        check_model(model_name)
+        metrics_engine = metrics_loader.get()
+        start = time.perf_counter()
+        with executor.admit():
+            # Prédictions et metrics du batch entièrement exécutées sur le pool d'inférence
+            response = await executor.run(batch_response, model_name, metrics_engine, request)
+        REQUEST_SECONDS.observe(time.perf_counter() - start, model=model_name)
+        profiler.request_done()
+        return response
+
+    def batch_response(model_name, metrics_engine, request):
+        titles = [item.projectTitle for item in request.items]
+        budgets = [item.estimatedBudget for item in request.items]
+        prediction_infos = predict_batch(model_name, titles)
+        record_predictions(model_name, prediction_infos)
+        # Metrics partagées calculées une seule fois par thématique du batch
+        with STAGE_SECONDS.time(model=model_name, stage="metrics"):
+            responses = metrics_engine.getMetricsForBatch(prediction_infos, titles, budgets)
+        with STAGE_SECONDS.time(model=model_name, stage="validation"):
+            return BatchPredictResponse(predictions=[response["predictedCategory"] for response in responses])
+
+    @app.get("/")
+    def read_main_stats():
+        return {"Hello": "World"}
+
+    @app.get("/models")
+    def list_models():
+        return {
+            "models": registry.status(),
+            "default": default_model,
+            "cascade": {"available": cascade_available, "threshold": cascade_threshold}
+        }
+
+    # Les routes /batch sont déclarées avant /{model} pour ne pas être capturées par le paramètre
+    @app.post("/predict-category/batch", response_model=BatchPredictResponse)
+    async def predict_category_batch_default(request: BatchPredictRequest) -> BatchPredictResponse:
+        return await predict_category_batch(request.model or default_model, request)
+
+    @app.post("/predict-category/{model_name}/batch", response_model=BatchPredictResponse)
+    async def predict_category_batch_model(model_name: str, request: BatchPredictRequest) -> BatchPredictResponse:
+        return await predict_category_batch(model_name, request)
+
+    @app.post("/predict-category", response_model=PredictResponse)
+    async def predict_category_default(request: PredictRequest) -> PredictResponse:
+        return await predict_category(request.model or default_model, request)
+
+    @app.post("/predict-category/{model_name}", response_model=PredictResponse)
+    async def predict_category_model(model_name: str, request: PredictRequest) -> PredictResponse:
+        return await predict_category(model_name, request)
+
+    @app.get("/prediction-cache")
+    def prediction_cache_stats():
+        return prediction_cache.stats()
+
+    return app
+
+
+if __name__ == "__main__":
+    uvicorn.run(create_app(), host="127.0.0.1", port=8000)
@@ -0,0 +1,8 @@
+import uvicorn
+from api import create_app
+
+# Serveur TF-IDF seul (équivalent à SERVED_MODELS=tfidf python api.py) : ni TensorFlow ni ONNX Runtime
+app = create_app(models=["tfidf"], default_model="tfidf")
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=8000)
@@ -0,0 +1,138 @@
+# Backends d'inférence interchangeables
+#
+# Les predictors (LSTM, CamemBERT) ne manipulent que des tableaux NumPy : ils délèguent le
+# forward pass à un backend choisi au démarrage via la variable INFERENCE_BACKEND :
+#   - "tf"   : modèle Keras chargé depuis le .h5 (comportement historique)
+#   - "onnx" : artefact .onnx exporté par export_onnx.py et exécuté par ONNX Runtime,
+#              sans importer TensorFlow (démarrage plus rapide, mémoire bien plus faible)
+# Le modèle TF-IDF (tfidf_features.py) a toujours son propre backend NumPy, LinearBackend.
+
+import logging
+import os
+import numpy as np
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "tf")
+# Parallélisme : INFERENCE_WORKERS forward passes simultanés (inference_executor.py), chacun sur
+# INTRA_OP_THREADS threads, pour que workers x threads ne dépasse pas le nombre de coeurs
+CPU_COUNT = os.cpu_count() or 1
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", str(min(4, CPU_COUNT))))
+INTRA_OP_THREADS = int(os.environ.get("INTRA_OP_THREADS", str(max(1, CPU_COUNT // INFERENCE_WORKERS))))
+INTER_OP_THREADS = int(os.environ.get("INTER_OP_THREADS", "1"))
+# Threads du tokenizer rapide (pool Rust, lu à son premier encodage) : même budget que le forward pass
+os.environ.setdefault("RAYON_NUM_THREADS", str(INTRA_OP_THREADS))
+# Threads intra-op d'ONNX Runtime (prioritaire sur INTRA_OP_THREADS si > 0)
+ONNX_INTRA_OP_THREADS = int(os.environ.get("ONNX_INTRA_OP_THREADS", "0"))
+# Poids ONNX partagés entre processus (serve_multiprocess.py) : les initializers sont lus dans un
+# fichier externe mappé en mémoire par ONNX Runtime, donc une seule copie dans le page cache pour
+# tous les workers. Le prepacking des MatMul (qui recopie les poids) est désactivé dans ce mode.
+ONNX_SHARED_WEIGHTS = os.environ.get("ONNX_SHARED_WEIGHTS", "0") == "1"
+
+
+def configure_tensorflow_threads():
+    """Fixe les pools de threads TensorFlow ; à appeler avant la première opération TF"""
+    import tensorflow as tf
+
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(INTRA_OP_THREADS)
+        tf.config.threading.set_inter_op_parallelism_threads(INTER_OP_THREADS)
+    except RuntimeError:
+        # Runtime déjà initialisé (autre modèle TF chargé avant) : les réglages sont déjà en place
+        pass
+
+
+class TensorFlowBackend:
+    """Forward pass d'un modèle Keras, avec un graphe tracé par forme d'entrée (hors dimension batch)"""
+
+    name = "tf"
+
+    def __init__(self, keras_model):
+        self.model = keras_model
+        self._graphs = {}
+
+    def _graph(self, inputs):
+        import tensorflow as tf
+
+        key = tuple((x.shape[1:], x.dtype.str) for x in inputs)
+        if key not in self._graphs:
+            signature = [tf.TensorSpec((None,) + tuple(x.shape[1:]), tf.as_dtype(x.dtype)) for x in inputs]
+            model = self.model
+            if len(inputs) == 1:
+                self._graphs[key] = tf.function(lambda x: model(x, training=False), input_signature=signature)
+            else:
+                self._graphs[key] = tf.function(lambda *xs: model(list(xs), training=False), input_signature=signature)
+        return self._graphs[key]
+
+    def run(self, inputs):
+        """inputs : liste de tableaux NumPy dans l'ordre des entrées du modèle -> probabilités (batch, classes)"""
+        return self._graph(inputs)(*inputs).numpy()
+
+
+def shared_weights_path(onnx_path):
+    """Copie du modèle avec poids externes (.shared.onnx + .shared.weights), régénérée si le modèle a changé"""
+    onnx_path = Path(onnx_path)
+    shared_path = onnx_path.with_suffix(".shared.onnx")
+    weights_path = onnx_path.with_suffix(".shared.weights")
+    if not shared_path.exists() or shared_path.stat().st_mtime_ns < onnx_path.stat().st_mtime_ns:
+        import onnx
+
+        model = onnx.load(str(onnx_path))
+        if weights_path.exists():
+            weights_path.unlink()
+        onnx.save_model(
+            model,
+            str(shared_path),
+            save_as_external_data=True,
+            all_tensors_to_one_file=True,
+            location=weights_path.name,
+            size_threshold=1024
+        )
+        logger.info("✅ Poids externes pour le partage mémoire : %s", weights_path)
+    return shared_path, weights_path
+
+
+class OnnxRuntimeBackend:
+    """Forward pass d'un artefact ONNX avec ONNX Runtime (CPU)"""
+
+    name = "onnx"
+
+    def __init__(self, onnx_path, shared_weights=ONNX_SHARED_WEIGHTS):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if shared_weights:
+            # Fichier préparé par le processus parent : ici il ne fait qu'être relu
+            onnx_path, _ = shared_weights_path(onnx_path)
+            options.add_session_config_entry("session.disable_prepacking", "1")
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = ONNX_INTRA_OP_THREADS if ONNX_INTRA_OP_THREADS > 0 else INTRA_OP_THREADS
+        options.inter_op_num_threads = INTER_OP_THREADS
+        self.session = ort.InferenceSession(str(onnx_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def run(self, inputs):
+        """inputs : liste de tableaux NumPy dans l'ordre des entrées du modèle -> probabilités (batch, classes)"""
+        feed = {name: np.ascontiguousarray(x) for name, x in zip(self.input_names, inputs)}
+        return self.session.run(None, feed)[0]
+
+
+class LinearBackend:
+    """Classifieur linéaire sur une matrice creuse CSR : softmax(X·W + b), NumPy seul"""
+
+    name = "linear"
+
+    def __init__(self, weights, bias):
+        self.weights = np.ascontiguousarray(weights, dtype=np.float32)  # (num_features, num_classes)
+        self.bias = np.asarray(bias, dtype=np.float32)
+
+    def run(self, inputs):
+        """inputs : [indptr, indices, data] d'une matrice CSR (batch, num_features) -> probabilités (batch, classes)"""
+        indptr, indices, data = inputs
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        logits = np.tile(self.bias, (len(indptr) - 1, 1))
+        np.add.at(logits, rows, self.weights[indices] * data[:, None])
+        logits -= logits.max(axis=1, keepdims=True)
+        probas = np.exp(logits)
+        return probas / probas.sum(axis=1, keepdims=True)
@@ -0,0 +1,69 @@
+# Regroupement des requêtes concurrentes en micro-batchs
+#
+# Chaque requête HTTP dépose son titre dans une file asyncio et attend son résultat.
+# Une tâche de fond vide la file : elle attend au plus `max_wait_ms` après le premier
+# titre (ou jusqu'à `max_batch_size` titres), lance UN forward pass sur le batch
+# complet dans un thread, puis redistribue chaque ligne de probabilités à sa requête.
+
+import asyncio
+import time
+from typing import Callable, Sequence
+
+
+class MicroBatcher:
+    """File d'attente qui transforme N appels unitaires en un appel batché"""
+
+    def __init__(self, predict_batch: Callable[[list], Sequence], max_batch_size: int = 16, max_wait_ms: float = 5.0,
+                 executor=None):
+        # predict_batch : liste d'entrées -> séquence de résultats, dans le même ordre
+        self.predict_batch = predict_batch
+        # InferenceExecutor qui exécute les forward passes (threadpool par défaut de la boucle sinon)
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._worker = None
+
+    async def submit(self, item):
+        """Ajoute un élément au prochain batch et attend son résultat"""
+        if self._worker is None:
+            # La file doit être créée dans la boucle d'événements du serveur
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                # Forward pass bloquant exécuté hors de la boucle d'événements
+                if self.executor is not None:
+                    results = await self.executor.run(self.predict_batch, items, requests=len(items))
+                else:
+                    results = await loop.run_in_executor(None, self.predict_batch, items)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                # La requête a pu être annulée (client déconnecté) pendant le calcul
+                if not future.done():
+                    future.set_result(result)
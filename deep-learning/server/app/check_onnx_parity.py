@@ -0,0 +1,102 @@
+"""
+Test de parité TensorFlow / ONNX Runtime sur le test set
+
+Pour chaque modèle exporté, compare sur le test set de l'entraînement :
+- les prédictions (argmax identique attendu pour chaque titre) et l'écart max de probabilité
+- la latence d'une requête unitaire (médiane et p95)
+- l'empreinte mémoire d'un process qui ne charge que ce backend (pic de RSS)
+
+Utilisation (depuis /app) : python check_onnx_parity.py [--model lstm|camembert|all]
+"""
+
+import argparse
+import resource
+import subprocess
+import sys
+import time
+import numpy as np
+from sklearn.preprocessing import LabelEncoder
+
+from data_preparation import TEXT_COLUMN, LABEL_COLUMN, load_training_dataframe, split_train_val_test
+
+BATCH_SIZE = 32
+LATENCY_SAMPLES = 200
+
+
+def load_predictor(model_name, backend):
+    from load_model import load_camembert_predictor, load_lstm_predictor
+
+    if model_name == "lstm":
+        return load_lstm_predictor(backend)[0]
+    return load_camembert_predictor(backend)[0]
+
+
+def predict_all(predictor, texts):
+    return np.concatenate([predictor.predict_proba(texts[i:i + BATCH_SIZE]) for i in range(0, len(texts), BATCH_SIZE)])
+
+
+def single_request_latency(predictor, texts):
+    predictor.predict_proba(texts[:1])  # traçage / initialisation
+    timings = []
+    for text in texts[:LATENCY_SAMPLES]:
+        start = time.perf_counter()
+        predictor.predict_proba([text])
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 95)
+
+
+def peak_rss_mb(model_name, backend):
+    """Pic de RSS d'un process neuf qui charge le predictor et fait une prédiction"""
+    output = subprocess.check_output(
+        [sys.executable, __file__, "--measure-rss", model_name, backend],
+        stderr=subprocess.DEVNULL, text=True
+    )
+    return float(output.strip().splitlines()[-1])
+
+
+def check_model(model_name, X_test, y_test):
+    print(f"\n🔍 Modèle {model_name}")
+    tf_predictor = load_predictor(model_name, "tf")
+    onnx_predictor = load_predictor(model_name, "onnx")
+
+    proba_tf = predict_all(tf_predictor, X_test)
+    proba_onnx = predict_all(onnx_predictor, X_test)
+    mismatches = int((proba_tf.argmax(axis=1) != proba_onnx.argmax(axis=1)).sum())
+
+    print(f"   Accuracy TF           : {(proba_tf.argmax(axis=1) == y_test).mean():.4f}")
+    print(f"   Accuracy ONNX         : {(proba_onnx.argmax(axis=1) == y_test).mean():.4f}")
+    print(f"   Ecart max de proba    : {np.abs(proba_tf - proba_onnx).max():.2e}")
+    print(f"   Argmax différents     : {mismatches}/{len(X_test)}")
+    for backend, predictor in (("tf", tf_predictor), ("onnx", onnx_predictor)):
+        p50, p95 = single_request_latency(predictor, X_test)
+        print(f"   Latence unitaire {backend:<5}: p50 {p50:.1f} ms | p95 {p95:.1f} ms")
+    for backend in ("tf", "onnx"):
+        print(f"   Pic de RSS {backend:<11}: {peak_rss_mb(model_name, backend):.0f} MB")
+    return mismatches == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parité TF / ONNX Runtime sur le test set")
+    parser.add_argument("--model", choices=["lstm", "camembert", "all"], default="all")
+    parser.add_argument("--measure-rss", nargs=2, metavar=("MODEL", "BACKEND"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure_rss:
+        model_name, backend = args.measure_rss
+        load_predictor(model_name, backend).predict_proba(["mesure mémoire"])
+        # ru_maxrss est en Ko sous Linux
+        print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+        return True
+
+    df = load_training_dataframe()
+    y_all = LabelEncoder().fit_transform(df[LABEL_COLUMN])
+    _, _, X_test, _, _, y_test = split_train_val_test(df[TEXT_COLUMN].values, y_all)
+
+    models = ["lstm", "camembert"] if args.model == "all" else [args.model]
+    ok = all([check_model(model_name, X_test, y_test) for model_name in models])
+    print("\n✅ Parité TF / ONNX respectée" if ok else "\n❌ Les prédictions ONNX divergent de TF")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,65 @@
+"""
+Préparation du dataset d'entraînement, partagée par le script d'entraînement
+et les scripts de validation (mêmes nettoyages, même découpage train/val/test).
+"""
+
+import re
+import pandas as pd
+from pathlib import Path
+
+TRAINING_DATASET_PATH = Path(__file__).parent / "../data/dataset-for-training-completed.csv"
+TEXT_COLUMN = 'Titres opération et projet lauréat'
+LABEL_COLUMN = 'Thématique'
+SEED = 42
+
+# Espaces reconnus par \s (re Python), écrits en clair : les motifs ci-dessous donnent le même
+# résultat avec re (preprocess_text) et avec le moteur regex d'Arrow (preprocess_series), où \s
+# ne couvre que les espaces ASCII
+WHITESPACE = "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000"
+NON_TEXT_PATTERN = "[^a-zàâäæçéèêëïîôùûüÿœ'" + WHITESPACE + "]"
+SPACES_PATTERN = "[" + WHITESPACE + "]+"
+
+
+def preprocess_text(text):
+    """Normalisation du texte français"""
+    text = text.lower()
+    text = re.sub(NON_TEXT_PATTERN, "", text)
+    text = re.sub(SPACES_PATTERN, " ", text).strip()
+    return text
+
+
+def preprocess_series(texts):
+    """preprocess_text sur toute une colonne, en opérations vectorisées (colonnes str d'Arrow)"""
+    texts = texts.astype("str").str.lower()
+    texts = texts.str.replace(NON_TEXT_PATTERN, "", regex=True)
+    return texts.str.replace(SPACES_PATTERN, " ", regex=True).str.strip()
+
+
+def clean_dataframe(df):
+    """Supprime les lignes incomplètes et les thématiques vides ou sans lettre"""
+    df = df.dropna()
+    df['Thématique'] = df['Thématique'].str.strip()
+    df = df[df['Thématique'].str.len() > 0]
+    df = df[~df['Thématique'].str.match(r'^[\W_]+$')]
+    return df
+
+
+def load_training_dataframe(csv_path=TRAINING_DATASET_PATH):
+    """Charge le dataset d'entraînement nettoyé, titres normalisés"""
+    df = clean_dataframe(pd.read_csv(csv_path))
+    df[TEXT_COLUMN] = preprocess_series(df[TEXT_COLUMN])
+    return df
+
+
+def split_train_val_test(X_all, y_all, seed=SEED):
+    """Découpage stratifié 56% / 14% / 30%, identique à l'entraînement"""
+    # Import local : les APIs n'utilisent que preprocess_text et n'ont pas à charger scikit-learn
+    from sklearn.model_selection import train_test_split
+
+    X_train_all, X_test, y_train_all, y_test = train_test_split(
+        X_all, y_all, test_size=0.3, random_state=seed, stratify=y_all
+    )
+    X_train, X_val, y_train, y_val = train_test_split(
+        X_train_all, y_train_all, test_size=0.2, random_state=seed, stratify=y_train_all
+    )
+    return X_train, X_val, X_test, y_train, y_val, y_test
@@ -0,0 +1,121 @@
+# Cache colonnaire du dataset des budgets participatifs
+#
+# initial-budget-participatif.csv est un CSV ";" dont la colonne geo_shape (GeoJSON) et les
+# colonnes d'URL pèsent l'essentiel du fichier, alors qu'aucun consommateur ne les lit.
+# Le CSV est converti une seule fois en fichier Arrow IPC (format Feather v2, non compressé) :
+# - colonnes typées, Thématique / Arrondissement / Avancement / Quartier Populaire en catégories
+# - lecture limitée aux colonnes demandées par l'appelant, fichier mappé en mémoire
+# - empreinte du CSV (taille, mtime, sha256) stockée dans les métadonnées du fichier : le cache
+#   est reconstruit automatiquement quand l'export open data change
+#
+# Utilisation : load_dataset([colonnes]) à la place de pd.read_csv(DATASET_PATH, delimiter=';')
+#               python dataset_cache.py  (reconstruit le cache)
+
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from pathlib import Path
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+DATASET_PATH = Path(__file__).parent / "../data/initial-budget-participatif.csv"
+
+# Colonnes stockées en catégories (peu de valeurs distinctes, répétées sur toutes les lignes)
+CATEGORY_COLUMNS = [
+    "Thématique",
+    "Arrondissement de l'opération",
+    "Avancement de l'opération",
+    "Opération en Quartier Populaire"
+]
+
+# Métadonnées du cache : empreinte du CSV dont il est issu
+META_SIZE = b"source_size"
+META_MTIME = b"source_mtime_ns"
+META_SHA256 = b"source_sha256"
+
+
+def cache_path_for(csv_path: Path) -> Path:
+    """Fichier Arrow à côté du CSV (data/initial-budget-participatif.arrow)"""
+    return Path(csv_path).with_suffix(".arrow")
+
+
+def _sourceSignature(csv_path: Path) -> tuple:
+    stat = os.stat(csv_path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def _cacheMetadata(cache_path: Path) -> Optional[dict]:
+    """Métadonnées du cache (lecture du seul schéma), None si absent ou illisible"""
+    try:
+        with pa.memory_map(str(cache_path)) as source:
+            return pa.ipc.open_file(source).schema.metadata or {}
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return None
+
+
+def build_cache(csv_path: Path = DATASET_PATH, cache_path: Optional[Path] = None) -> str:
+    """Convertit le CSV en fichier Arrow. Retourne le sha256 du CSV converti."""
+    cache_path = cache_path or cache_path_for(csv_path)
+    signature = _sourceSignature(csv_path)
+    # Le hash et le parsing portent sur les mêmes octets, même si le fichier est réécrit entre-temps
+    raw = Path(csv_path).read_bytes()
+    content_hash = hashlib.sha256(raw).hexdigest()
+    df = pd.read_csv(io.BytesIO(raw), delimiter=';', encoding='utf-8')
+    for column in CATEGORY_COLUMNS:
+        # Catégories dans l'ordre d'apparition : value_counts départage les égalités comme sur le CSV
+        df[column] = df[column].astype(pd.CategoricalDtype(df[column].dropna().unique()))
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        META_SIZE: str(signature[0]).encode(),
+        META_MTIME: str(signature[1]).encode(),
+        META_SHA256: content_hash.encode()
+    })
+    # Écriture dans un fichier temporaire puis remplacement atomique : un lecteur concurrent
+    # (autre worker) voit l'ancien cache ou le nouveau, jamais un fichier partiel
+    fd, tmp_path = tempfile.mkstemp(dir=Path(cache_path).parent, suffix=".tmp")
+    os.close(fd)
+    os.chmod(tmp_path, 0o644)
+    try:
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    logger.info("✅ Cache colonnaire créé : %s (%d lignes)", cache_path, len(df))
+    return content_hash
+
+
+def ensure_cache(csv_path: Path = DATASET_PATH, cache_path: Optional[Path] = None) -> Path:
+    """Chemin d'un cache à jour, reconstruit si le CSV a changé depuis la conversion"""
+    cache_path = cache_path or cache_path_for(csv_path)
+    metadata = _cacheMetadata(cache_path)
+    size, mtime_ns = _sourceSignature(csv_path)
+    if metadata is None or metadata.get(META_SIZE) != str(size).encode() or metadata.get(META_MTIME) != str(mtime_ns).encode():
+        build_cache(csv_path, cache_path)
+    return cache_path
+
+
+def load_dataset(columns: Optional[List[str]] = None, csv_path: Path = DATASET_PATH, cache_path: Optional[Path] = None) -> pd.DataFrame:
+    """
+    Dataset lu depuis le cache Arrow (mappé en mémoire), limité aux colonnes demandées.
+    Le sha256 du CSV d'origine est disponible dans df.attrs["source_sha256"].
+    """
+    cache_path = ensure_cache(csv_path, cache_path)
+    table = feather.read_table(str(cache_path), columns=columns, memory_map=True)
+    metadata = table.schema.metadata or {}
+    df = table.to_pandas()
+    df.attrs["source_sha256"] = metadata.get(META_SHA256, b"").decode()
+    return df
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    build_cache()
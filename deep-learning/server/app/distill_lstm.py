@@ -0,0 +1,377 @@
+"""
+Distillation de CamemBERT (teacher) dans le LSTM (student) servi par l'api
+
+- teacher : le CamemBERT fine-tuné servi par l'api (load_camembert_predictor, INFERENCE_BACKEND),
+  dont les probabilités sur tout dataset-for-training-completed.csv (dataset préparé, même découpage
+  train/val/test que train_and_save_model.py) sont mises en cache disque
+- student : l'architecture LSTM bidirectionnelle du notebook LSTM_enriched_data, entraînée sur un
+  mélange de la KL divergence avec les probabilités du teacher adoucies par DISTILL_TEMPERATURE
+  (poids DISTILL_ALPHA) et de la cross-entropy sur les vrais labels
+- artefacts écrits dans DISTILL_OUTPUT_DIR (model/lstm2-distilled) avec les mêmes noms que
+  model/lstm2 : .h5, tokenizer picklé, vocabulaire json et label mapping. L'api les sert avec
+  LSTM_MODEL_DIR=model/lstm2-distilled (export ONNX : même variable pour export_onnx.py).
+- rapport (distillation_report.json) : accuracy sur le test set, latence unitaire, taille des
+  artefacts et pic de RSS du teacher, du student et du LSTM actuel (model/lstm2, s'il existe)
+
+Utilisation (depuis /app) : python distill_lstm.py [--temperature 2] [--alpha 0.7] [--epochs 15]
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import pickle
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from pathlib import Path
+
+# Configuration Keras legacy pour compatibilité avec Transformers (teacher)
+os.environ['TF_USE_LEGACY_KERAS'] = '1'
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
+# Kernels oneDNN activés pour l'entraînement, comme train_and_save_model.py (avant l'import de load_model,
+# qui les désactive par défaut au service) ; un TF_ENABLE_ONEDNN_OPTS déjà défini est respecté
+os.environ.setdefault('TF_ENABLE_ONEDNN_OPTS', '1')
+
+DISTILLED_LSTM_DIR = Path(os.environ.get("DISTILL_OUTPUT_DIR", Path(__file__).parent / "model/lstm2-distilled"))
+# Probabilités du teacher, calculées une seule fois par version du modèle et du dataset
+TEACHER_CACHE_DIR = Path(__file__).parent / "../data/distillation"
+REPORT_FILENAME = "distillation_report.json"
+TEMPERATURE = float(os.environ.get("DISTILL_TEMPERATURE", "2.0"))
+ALPHA = float(os.environ.get("DISTILL_ALPHA", "0.7"))
+MAX_WORDS = 10000
+BATCH_SIZE = 64
+EPOCHS = 15
+TEACHER_BATCH_SIZE = 32
+LATENCY_SAMPLES = 200
+
+
+def soften(probas, temperature):
+    """Probabilités recalculées à la température donnée : softmax(log(p) / T)"""
+    logits = np.log(np.clip(probas, 1e-12, 1.0)) / temperature
+    logits -= logits.max(axis=1, keepdims=True)
+    softened = np.exp(logits)
+    return (softened / softened.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+def predict_all(predictor, texts, batch_size=TEACHER_BATCH_SIZE):
+    """Probabilités de tous les titres, par batchs de longueurs proches (padding CamemBERT minimal)"""
+    order = np.argsort([len(text) for text in texts], kind="stable")
+    probas = None
+    for start in range(0, len(texts), batch_size):
+        indices = order[start:start + batch_size]
+        batch = predictor.predict_proba([texts[i] for i in indices])
+        if probas is None:
+            probas = np.empty((len(texts), batch.shape[1]), dtype=np.float32)
+        probas[indices] = batch
+    return probas
+
+
+def teacher_probabilities(predictor, texts, cache_dir=TEACHER_CACHE_DIR):
+    """Probabilités du teacher sur tous les titres, lues depuis le cache disque si déjà calculées"""
+    from tokenized_dataset import dataset_hash
+
+    key = {"model": predictor.model_id, "dataset_sha256": dataset_hash(texts)}
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+    cache_path = Path(cache_dir) / f"teacher-probas-{digest[:16]}.npz"
+    if cache_path.exists():
+        with np.load(cache_path) as cached:
+            print(f"✅ Probabilités du teacher lues depuis le cache : {cache_path}")
+            return cached["probas"]
+
+    print(f"🔄 Inférence du teacher sur {len(texts)} titres...")
+    start = time.perf_counter()
+    probas = predict_all(predictor, texts)
+    print(f"⏱️  {len(texts) / (time.perf_counter() - start):.0f} titres/s")
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    buffer = io.BytesIO()
+    np.savez(buffer, description=json.dumps(key), probas=probas)
+    # Écriture atomique : une inférence interrompue ne laisse pas de cache partiel
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(buffer.getvalue())
+    os.replace(tmp_path, cache_path)
+    print(f"✅ Probabilités du teacher mises en cache : {cache_path}")
+    return probas
+
+
+def build_student(num_classes, vocab_size=MAX_WORDS, max_len=None, embedding_dim=128, lstm_units=64):
+    """
+    LSTM bidirectionnel du notebook LSTM_enriched_data -> (modèle servi, modèle des logits).
+    Les deux partagent leurs couches : le second sert à l'entraînement (softmax à température T),
+    le premier (softmax) est sauvegardé pour l'api.
+    """
+    from tensorflow import keras
+    from tensorflow.keras import layers
+    from lstm_tokenizer import MAX_LEN_LSTM
+
+    inputs = layers.Input(shape=(max_len or MAX_LEN_LSTM,), dtype="int32", name="input_ids")
+    x = layers.Embedding(vocab_size, embedding_dim)(inputs)
+    x = layers.Bidirectional(layers.LSTM(lstm_units, return_sequences=True))(x)
+    x = layers.Dropout(0.3)(x)
+    x = layers.Bidirectional(layers.LSTM(lstm_units))(x)
+    x = layers.Dropout(0.3)(x)
+    x = layers.Dense(64, activation='relu')(x)
+    x = layers.Dropout(0.3)(x)
+    logits = layers.Dense(num_classes, name="logits")(x)
+    output = layers.Activation('softmax', name="probabilities")(logits)
+    return keras.Model(inputs, output, name="lstm_student"), keras.Model(inputs, logits, name="lstm_student_logits")
+
+
+def make_distiller(student_logits, temperature=TEMPERATURE, alpha=ALPHA):
+    """Modèle d'entraînement du student : données ((input_ids), (label, probabilités adoucies du teacher))"""
+    import tensorflow as tf
+    from tensorflow import keras
+
+    class Distiller(keras.Model):
+        def __init__(self):
+            super().__init__()
+            self.student_logits = student_logits
+            self.loss_tracker = keras.metrics.Mean(name="loss")
+            self.accuracy = keras.metrics.SparseCategoricalAccuracy(name="accuracy")
+
+        @property
+        def metrics(self):
+            return [self.loss_tracker, self.accuracy]
+
+        def call(self, inputs, training=False):
+            return tf.nn.softmax(self.student_logits(inputs, training=training))
+
+        def distillation_loss(self, labels, teacher_probas, logits):
+            hard = keras.losses.sparse_categorical_crossentropy(labels, logits, from_logits=True)
+            soft = keras.losses.kl_divergence(teacher_probas, tf.nn.softmax(logits / temperature))
+            # x T² : gradients des soft labels à la même échelle quelle que soit la température (Hinton et al.)
+            return tf.reduce_mean(alpha * temperature ** 2 * soft + (1 - alpha) * hard)
+
+        def update_metrics(self, loss, labels, logits):
+            self.loss_tracker.update_state(loss)
+            self.accuracy.update_state(labels, logits)
+            return {metric.name: metric.result() for metric in self.metrics}
+
+        def train_step(self, data):
+            inputs, (labels, teacher_probas) = data
+            with tf.GradientTape() as tape:
+                logits = self.student_logits(inputs, training=True)
+                loss = self.distillation_loss(labels, teacher_probas, logits)
+            variables = self.student_logits.trainable_variables
+            self.optimizer.apply_gradients(zip(tape.gradient(loss, variables), variables))
+            return self.update_metrics(loss, labels, logits)
+
+        def test_step(self, data):
+            inputs, (labels, teacher_probas) = data
+            logits = self.student_logits(inputs, training=False)
+            return self.update_metrics(self.distillation_loss(labels, teacher_probas, logits), labels, logits)
+
+    return Distiller()
+
+
+def make_dataset(inputs, labels, teacher_probas, batch_size=BATCH_SIZE, training=False, seed=None):
+    import tensorflow as tf
+
+    dataset = tf.data.Dataset.from_tensor_slices((inputs, (labels.astype(np.int32), teacher_probas)))
+    if training:
+        dataset = dataset.shuffle(len(labels), seed=seed, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def single_request_latency(predictor, texts):
+    predictor.predict_proba(texts[:1])  # traçage / initialisation
+    timings = []
+    for text in texts[:LATENCY_SAMPLES]:
+        start = time.perf_counter()
+        predictor.predict_proba([text])
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(timings, 50)), float(np.percentile(timings, 95))
+
+
+def peak_rss_mb(model_name, lstm_dir=None):
+    """Pic de RSS d'un process neuf qui charge le predictor de l'api et fait une prédiction"""
+    env = dict(os.environ)
+    if lstm_dir is not None:
+        env["LSTM_MODEL_DIR"] = str(Path(lstm_dir).resolve())
+    output = subprocess.check_output(
+        [sys.executable, __file__, "--measure-rss", model_name],
+        stderr=subprocess.DEVNULL, text=True, env=env
+    )
+    return float(output.strip().splitlines()[-1])
+
+
+def teacher_artifact():
+    from backends import INFERENCE_BACKEND
+    from load_model import CAMEMBERT_QUANTIZED, MODEL_PATH, ONNX_INT8_MODEL_PATH, ONNX_MODEL_PATH
+
+    if INFERENCE_BACKEND == "onnx":
+        return ONNX_INT8_MODEL_PATH if CAMEMBERT_QUANTIZED else ONNX_MODEL_PATH
+    return MODEL_PATH
+
+
+def load_reference_lstm(classes):
+    """LSTM actuellement servi (model/lstm2), s'il existe et partage les mêmes thématiques"""
+    from tensorflow import keras
+    from backends import TensorFlowBackend
+    from load_model import LstmPredictor, load_label_mapping
+    from lstm_tokenizer import LstmEncoder
+
+    reference_dir = Path(__file__).parent / "model/lstm2"
+    model_path = reference_dir / "lstm-titles-budgets-participatif.h5"
+    mapping_path = reference_dir / "lstm_titles_label_mapping.json"
+    vocabulary_path = reference_dir / "lstm_titles_vocabulary.json"
+    if not (model_path.exists() and mapping_path.exists() and vocabulary_path.exists()):
+        print(f"⚠️  Pas de LSTM de référence complet dans {reference_dir} (vocabulaire : python lstm_tokenizer.py)")
+        return None, None
+    label_mapping, num_classes = load_label_mapping(mapping_path)
+    if [label_mapping[str(i)] for i in range(num_classes)] != list(classes):
+        print("⚠️  Le LSTM de référence n'a pas les mêmes thématiques : comparaison ignorée")
+        return None, None
+    predictor = LstmPredictor(TensorFlowBackend(keras.models.load_model(model_path)), LstmEncoder.from_json(vocabulary_path))
+    return predictor, {"dir": reference_dir, "artifacts": [model_path, vocabulary_path]}
+
+
+def evaluate(name, predictor, X_test, y_test, artifacts, probas=None, lstm_dir=None):
+    if probas is None:
+        probas = predict_all(predictor, list(X_test))
+    p50, p95 = single_request_latency(predictor, list(X_test))
+    result = {
+        "accuracy": float((probas.argmax(axis=1) == y_test).mean()),
+        "latency_p50_ms": p50,
+        "latency_p95_ms": p95,
+        "size_mb": sum(os.path.getsize(path) for path in artifacts) / (1024**2),
+        "peak_rss_mb": peak_rss_mb(name, lstm_dir)
+    }
+    print(
+        f"   {name:<10}: accuracy {result['accuracy']:.4f} | p50 {p50:.1f} ms | p95 {p95:.1f} ms"
+        f" | {result['size_mb']:.1f} MB | RSS {result['peak_rss_mb']:.0f} MB"
+    )
+    return result, probas
+
+
+def save_student(student, tokenizer, classes, output_dir, metadata):
+    """Artefacts au format de model/lstm2 (noms de fichiers attendus par load_model.py)"""
+    from lstm_tokenizer import save_vocabulary
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    student.save(output_dir / "lstm-titles-budgets-participatif.h5")
+    with open(output_dir / "lstm_titles_tokenizer.pickle", "wb") as f:
+        pickle.dump(tokenizer, f, protocol=pickle.HIGHEST_PROTOCOL)
+    save_vocabulary(tokenizer, output_dir / "lstm_titles_vocabulary.json")
+    with open(output_dir / "lstm_titles_label_mapping.json", 'w', encoding='utf-8') as f:
+        json.dump({
+            'num_to_label': {int(i): str(label) for i, label in enumerate(classes)},
+            'label_to_num': {str(label): int(i) for i, label in enumerate(classes)},
+            'num_classes': len(classes),
+            **metadata
+        }, f, ensure_ascii=False, indent=2)
+    print(f"✅ Student sauvegardé dans {output_dir}")
+
+
+def distill(args):
+    import tensorflow as tf
+    from tensorflow import keras
+    from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+    from tensorflow.keras.preprocessing.text import Tokenizer
+
+    from backends import TensorFlowBackend
+    from data_preparation import SEED, split_train_val_test
+    from load_model import LstmPredictor, load_camembert_predictor
+    from lstm_tokenizer import LstmEncoder
+    from prepare_dataset import load_prepared_dataset
+    from training_utils import ThroughputLogger, configure_training_threads
+
+    configure_training_threads()
+    np.random.seed(SEED)
+    tf.random.set_seed(SEED)
+    keras.utils.set_random_seed(SEED)
+
+    print("📥 Chargement du dataset préparé...")
+    X_all, y_all, classes = load_prepared_dataset()
+    # Même découpage que l'entraînement du teacher : le test set ne lui a jamais été montré
+    train_idx, val_idx, test_idx, y_train, y_val, y_test = split_train_val_test(np.arange(len(X_all)), y_all)
+    print(f"✅ Train: {len(train_idx)} | Val: {len(val_idx)} | Test: {len(test_idx)}")
+
+    teacher, teacher_mapping = load_camembert_predictor()
+    if [teacher_mapping[str(i)] for i in range(len(teacher_mapping))] != list(classes):
+        raise ValueError("Les thématiques du teacher ne correspondent pas à celles du dataset préparé")
+    teacher_probas = teacher_probabilities(teacher, list(X_all))
+    soft_targets = soften(teacher_probas, args.temperature)
+
+    # Tokenizer Keras ajusté sur le train set (comme le notebook), encodage identique via LstmEncoder
+    tokenizer = Tokenizer(num_words=MAX_WORDS, oov_token='<UNK>')
+    tokenizer.fit_on_texts(X_all[train_idx])
+    encoder = LstmEncoder.from_keras_tokenizer(tokenizer)
+    inputs_all = encoder.encode(list(X_all))
+
+    student, student_logits = build_student(len(classes))
+    distiller = make_distiller(student_logits, args.temperature, args.alpha)
+    distiller.compile(optimizer=keras.optimizers.Adam())
+    print(f"🔨 Student : {student.count_params():,} paramètres (T={args.temperature}, alpha={args.alpha})")
+
+    early_stop = EarlyStopping(monitor='val_loss', patience=3, restore_best_weights=True)
+    reduce_lr = ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=1, min_lr=1e-5)
+    history = distiller.fit(
+        make_dataset(inputs_all[train_idx], y_train, soft_targets[train_idx], training=True, seed=SEED),
+        validation_data=make_dataset(inputs_all[val_idx], y_val, soft_targets[val_idx]),
+        epochs=args.epochs,
+        callbacks=[early_stop, reduce_lr, ThroughputLogger(len(train_idx))],
+        verbose=1
+    )
+    print(f"✅ Distillation terminée (meilleure val_accuracy : {max(history.history['val_accuracy']):.4f})")
+
+    X_test = X_all[test_idx]
+    student_accuracy = float((student.predict(inputs_all[test_idx], verbose=0).argmax(axis=1) == y_test).mean())
+    output_dir = Path(args.output_dir)
+    save_student(student, tokenizer, classes, output_dir, {
+        'distilled_from': teacher.model_id,
+        'temperature': args.temperature,
+        'alpha': args.alpha,
+        'test_accuracy': student_accuracy
+    })
+
+    print("\n📊 Comparaison sur le test set...")
+    student_predictor = LstmPredictor(TensorFlowBackend(student), LstmEncoder.from_json(output_dir / "lstm_titles_vocabulary.json"))
+    report = {"test_size": len(test_idx), "temperature": args.temperature, "alpha": args.alpha}
+    report["teacher"], _ = evaluate("camembert", teacher, X_test, y_test, [teacher_artifact()], probas=teacher_probas[test_idx])
+    report["student"], student_probas = evaluate(
+        "lstm", student_predictor, X_test, y_test,
+        [output_dir / "lstm-titles-budgets-participatif.h5", output_dir / "lstm_titles_vocabulary.json"],
+        lstm_dir=output_dir
+    )
+    report["student"]["teacher_agreement"] = float((student_probas.argmax(axis=1) == teacher_probas[test_idx].argmax(axis=1)).mean())
+    reference, reference_info = load_reference_lstm(classes)
+    if reference is not None:
+        # Entraîné par le notebook sur son propre découpage : référence indicative
+        report["reference_lstm"], _ = evaluate("lstm", reference, X_test, y_test, reference_info["artifacts"], lstm_dir=reference_info["dir"])
+
+    with open(output_dir / REPORT_FILENAME, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"   Accord student / teacher : {report['student']['teacher_agreement'] * 100:.2f}%")
+    print(f"✅ Rapport sauvegardé : {output_dir / REPORT_FILENAME}")
+    print(f"\n💡 Servir le student : LSTM_MODEL_DIR={output_dir} python api.py")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distillation de CamemBERT dans le LSTM servi par l'api")
+    parser.add_argument("--temperature", type=float, default=TEMPERATURE)
+    parser.add_argument("--alpha", type=float, default=ALPHA, help="poids des probabilités du teacher (1 - alpha : vrais labels)")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--output-dir", default=str(DISTILLED_LSTM_DIR))
+    parser.add_argument("--measure-rss", choices=["lstm", "camembert"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure_rss:
+        from load_model import load_camembert_predictor, load_lstm_predictor
+
+        loader = load_lstm_predictor if args.measure_rss == "lstm" else load_camembert_predictor
+        loader()[0].predict_proba(["mesure mémoire"])
+        # ru_maxrss est en Ko sous Linux
+        print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+        return
+
+    distill(args)
+
+
+if __name__ == "__main__":
+    main()
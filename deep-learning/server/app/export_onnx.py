@@ -0,0 +1,79 @@
+"""
+Export des classifieurs LSTM et CamemBERT au format ONNX
+
+Convertit les modèles Keras entraînés en artefacts .onnx exécutables par ONNX Runtime
+(INFERENCE_BACKEND=onnx). Le label mapping est embarqué dans les métadonnées de chaque
+artefact (clé "num_to_label") en plus des json existants, pour qu'un .onnx soit autonome.
+Pour le LSTM, le vocabulaire du tokenizer est aussi exporté en json (lstm_tokenizer.py).
+
+Les dimensions batch et longueur de séquence restent dynamiques : le padding par
+buckets de CamemBERT fonctionne aussi avec ONNX Runtime.
+
+Utilisation (depuis /app) :
+    python export_onnx.py                 # les deux modèles
+    python export_onnx.py --model lstm
+Puis vérifier la parité : python check_onnx_parity.py
+"""
+
+import argparse
+import json
+import os
+
+import onnx
+import tensorflow as tf
+import tf2onnx
+
+from lstm_tokenizer import MAX_LEN_LSTM, save_vocabulary
+from load_model import (
+    load_camembert_model, load_lstm_model,
+    ONNX_LSTM_PATH, ONNX_MODEL_PATH
+)
+
+OPSET = 13
+
+
+def save_with_labels(model_proto, label_mapping, output_path):
+    """Ajoute le label mapping aux métadonnées du graphe puis sauvegarde l'artefact"""
+    entry = model_proto.metadata_props.add()
+    entry.key = "num_to_label"
+    entry.value = json.dumps(label_mapping, ensure_ascii=False)
+    onnx.save(model_proto, str(output_path))
+    size = os.path.getsize(output_path) / (1024**2)
+    print(f"✅ Modèle ONNX sauvegardé : {output_path} ({size:.1f} MB)")
+
+
+def export_lstm(opset=OPSET):
+    print("🔄 Export du modèle LSTM...")
+    lstm_model, tokenizer_lstm, label_mapping, _ = load_lstm_model()
+    # Vocabulaire json : le backend ONNX encode les titres sans dépickler le tokenizer Keras
+    save_vocabulary(tokenizer_lstm)
+    input_signature = (tf.TensorSpec((None, MAX_LEN_LSTM), tf.int32, name="input_ids"),)
+    model_proto, _ = tf2onnx.convert.from_keras(lstm_model, input_signature=input_signature, opset=opset)
+    save_with_labels(model_proto, label_mapping, ONNX_LSTM_PATH)
+
+
+def export_camembert(opset=OPSET):
+    print("🔄 Export du modèle CamemBERT...")
+    camembert_model, _, label_mapping, _ = load_camembert_model()
+    input_signature = (
+        tf.TensorSpec((None, None), tf.int32, name="input_ids"),
+        tf.TensorSpec((None, None), tf.int32, name="attention_mask"),
+    )
+    model_proto, _ = tf2onnx.convert.from_keras(camembert_model, input_signature=input_signature, opset=opset)
+    save_with_labels(model_proto, label_mapping, ONNX_MODEL_PATH)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exporte les modèles Keras au format ONNX")
+    parser.add_argument("--model", choices=["lstm", "camembert", "all"], default="all")
+    parser.add_argument("--opset", type=int, default=OPSET)
+    args = parser.parse_args()
+
+    if args.model in ("lstm", "all"):
+        export_lstm(args.opset)
+    if args.model in ("camembert", "all"):
+        export_camembert(args.opset)
+
+
+if __name__ == "__main__":
+    main()
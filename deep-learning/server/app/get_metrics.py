@@ -3,20 +3,31 @@
 # 
 # ce seront les fonctions qui seront appelées par l'api pour générer de la donnée à envoyer au user
 
+import logging
 import pandas as pd
 from pathlib import Path
 from typing import Optional
+from dataset_cache import load_dataset
 from schemas import PredictionInfo
 
+# Seules colonnes lues par les metrics (le cache colonnaire ne charge pas les autres)
+METRICS_COLUMNS = [
+    "Thématique", "Edition", "Arrondissement de l'opération", "Avancement de l'opération",
+    "Titre de l'opération", "Budget global du projet lauréat", "Opération en Quartier Populaire"
+]
+
+logger = logging.getLogger(__name__)
+
 
 def getMetricsByCategory(prediction_info: PredictionInfo, projectTitle: str, estimatedBudget: int) -> dict:
     # Extraire la catégorie de l'objet prediction_info
     predictedCategory = prediction_info.name
-    # Charger le fichier CSV
+    # Charger les colonnes utiles depuis le cache colonnaire du CSV
     csv_path = Path(__file__).parent / "../data/initial-budget-participatif.csv"
-    df = pd.read_csv(csv_path, delimiter=';', encoding='utf-8')
-    print(f"Colonnes disponibles: {df.columns.tolist()}")
-    print(f"Catégorie recherchée: {predictedCategory}")
+    df = load_dataset(METRICS_COLUMNS, csv_path)
+    # Détail de chaque requête : seulement en DEBUG (LOG_LEVEL), le formatage n'est pas fait sinon
+    logger.debug("Colonnes disponibles: %s", df.columns.tolist())
+    logger.debug("Catégorie recherchée: %s", predictedCategory)
     # Filtrer les données par la catégorie prédite (colonne "Thématique")
     col_thematique = "Thématique"
     number_of_records = 0
@@ -24,10 +35,10 @@ def getMetricsByCategory(prediction_info: PredictionInfo, projectTitle: str, est
     # Filtrer par catégorie
     category_matches = df[df[col_thematique].str.contains(predictedCategory, case=False, na=False)]
     if (len(category_matches) > 0):
-        print(f"✅ {len(category_matches)} projet(s) trouvé(s) pour la catégorie: {predictedCategory}")
+        logger.debug("%d projet(s) trouvé(s) pour la catégorie: %s", len(category_matches), predictedCategory)
         number_of_records = len(category_matches)
     else:
-        print(f"0 projet(s) trouvé(s) pour la catégorie: {predictedCategory}, aucune calcul de metrics possibles")
+        logger.info("0 projet(s) trouvé(s) pour la catégorie: %s, aucun calcul de metrics possible", predictedCategory)
         return {
             "predictedCategory": {
                 "name": prediction_info.name,
@@ -63,7 +74,8 @@ def getMetricsByCategory(prediction_info: PredictionInfo, projectTitle: str, est
     postal_code_distribution = []
     col_arrondissement = "Arrondissement de l'opération"
     if col_arrondissement in category_matches.columns:
-        arrond_counts = category_matches[col_arrondissement].value_counts()
+        # Colonne catégorielle dans le cache : value_counts sur les valeurs (sans les arrondissements absents)
+        arrond_counts = category_matches[col_arrondissement].astype(object).value_counts()
         
         for arrondissement, count in arrond_counts.items():
             if pd.notna(arrondissement):  # Ignorer les valeurs NaN
@@ -0,0 +1,100 @@
+# Exécuteur d'inférence borné
+#
+# Les forward passes ne tournent plus sur le threadpool par défaut de FastAPI (40 threads, sans
+# rapport avec le modèle) mais sur un pool dédié de INFERENCE_WORKERS threads, chacun limité à
+# INTRA_OP_THREADS threads TensorFlow / ONNX Runtime (backends.py) : le CPU n'est jamais sursouscrit.
+#
+# Les requêtes de prédiction sont admises dans une file bornée (INFERENCE_MAX_QUEUE requêtes en
+# attente de forward pass) : au-delà, le serveur répond tout de suite 429 + Retry-After au lieu
+# de laisser la latence s'effondrer. La profondeur de file est exposée sur GET /inference-queue
+# (signal d'autoscaling).
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from backends import INFERENCE_WORKERS
+
+INFERENCE_MAX_QUEUE = int(os.environ.get("INFERENCE_MAX_QUEUE", "64"))
+RETRY_AFTER_SECONDS = int(os.environ.get("INFERENCE_RETRY_AFTER", "1"))
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class InferenceExecutor:
+    """Pool de threads d'inférence avec file d'admission bornée"""
+
+    def __init__(self, workers=INFERENCE_WORKERS, max_queue=INFERENCE_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self.in_flight = 0  # requêtes admises et non terminées
+        self.executing = 0  # requêtes dont le forward pass est en cours
+        self.rejected = 0
+
+    @property
+    def queue_depth(self):
+        """Requêtes admises qui attendent encore leur forward pass"""
+        return max(0, self.in_flight - self.executing)
+
+    @contextmanager
+    def admit(self):
+        """Admet une requête de prédiction, ou QueueFullError si la file est pleine"""
+        with self._lock:
+            if self.in_flight - self.executing >= self.max_queue:
+                self.rejected += 1
+                raise QueueFullError()
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    async def run(self, fn, *args, requests=1):
+        """Exécute fn(*args) sur le pool ; requests = nombre de requêtes servies par cet appel (micro-batch)"""
+        return await asyncio.wrap_future(self._pool.submit(self._execute, requests, fn, args))
+
+    def _execute(self, requests, fn, args):
+        with self._lock:
+            self.executing += requests
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.executing -= requests
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "maxQueue": self.max_queue,
+                "queueDepth": self.queue_depth,
+                "executing": self.executing,
+                "inFlight": self.in_flight,
+                "rejected": self.rejected
+            }
+
+
+def add_backpressure_routes(app: FastAPI, executor):
+    """Réponse 429 quand la file est pleine et route GET /inference-queue"""
+
+    @app.exception_handler(QueueFullError)
+    def queue_full(request, exc):
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Serveur saturé, réessayez plus tard"},
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
+
+    @app.get("/inference-queue")
+    def inference_queue():
+        return executor.stats()
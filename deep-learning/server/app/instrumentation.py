@@ -0,0 +1,209 @@
+# Instrumentation du chemin chaud et endpoint GET /metrics au format texte Prometheus
+#
+# Compteurs, jauges et histogrammes en mémoire, protégés par un verrou chacun (les routes et le
+# pool d'inférence les mettent à jour depuis plusieurs threads), rendus au format d'exposition
+# texte 0.0.4 sans dépendance supplémentaire. Chaque processus a ses propres valeurs : avec
+# serve_multiprocess.py, chaque worker expose les siennes.
+#
+# Métriques :
+#   prediction_stage_seconds{model, stage}      tokenize / forward (par appel au modèle, un micro-batch
+#                                               compte une fois), metrics / validation (par requête)
+#   prediction_request_seconds{model}           durée totale des routes de prédiction
+#   predictions_total{model, thematique}        thématiques prédites
+#   low_confidence_predictions_total{model}     prédictions sous LOW_CONFIDENCE_THRESHOLD
+#   inference_requests_in_flight, inference_queue_depth, inference_rejected_total
+#   model_load_seconds{model}                   durée de chargement de chaque modèle (et des metrics)
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+LOW_CONFIDENCE_THRESHOLD = float(os.environ.get("LOW_CONFIDENCE_THRESHOLD", "0.5"))
+# Bornes (s) des histogrammes de latence : de 0.5 ms (LSTM, metrics) à 5 s (CamemBERT saturé)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """
+    Métrique nommée, par combinaison de labels. collect : fonction -> {valeurs des labels: valeur},
+    appelée au rendu pour les valeurs tenues ailleurs (ex: compteurs de l'InferenceExecutor)
+    """
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), collect=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._collect = collect
+        self._lock = threading.Lock()
+        self._values = {}  # valeurs des labels -> valeur ou état
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} attend les labels {self.labelnames}, reçu {sorted(labels)}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def _current_values(self):
+        values = dict(self._values)
+        if self._collect is not None:
+            values.update(self._collect())
+        return {key: value for key, value in values.items() if value is not None}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            samples = list(self._samples())
+        lines.extend(f"{name}{labels} {_format_value(value)}" for name, labels, value in samples)
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        for key, value in sorted(self._current_values().items()):
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]  # comptes par borne, somme, total
+            # Comptes non cumulés ici, cumulés au rendu
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{self.name}_bucket", _format_labels(self.labelnames, key, [le]), cumulative
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Métrique déjà enregistrée : {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def unregister(self, name):
+        with self._lock:
+            self._metrics.pop(name, None)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "prediction_stage_seconds", "Durée de chaque étape de prédiction", ("model", "stage")
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "prediction_request_seconds", "Durée totale des requêtes de prédiction", ("model",)
+))
+PREDICTIONS = REGISTRY.register(Counter(
+    "predictions_total", "Prédictions servies par thématique", ("model", "thematique")
+))
+LOW_CONFIDENCE = REGISTRY.register(Counter(
+    "low_confidence_predictions_total", f"Prédictions de confiance inférieure à {LOW_CONFIDENCE_THRESHOLD}", ("model",)
+))
+
+
+def record_predictions(model_name, prediction_infos):
+    """Compte les thématiques prédites et les prédictions peu confiantes"""
+    for prediction_info in prediction_infos:
+        PREDICTIONS.inc(model=model_name, thematique=prediction_info.name)
+        if prediction_info.confidence < LOW_CONFIDENCE_THRESHOLD:
+            LOW_CONFIDENCE.inc(model=model_name)
+
+
+def add_metrics_route(app, executor, loaders, registry=REGISTRY):
+    """Jauges de l'exécuteur et des chargements (lues à chaque scrape) et route GET /metrics"""
+    # Import local : les predictors (et donc les scripts hors api) importent ce module
+    from fastapi.responses import PlainTextResponse
+
+    collected = [
+        Gauge("inference_requests_in_flight", "Requêtes de prédiction admises et non terminées",
+              collect=lambda: {(): executor.in_flight}),
+        Gauge("inference_queue_depth", "Requêtes en attente de forward pass",
+              collect=lambda: {(): executor.queue_depth}),
+        Counter("inference_rejected_total", "Requêtes refusées (429, file pleine)",
+                collect=lambda: {(): executor.rejected}),
+        Gauge("model_load_seconds", "Durée de chargement de chaque modèle", ("model",),
+              collect=lambda: {(loader.name,): loader.load_seconds for loader in loaders})
+    ]
+    for metric in collected:
+        # Une application recréée dans le même processus (tests, workers) remplace les précédentes
+        registry.unregister(metric.name)
+        registry.register(metric)
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def metrics():
+        return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,128 @@
+# Chargement des modèles en arrière-plan
+#
+# Les APIs ne chargent plus leur modèle à l'import : le serveur écoute tout de suite et le
+# chargement (modèle, tokenizer, dataset des metrics) se fait dans un thread. En attendant :
+#   - GET /healthz : le processus est vivant (toujours 200)
+#   - GET /readyz  : 200 quand tout est chargé, 503 sinon, avec l'avancement de chaque chargement
+#   - les routes de prédiction répondent immédiatement 503 (+ Retry-After) au lieu de rester bloquées
+# Le temps entre le démarrage du processus et le premier état "ready" est mesuré et affiché.
+
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+# Importé en premier par les APIs : référence du temps de démarrage
+PROCESS_STARTED = time.perf_counter()
+RETRY_AFTER_SECONDS = 5
+
+logger = logging.getLogger(__name__)
+
+
+class NotReadyError(Exception):
+    def __init__(self, loader):
+        super().__init__(f"{loader.name} : {loader.state}")
+        self.loader = loader
+
+
+class BackgroundLoader:
+    """Exécute load() dans un thread et garde son résultat, son état et ses temps de chargement"""
+
+    def __init__(self, name, load):
+        self.name = name
+        self._load = load
+        self._thread = None
+        self.state = "pending"  # pending -> loading -> ready | failed
+        self.value = None
+        self.error = None
+        self.load_seconds = None
+        self.boot_to_ready_seconds = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"load-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        self.state = "loading"
+        start = time.perf_counter()
+        try:
+            value = self._load()
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.state = "failed"
+            logger.exception("❌ Echec du chargement de %s : %s", self.name, self.error)
+            return
+        finished = time.perf_counter()
+        self.load_seconds = finished - start
+        self.boot_to_ready_seconds = finished - PROCESS_STARTED
+        # value est publié avant l'état : une requête qui voit "ready" lit toujours un résultat complet
+        self.value = value
+        self.state = "ready"
+        logger.info("✅ %s prêt en %.1f s (démarrage -> prêt : %.1f s)", self.name, self.load_seconds, self.boot_to_ready_seconds)
+
+    @property
+    def ready(self):
+        return self.state == "ready"
+
+    def get(self):
+        """Résultat du chargement, ou NotReadyError tant qu'il n'est pas disponible"""
+        if self.state != "ready":
+            raise NotReadyError(self)
+        return self.value
+
+    def status(self):
+        status = {"state": self.state}
+        if self.state == "ready":
+            status["loadSeconds"] = round(self.load_seconds, 3)
+            status["bootToReadySeconds"] = round(self.boot_to_ready_seconds, 3)
+        elif self.state == "failed":
+            status["error"] = self.error
+        else:
+            status["elapsedSeconds"] = round(time.perf_counter() - PROCESS_STARTED, 3)
+        return status
+
+
+def loading_lifespan(*loaders):
+    """Lifespan FastAPI qui lance les chargements au démarrage, à composer dans celui de l'application"""
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # Ne bloque pas le démarrage d'uvicorn : le port est ouvert pendant le chargement
+        for loader in loaders:
+            loader.start()
+        yield
+
+    return lifespan
+
+
+def add_health_routes(app: FastAPI, *loaders):
+    """Ajoute /healthz, /readyz et la réponse 503 des routes appelées trop tôt (chargements : loading_lifespan)"""
+
+    @app.exception_handler(NotReadyError)
+    def not_ready(request, exc: NotReadyError):
+        # Retry-After seulement pendant le chargement : un échec ne se résoudra pas en réessayant
+        failed = exc.loader.state == "failed"
+        return JSONResponse(
+            status_code=503,
+            content={"detail": f"Modèle non disponible ({exc.loader.name} : {exc.loader.state})"},
+            headers=None if failed else {"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
+
+    @app.get("/healthz")
+    def healthz():
+        return {"status": "alive"}
+
+    @app.get("/readyz")
+    def readyz():
+        ready = all(loader.ready for loader in loaders)
+        failed = any(loader.state == "failed" for loader in loaders)
+        content = {
+            "status": "ready" if ready else "failed" if failed else "loading",
+            "loaders": {loader.name: loader.status() for loader in loaders}
+        }
+        return JSONResponse(status_code=200 if ready else 503, content=content)
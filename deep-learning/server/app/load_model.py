@@ -1,51 +1,252 @@
 import os
 import json
+import logging
+import pickle
 import warnings
+from pathlib import Path
 
 # Configuration Keras legacy pour compatibilité avec Transformers
 os.environ['TF_USE_LEGACY_KERAS'] = '1'
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
-os.environ['TF_ENABLE_ONEDNN_OPTS'] = '0'
+# oneDNN désactivé par défaut au service (résultats bit à bit stables), réactivable par TF_ENABLE_ONEDNN_OPTS=1
+os.environ.setdefault('TF_ENABLE_ONEDNN_OPTS', '0')
 warnings.filterwarnings('ignore', category=UserWarning)
 
-from tensorflow import keras
-from transformers import CamembertTokenizer, TFCamembertModel
+# TensorFlow et Transformers ne sont importés que par les fonctions qui en ont besoin : importer ce
+# module est immédiat, et avec INFERENCE_BACKEND=onnx le serveur démarre sans jamais charger TensorFlow.
+import numpy as np
+from backends import INFERENCE_BACKEND, OnnxRuntimeBackend, TensorFlowBackend, configure_tensorflow_threads
+from instrumentation import STAGE_SECONDS
+from lstm_tokenizer import LSTM_MODEL_DIR, LstmEncoder, VOCABULARY_LSTM_PATH
+from tfidf_features import LABEL_MAPPING_TFIDF_PATH, TFIDF_MODEL_PATH, load_tfidf_model
+from schemas import PredictionInfo
+
+logger = logging.getLogger(__name__)
 
 LABEL_MAPPING_PATH = "../model/camembert/camembert_label_mapping.json"
 MODEL_PATH = "../model/camembert/model_camembert_camembert-budgets-participatif.h5"
+ONNX_MODEL_PATH = "../model/camembert/camembert-budgets-participatif.onnx"
+ONNX_INT8_MODEL_PATH = "../model/camembert/camembert-budgets-participatif.int8.onnx"
+# Copie locale du tokenizer (save_pretrained) : le démarrage n'a besoin ni du réseau ni du cache Hugging Face
+TOKENIZER_CAMEMBERT_PATH = "../model/camembert/tokenizer"
+# Tokenizer rapide (Rust, batchs encodés sur plusieurs threads) ; "0" revient au tokenizer SentencePiece
+CAMEMBERT_FAST_TOKENIZER = os.environ.get("CAMEMBERT_FAST_TOKENIZER", "1") == "1"
+# Avec le backend onnx : sert la version quantifiée INT8 produite par quantize_camembert.py
+CAMEMBERT_QUANTIZED = os.environ.get("CAMEMBERT_QUANTIZED", "0") == "1"
 MAX_LEN_CAMEMBERT = 128
+# Longueurs de padding possibles à l'inférence ("128" seul = comportement historique)
+LENGTH_BUCKETS = tuple(int(b) for b in os.environ.get("CAMEMBERT_LENGTH_BUCKETS", "16,32,64,128").split(","))
+
+MODEL_LSTM_PATH = LSTM_MODEL_DIR / "lstm-titles-budgets-participatif.h5"
+ONNX_LSTM_PATH = LSTM_MODEL_DIR / "lstm-titles-budgets-participatif.onnx"
+TOKENIZER_LSTM_PATH = LSTM_MODEL_DIR / "lstm_titles_tokenizer.pickle"
+LABEL_MAPPING_LSTM_PATH = LSTM_MODEL_DIR / "lstm_titles_label_mapping.json"
+
+
+# Lit un label mapping json -> (num_to_label, num_classes)
+def load_label_mapping(path):
+    with open(path, "r", encoding="utf-8") as f:
+        label_mapping_data = json.load(f)
+    return label_mapping_data["num_to_label"], label_mapping_data["num_classes"]
+
+
+# Identifiant d'un modèle servi : change dès que l'artefact est régénéré (clé du cache de prédictions)
+def model_identifier(name, backend, artifact_path):
+    return f"{name}:{backend}:{Path(artifact_path).name}@{os.stat(artifact_path).st_mtime_ns}"
+
+
+# Charge le tokenizer CamemBERT (rapide par défaut) depuis sa copie locale, ou à défaut depuis le hub
+# puis le sauvegarde localement
+def load_camembert_tokenizer(fast=CAMEMBERT_FAST_TOKENIZER):
+    from transformers import CamembertTokenizer, CamembertTokenizerFast
+
+    tokenizer_class = CamembertTokenizerFast if fast else CamembertTokenizer
+    if os.path.isdir(TOKENIZER_CAMEMBERT_PATH):
+        tokenizer_camembert = tokenizer_class.from_pretrained(TOKENIZER_CAMEMBERT_PATH, local_files_only=True)
+        if fast and not os.path.isfile(os.path.join(TOKENIZER_CAMEMBERT_PATH, "tokenizer.json")):
+            # Copie locale du seul tokenizer SentencePiece : la conversion n'est faite qu'une fois
+            tokenizer_camembert.save_pretrained(TOKENIZER_CAMEMBERT_PATH)
+        return tokenizer_camembert
+    logger.warning("⚠️ Tokenizer local absent, téléchargement de camembert-base puis copie dans %s", TOKENIZER_CAMEMBERT_PATH)
+    tokenizer_camembert = tokenizer_class.from_pretrained("camembert-base")
+    tokenizer_camembert.save_pretrained(TOKENIZER_CAMEMBERT_PATH)
+    return tokenizer_camembert
+
 
 # Charge le modèle CamemBERT, le tokenizer et le label mapping.
 def load_camembert_model():
-    print("🔄 Chargement du modèle CamemBERT...")
-    
+    from tensorflow import keras
+    from transformers import TFCamembertModel
+
+    # Pools de threads TensorFlow fixés avant la création du moindre tenseur
+    configure_tensorflow_threads()
+
+    logger.info("🔄 Chargement du modèle CamemBERT...")
+
     # 1. Charger le label mapping
-    with open(LABEL_MAPPING_PATH, "r", encoding="utf-8") as f:
-        label_mapping_data = json.load(f)
-        num_classes = label_mapping_data["num_classes"]
-        label_mapping = label_mapping_data["num_to_label"]
-    
+    label_mapping, num_classes = load_label_mapping(LABEL_MAPPING_PATH)
+
     # 2. Charger le tokenizer CamemBERT
-    tokenizer_camembert = CamembertTokenizer.from_pretrained("camembert-base")
-    
-    # 3. Charger le modèle complet depuis le fichier .h5
-    print("📥 Chargement du modèle CamemBERT depuis le fichier sauvegardé...")
-    
+    tokenizer_camembert = load_camembert_tokenizer()
+
+    # 3. Charger le modèle complet depuis le fichier .h5 (inférence seule : pas de compilation)
+    logger.info("📥 Chargement du modèle CamemBERT depuis le fichier sauvegardé...")
+
     camembert_model = keras.models.load_model(
         MODEL_PATH,
         custom_objects={'TFCamembertModel': TFCamembertModel},
         compile=False
     )
-    print(f"✅ Modèle chargé depuis : {MODEL_PATH}")
-    
-    # 4. Compiler le modèle
-    camembert_model.compile(
-        optimizer=keras.optimizers.Adam(learning_rate=label_mapping_data.get('best_learning_rate', 1e-5)),
-        loss='sparse_categorical_crossentropy',
-        metrics=['accuracy']
-    )
-    
-    print(f"✅ Modèle CamemBERT chargé avec succès !")
-    print(f"   Nombre de classes : {num_classes}")
-    
+    logger.info("✅ Modèle CamemBERT chargé depuis : %s (%d classes)", MODEL_PATH, num_classes)
+
     return camembert_model, tokenizer_camembert, label_mapping, num_classes
+
+
+# Charge le predictor CamemBERT avec le backend demandé ("tf" ou "onnx", float ou INT8) -> (predictor, label_mapping)
+def load_camembert_predictor(backend=INFERENCE_BACKEND, quantized=CAMEMBERT_QUANTIZED):
+    if backend == "onnx":
+        onnx_path = ONNX_INT8_MODEL_PATH if quantized else ONNX_MODEL_PATH
+        label_mapping, _ = load_label_mapping(LABEL_MAPPING_PATH)
+        tokenizer_camembert = load_camembert_tokenizer()
+        logger.info("✅ Modèle CamemBERT ONNX chargé depuis : %s", onnx_path)
+        model_id = model_identifier("camembert", backend, onnx_path)
+        return CamembertPredictor(OnnxRuntimeBackend(onnx_path), tokenizer_camembert, model_id=model_id), label_mapping
+    camembert_model, tokenizer_camembert, label_mapping, _ = load_camembert_model()
+    model_id = model_identifier("camembert", backend, MODEL_PATH)
+    return CamembertPredictor(TensorFlowBackend(camembert_model), tokenizer_camembert, model_id=model_id), label_mapping
+
+
+class CamembertPredictor:
+    """
+    Inférence CamemBERT à longueur variable.
+
+    Chaque batch est paddé au plus petit bucket qui contient son titre le plus long
+    (au lieu de toujours 128 tokens) : un titre de 20 tokens ne paie que l'attention
+    sur 32 positions. Avec le backend TF, chaque bucket a son propre graphe tracé.
+    """
+
+    def __init__(self, backend, tokenizer_camembert, buckets=LENGTH_BUCKETS, model_id="camembert"):
+        self.backend = backend
+        self.model_id = model_id
+        self.tokenizer = tokenizer_camembert
+        self.buckets = tuple(sorted(set(buckets) | {MAX_LEN_CAMEMBERT}))
+
+    def encode(self, titles):
+        """Tokenize un batch de titres et le padde au bucket adapté"""
+        tokens = self.tokenizer(
+            list(titles),
+            padding='longest',
+            truncation=True,
+            max_length=MAX_LEN_CAMEMBERT,
+            return_tensors='np'
+        )
+        length = tokens['input_ids'].shape[1]
+        bucket = next(b for b in self.buckets if b >= length)
+        padding = ((0, 0), (0, bucket - length))
+        input_ids = np.pad(tokens['input_ids'], padding, constant_values=self.tokenizer.pad_token_id)
+        attention_mask = np.pad(tokens['attention_mask'], padding, constant_values=0)
+        return input_ids.astype(np.int32), attention_mask.astype(np.int32)
+
+    def predict_proba(self, titles):
+        """Probabilités de toutes les thématiques pour une liste de titres (un seul forward pass)"""
+        with STAGE_SECONDS.time(model="camembert", stage="tokenize"):
+            input_ids, attention_mask = self.encode(titles)
+        with STAGE_SECONDS.time(model="camembert", stage="forward"):
+            return self.backend.run([input_ids, attention_mask])
+
+
+# Charge le modèle LSTM, son tokenizer Keras et le label mapping.
+def load_lstm_model():
+    from tensorflow import keras
+
+    lstm_model = keras.models.load_model(MODEL_LSTM_PATH)
+    with open(TOKENIZER_LSTM_PATH, "rb") as f:
+        tokenizer_lstm = pickle.load(f)
+    label_mapping, num_classes = load_label_mapping(LABEL_MAPPING_LSTM_PATH)
+    return lstm_model, tokenizer_lstm, label_mapping, num_classes
+
+
+# Charge l'encodeur LSTM depuis le vocabulaire json (sans TensorFlow), ou à défaut depuis le tokenizer picklé
+def load_lstm_encoder():
+    if VOCABULARY_LSTM_PATH.exists():
+        return LstmEncoder.from_json(VOCABULARY_LSTM_PATH)
+    with open(TOKENIZER_LSTM_PATH, "rb") as f:
+        return LstmEncoder.from_keras_tokenizer(pickle.load(f))
+
+
+# Charge le predictor LSTM avec le backend demandé ("tf" ou "onnx") -> (predictor, label_mapping)
+def load_lstm_predictor(backend=INFERENCE_BACKEND):
+    label_mapping, _ = load_label_mapping(LABEL_MAPPING_LSTM_PATH)
+    if backend == "onnx":
+        logger.info("✅ Modèle LSTM ONNX chargé depuis : %s", ONNX_LSTM_PATH)
+        model_id = model_identifier("lstm", backend, ONNX_LSTM_PATH)
+        return LstmPredictor(OnnxRuntimeBackend(ONNX_LSTM_PATH), load_lstm_encoder(), model_id=model_id), label_mapping
+    from tensorflow import keras
+
+    # Pools de threads TensorFlow fixés avant la création du moindre tenseur
+    configure_tensorflow_threads()
+    lstm_model = keras.models.load_model(MODEL_LSTM_PATH)
+    model_id = model_identifier("lstm", backend, MODEL_LSTM_PATH)
+    return LstmPredictor(TensorFlowBackend(lstm_model), load_lstm_encoder(), model_id=model_id), label_mapping
+
+
+class LstmPredictor:
+    """Inférence LSTM sur une liste de titres (encodage vectorisé + padding à MAX_LEN_LSTM)"""
+
+    def __init__(self, backend, encoder, model_id="lstm"):
+        self.backend = backend
+        self.model_id = model_id
+        self.encoder = encoder
+
+    def encode(self, titles):
+        return self.encoder.encode(titles)
+
+    def predict_proba(self, titles):
+        """Probabilités de toutes les thématiques pour une liste de titres (un seul forward pass)"""
+        with STAGE_SECONDS.time(model="lstm", stage="tokenize"):
+            input_ids = self.encode(titles)
+        with STAGE_SECONDS.time(model="lstm", stage="forward"):
+            return self.backend.run([input_ids])
+
+
+# Charge le predictor TF-IDF (NumPy seul, quel que soit INFERENCE_BACKEND) -> (predictor, label_mapping)
+def load_tfidf_predictor():
+    label_mapping, _ = load_label_mapping(LABEL_MAPPING_TFIDF_PATH)
+    encoder, backend = load_tfidf_model(TFIDF_MODEL_PATH)
+    logger.info("✅ Modèle TF-IDF chargé depuis : %s (%d features)", TFIDF_MODEL_PATH, encoder.num_features)
+    model_id = model_identifier("tfidf", backend.name, TFIDF_MODEL_PATH)
+    return TfidfPredictor(backend, encoder, model_id=model_id), label_mapping
+
+
+class TfidfPredictor:
+    """Inférence TF-IDF + classifieur linéaire sur une liste de titres (matrice creuse, sans TensorFlow)"""
+
+    def __init__(self, backend, encoder, model_id="tfidf"):
+        self.backend = backend
+        self.model_id = model_id
+        self.encoder = encoder
+
+    def encode(self, titles):
+        return self.encoder.encode(titles)
+
+    def predict_proba(self, titles):
+        """Probabilités de toutes les thématiques pour une liste de titres"""
+        with STAGE_SECONDS.time(model="tfidf", stage="tokenize"):
+            inputs = self.encode(titles)
+        with STAGE_SECONDS.time(model="tfidf", stage="forward"):
+            return self.backend.run(list(inputs))
+
+
+# Transforme les probabilités d'un batch en PredictionInfo (thématique la plus probable + confiance).
+def decode_predictions(probas, label_mapping, model_label):
+    prediction_infos = []
+    for proba in probas:
+        idx = int(proba.argmax())
+        confidence = float(proba[idx])
+        predicted_category = label_mapping.get(str(idx), "Inconnu")
+        prediction_infos.append(PredictionInfo(
+            name=predicted_category,
+            confidence=confidence,
+            analyse=f"Prédiction {model_label} : {predicted_category} (confiance {confidence:.2f})"
+        ))
+    return prediction_infos
@@ -0,0 +1,96 @@
+# Tokenizer LSTM sans TensorFlow
+#
+# Le tokenizer d'entraînement est un `Tokenizer` Keras picklé : le dépickler importe
+# TensorFlow, et `texts_to_sequences` + `pad_sequences` bouclent mot par mot en Python.
+# Ce module exporte son vocabulaire dans un json compact puis encode un batch de titres
+# directement en matrice int32 (batch, MAX_LEN_LSTM), avec un résultat bit à bit
+# identique à l'encodage Keras (mêmes filtres, OOV, num_words, troncature 'pre', padding 'post').
+#
+# Export (depuis /app) : python lstm_tokenizer.py
+
+import json
+import os
+import numpy as np
+from itertools import repeat
+from pathlib import Path
+
+# Dossier des artefacts LSTM servis (ex: LSTM_MODEL_DIR=model/lstm2-distilled pour le LSTM distillé)
+LSTM_MODEL_DIR = Path(os.environ.get("LSTM_MODEL_DIR", Path(__file__).parent / "model/lstm2"))
+VOCABULARY_LSTM_PATH = LSTM_MODEL_DIR / "lstm_titles_vocabulary.json"
+MAX_LEN_LSTM = 51  # Doit correspondre à l'entraînement
+
+
+class LstmEncoder:
+    """Encodeur équivalent à tokenizer.texts_to_sequences + pad_sequences(padding='post')"""
+
+    def __init__(self, word_index, oov_index, filters, lower=True, split=" ", maxlen=MAX_LEN_LSTM):
+        # word_index ne contient que les mots conservés (index < num_words) : tout autre mot
+        # devient oov_index, ou est ignoré si le tokenizer n'avait pas de token OOV
+        self.word_index = word_index
+        self.oov_index = oov_index
+        self.lower = lower
+        self.split = split
+        self.maxlen = maxlen
+        self._translate_map = str.maketrans({c: split for c in filters})
+
+    @classmethod
+    def from_keras_tokenizer(cls, tokenizer, maxlen=MAX_LEN_LSTM):
+        return cls(**export_vocabulary(tokenizer), maxlen=maxlen)
+
+    @classmethod
+    def from_json(cls, path=VOCABULARY_LSTM_PATH, maxlen=MAX_LEN_LSTM):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(**json.load(f), maxlen=maxlen)
+
+    def words(self, text):
+        if self.lower:
+            text = text.lower()
+        return filter(None, text.translate(self._translate_map).split(self.split))
+
+    def encode(self, titles):
+        """Batch de titres -> matrice int32 (batch, maxlen), remplie sans séquences intermédiaires"""
+        matrix = np.zeros((len(titles), self.maxlen), dtype=np.int32)
+        get = self.word_index.get
+        for row, title in enumerate(titles):
+            if self.oov_index is None:
+                # Sans token OOV, Keras ignore les mots inconnus
+                ids = [i for i in map(get, self.words(title)) if i is not None]
+            else:
+                ids = list(map(get, self.words(title), repeat(self.oov_index)))
+            if ids:
+                # Troncature 'pre' (on garde la fin du titre) puis padding 'post'
+                ids = ids[-self.maxlen:]
+                matrix[row, :len(ids)] = ids
+        return matrix
+
+
+def export_vocabulary(tokenizer):
+    """Extrait d'un Tokenizer Keras tout ce qui est nécessaire à l'encodage"""
+    if tokenizer.char_level:
+        raise ValueError("Tokenizer au niveau caractère non supporté")
+    num_words = tokenizer.num_words
+    word_index = {
+        word: index for word, index in tokenizer.word_index.items()
+        if not num_words or index < num_words
+    }
+    return {
+        "word_index": word_index,
+        "oov_index": tokenizer.word_index.get(tokenizer.oov_token) if tokenizer.oov_token is not None else None,
+        "filters": tokenizer.filters,
+        "lower": tokenizer.lower,
+        "split": tokenizer.split
+    }
+
+
+def save_vocabulary(tokenizer, path=VOCABULARY_LSTM_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(export_vocabulary(tokenizer), f, ensure_ascii=False, separators=(",", ":"))
+    print(f"✅ Vocabulaire exporté : {path}")
+
+
+if __name__ == "__main__":
+    import pickle
+    from load_model import TOKENIZER_LSTM_PATH
+
+    with open(TOKENIZER_LSTM_PATH, "rb") as f:
+        save_vocabulary(pickle.load(f))
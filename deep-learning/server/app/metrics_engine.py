@@ -0,0 +1,457 @@
+# Moteur de metrics précalculées par thématique
+#
+# Le CSV complet est lu une seule fois au démarrage de l'api : pour chaque "Thématique"
+# on précalcule toutes les statistiques renvoyées au user (années, arrondissements,
+# statuts, quartiers populaires, budgets, top/flop 5...).
+# A chaque requête il ne reste plus qu'une lecture de dictionnaire, le tirage des
+# exemples abandonnés et le positionnement de l'estimatedBudget dans les quartiles.
+#
+# Le dataset est lu depuis le cache colonnaire (dataset_cache.py), limité aux colonnes des metrics.
+# Le fichier source est surveillé (mtime + hash du contenu) : quand l'export open data est
+# rafraîchi, un nouveau snapshot est construit en arrière-plan en ne recalculant que les
+# thématiques dont les lignes ont changé, puis remplace l'ancien d'un seul coup.
+#
+# Le format de sortie est strictement identique à celui de get_metrics.getMetricsByCategory
+
+import copy
+import os
+import random
+import hashlib
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import List, Optional
+from dataset_cache import DATASET_PATH, load_dataset
+from schemas import PredictionInfo
+
+# Intervalle de surveillance du CSV en secondes (0 = pas de rechargement à chaud)
+RELOAD_INTERVAL = float(os.environ.get("METRICS_RELOAD_INTERVAL", "30"))
+
+COL_IDENTIFIANT = "Identifiant de l'opération"
+COL_THEMATIQUE = "Thématique"
+COL_ARRONDISSEMENT = "Arrondissement de l'opération"
+COL_AVANCEMENT = "Avancement de l'opération"
+COL_QUARTIER_POP = "Opération en Quartier Populaire"
+COL_TITRE = "Titre de l'opération"
+COL_BUDGET = "Budget global du projet lauréat"
+COL_EDITION = "Edition"
+# Colonnes dont dépendent les metrics : une modification ailleurs (géométrie, descriptions...)
+# ne déclenche pas de recalcul
+METRICS_COLUMNS = [COL_THEMATIQUE, COL_ARRONDISSEMENT, COL_AVANCEMENT, COL_QUARTIER_POP, COL_TITRE, COL_BUDGET, COL_EDITION]
+
+logger = logging.getLogger(__name__)
+
+
+class CategoryMetrics:
+    """Statistiques figées d'une thématique (tout sauf ce qui dépend de la requête)"""
+
+    def __init__(self, metrics: dict, abandoned_pool: list, quantiles: Optional[tuple]):
+        # metrics : champs de "metrics" propres à la thématique (sans breakdownByCategory,
+        # abandonedExamples ni estimatedBudgetQuartile)
+        self.metrics = metrics
+        # tous les projets abandonnés de la thématique, déjà au format ProjectExample
+        self.abandoned_pool = abandoned_pool
+        # (q1, q2, q3) du budget, None si aucun budget connu
+        self.quantiles = quantiles
+
+
+class MetricsSnapshot:
+    """Version immuable des metrics pour un état donné du CSV"""
+
+    def __init__(self, df: pd.DataFrame, content_hash: str):
+        self.df = df
+        self.content_hash = content_hash
+        self.breakdown_counts = list(df[COL_THEMATIQUE].value_counts().items())
+        self.total_count = len(df)
+        # Empreinte de chaque ligne (identifiant et colonnes lues par les metrics)
+        self.row_hashes = pd.util.hash_pandas_object(df[[COL_IDENTIFIANT] + METRICS_COLUMNS], index=False).to_numpy()
+        # Colonnes utiles aux metrics, statuts et quartiers populaires classés une fois par ligne
+        self.rows = _prepareRows(df)
+        self._thematique = df[COL_THEMATIQUE].astype("category")
+        # clé (thématique en minuscules) -> CategoryMetrics (None si aucun projet)
+        self.categories = {}
+        # clé -> empreinte des lignes de la thématique, pour le rechargement incrémental
+        self.fingerprints = {}
+        # clé -> breakdownByCategory (dépend de toutes les thématiques, recalculé à chaque version)
+        self.breakdowns = {}
+
+    def matches(self, predictedCategory: str) -> np.ndarray:
+        """Lignes dont la thématique contient predictedCategory (même règle que str.contains(case=False))"""
+        return _flags(self._thematique, predictedCategory)
+
+    def fingerprint(self, mask: np.ndarray) -> str:
+        # Dans l'ordre du fichier : l'ordre des lignes compte aussi (exemples, égalités de budget)
+        return hashlib.sha256(self.row_hashes[mask].tobytes()).hexdigest()
+
+    def withCategories(self, predictedCategories: List[str]) -> "MetricsSnapshot":
+        """Copie du snapshot complétée de thématiques : le dataset est partagé, seuls les dictionnaires
+        de metrics sont copiés, et le snapshot publié n'est jamais modifié"""
+        extended = copy.copy(self)
+        extended.categories = dict(self.categories)
+        extended.fingerprints = dict(self.fingerprints)
+        extended.breakdowns = dict(self.breakdowns)
+        extended.addCategories(predictedCategories)
+        return extended
+
+    def addCategories(self, predictedCategories: List[str], previous: Optional["MetricsSnapshot"] = None) -> List[str]:
+        """Ajoute des thématiques au snapshot, en réutilisant celles de `previous` dont les lignes n'ont pas bougé.
+        Retourne les clés dont les metrics ont dû être recalculées."""
+        pending = {}
+        for predictedCategory in predictedCategories:
+            key = predictedCategory.lower()
+            mask = self.matches(predictedCategory)
+            fingerprint = self.fingerprint(mask)
+            self.breakdowns[key] = _buildBreakdown(self.breakdown_counts, self.total_count, predictedCategory)
+            self.fingerprints[key] = fingerprint
+            if previous is not None and previous.fingerprints.get(key) == fingerprint:
+                self.categories[key] = previous.categories[key]
+            else:
+                pending[key] = mask
+        if not pending:
+            return []
+
+        # Les thématiques aux lignes disjointes (cas normal) sont calculées en un seul groupby ;
+        # une thématique dont le motif recouvre une autre (ex: "sport" et "sport et loisirs")
+        # partage des lignes et est calculée à part
+        overlaps = np.sum(list(pending.values()), axis=0) > 1
+        keys = list(pending)
+        # Code de la thématique de chaque ligne (indice dans keys, -1 = ligne ignorée)
+        codes = np.full(self.total_count, -1, dtype=np.int64)
+        isolated = []
+        for code, key in enumerate(keys):
+            mask = pending[key]
+            if overlaps[mask].any():
+                isolated.append(key)
+            else:
+                codes[mask] = code
+        built = _buildCategoryMetrics(self.rows, codes, keys)
+        for key in isolated:
+            built.update(_buildCategoryMetrics(self.rows, np.where(pending[key], 0, -1), [key]))
+        for key in pending:
+            self.categories[key] = built.get(key)
+        return list(pending)
+
+
+def _flags(column: pd.Series, pattern: str) -> np.ndarray:
+    """str.contains(pattern, case=False, na=False) évalué une fois par valeur distincte d'une colonne catégorielle"""
+    categories = pd.Series(column.cat.categories, dtype=object)
+    flags = categories.str.contains(pattern, case=False, na=False).to_numpy(dtype=bool)
+    # code -1 (valeur manquante) -> dernier élément : False
+    return np.append(flags, False)[column.cat.codes.to_numpy()]
+
+
+def _prepareRows(df: pd.DataFrame) -> pd.DataFrame:
+    """Colonnes des metrics avec une classification par ligne calculée une seule fois"""
+    avancement = df[COL_AVANCEMENT].astype("category")
+    quartier_pop = df[COL_QUARTIER_POP].astype("category")
+    rows = pd.DataFrame({
+        COL_EDITION: df[COL_EDITION].to_numpy(),
+        COL_TITRE: df[COL_TITRE].to_numpy(),
+        COL_BUDGET: df[COL_BUDGET].to_numpy(),
+        COL_ARRONDISSEMENT: df[COL_ARRONDISSEMENT].astype("category"),
+        "is_abandoned": _flags(avancement, "ABANDONNÉ"),
+        "is_completed": _flags(avancement, "FIN"),
+        "is_in_progress": ~_flags(avancement, "ABANDONNÉ|FIN") & avancement.notna().to_numpy(),
+        "high_priority": _flags(quartier_pop, "Oui"),
+        "low_priority": _flags(quartier_pop, "Non")
+    })
+    return rows
+
+
+def _buildBreakdown(breakdown_counts: list, total_count: int, predictedCategory: str) -> list:
+    breakdown_by_category = []
+    for category, count in breakdown_counts:
+        breakdown_by_category.append({
+            "category": category,
+            "percentage": int((count / total_count) * 100),
+            "selected": category.lower() == predictedCategory.lower() or predictedCategory.lower() in category.lower()
+        })
+    return breakdown_by_category
+
+
+def _buildCategoryMetrics(rows: pd.DataFrame, codes: np.ndarray, keys: List[str]) -> dict:
+    """Metrics de toutes les thématiques en un passage groupby.
+    codes : indice dans `keys` de la thématique de chaque ligne de `rows` (-1 = ligne ignorée) -> {clé: CategoryMetrics}"""
+    selected = codes >= 0
+    if not selected.any():
+        return {}
+    rows = rows[selected].reset_index(drop=True)
+    codes = codes[selected]
+    grouped = rows.groupby(codes, sort=False)
+
+    stats = grouped.agg(
+        numberOfRecords=(COL_EDITION, "size"),
+        startingYear=(COL_EDITION, "min"),
+        endingYear=(COL_EDITION, "max"),
+        abandoned=("is_abandoned", "sum"),
+        inProgress=("is_in_progress", "sum"),
+        completed=("is_completed", "sum"),
+        highPriority=("high_priority", "sum"),
+        lowPriority=("low_priority", "sum"),
+        budgetCount=(COL_BUDGET, "count"),
+        median=(COL_BUDGET, "median"),
+        average=(COL_BUDGET, "mean"),
+        min=(COL_BUDGET, "min"),
+        max=(COL_BUDGET, "max")
+    )
+    quantiles = grouped[COL_BUDGET].quantile([0.25, 0.5, 0.75]).unstack()
+
+    # Distribution par arrondissement : comptage par (thématique, arrondissement) dans l'ordre d'apparition,
+    # puis même tri que value_counts
+    postal_counts = rows.groupby([codes, rows[COL_ARRONDISSEMENT]], sort=False, observed=True).size()
+    postal_code_distributions = {
+        code: [
+            {"postalCode": str(arrondissement), "count": int(count)}
+            for (_, arrondissement), count in counts.sort_values(ascending=False, kind="stable").items()
+        ]
+        for code, counts in postal_counts.groupby(level=0, sort=False)
+    }
+
+    # Exemples : abandonnés dans l'ordre du fichier, top/flop 5 par budget (premières occurrences en cas d'égalité)
+    abandoned_pools = _groupExamples(rows, codes, np.flatnonzero(rows["is_abandoned"].to_numpy()))
+    # nlargest / nsmallest par thématique : mêmes règles d'égalité que get_metrics
+    budget = rows[COL_BUDGET]
+    most_expensive = _groupExamples(rows, codes, _groupPositions(budget.groupby(codes, sort=False).nlargest(5)))
+    least_expensive = _groupExamples(rows, codes, _groupPositions(budget.groupby(codes, sort=False).nsmallest(5)))
+
+    results = {}
+    for code, stat in stats.iterrows():
+        has_budget = stat["budgetCount"] > 0
+        category_quantiles = None
+        quartiles = []
+        if has_budget:
+            q1, q2, q3 = quantiles.loc[code, 0.25], quantiles.loc[code, 0.5], quantiles.loc[code, 0.75]
+            category_quantiles = (q1, q2, q3)
+            quartiles = [
+                {"quartile": 1, "label": "Q1 (0-25%)", "min": int(stat["min"]), "max": int(q1), "description": "Budget le plus bas"},
+                {"quartile": 2, "label": "Q2 (25-50%)", "min": int(q1), "max": int(q2), "description": "Budget inférieur à la moyenne"},
+                {"quartile": 3, "label": "Q3 (50-75%)", "min": int(q2), "max": int(q3), "description": "Budget supérieur à la moyenne"},
+                {"quartile": 4, "label": "Q4 (75-100%)", "min": int(q3), "max": int(stat["max"]), "description": "Budget le plus élevé"}
+            ]
+        metrics = {
+            "startingYear": int(stat["startingYear"]),
+            "endingYear": int(stat["endingYear"]),
+            "numberOfRecords": int(stat["numberOfRecords"]),
+            "postalCodeDistribution": postal_code_distributions.get(code, []),
+            "pieChart": {
+                "abandoned": int(stat["abandoned"]),
+                "inProgress": int(stat["inProgress"]),
+                "completed": int(stat["completed"])
+            },
+            "priorityArea": {
+                "highPriority": int(stat["highPriority"]),
+                "lowPriority": int(stat["lowPriority"])
+            },
+            "budget": {
+                "median": int(stat["median"]) if has_budget else 0,
+                "average": int(stat["average"]) if has_budget else 0,
+                "min": int(stat["min"]) if has_budget else 0,
+                "max": int(stat["max"]) if has_budget else 0,
+                "fiveMostExpensive": most_expensive.get(code, []),
+                "fiveLeastExpensive": least_expensive.get(code, [])
+            },
+            "quartiles": quartiles
+        }
+        results[keys[code]] = CategoryMetrics(metrics, abandoned_pools.get(code, []), category_quantiles)
+    return results
+
+
+def _groupPositions(selection: pd.Series) -> np.ndarray:
+    """Positions des lignes sélectionnées par un groupby(...).nlargest / nsmallest"""
+    return selection.index.get_level_values(-1).to_numpy()
+
+
+def _groupExamples(rows: pd.DataFrame, codes: np.ndarray, order: np.ndarray) -> dict:
+    """Lignes `order` de `rows` au format ProjectExample, regroupées par code de thématique"""
+    selection = rows.iloc[order]
+    titles = selection[COL_TITRE].astype(object).where(selection[COL_TITRE].notna(), "Titre indisponible").map(str)
+    budgets = selection[COL_BUDGET].fillna(0).astype("int64")
+    editions = selection[COL_EDITION]
+    years = editions.astype(object).where(editions.isna(), editions.fillna(0).astype("int64").astype(str)).fillna("N/A")
+    examples = {}
+    for code, title, budget, year in zip(codes[order].tolist(), titles.tolist(), budgets.tolist(), years.tolist()):
+        examples.setdefault(code, []).append({"title": title, "budget": budget, "year": year})
+    return examples
+
+
+class MetricsEngine:
+    """Charge le dataset une fois et sert les metrics de chaque thématique depuis la mémoire"""
+
+    def __init__(self, csv_path: Path = DATASET_PATH):
+        self.csv_path = csv_path
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._stop_watching = threading.Event()
+        self._file_signature = self._fileSignature()
+        self._snapshot = self._buildSnapshot(self._readSource())
+        logger.info("✅ Metrics précalculées pour %d thématique(s) (%d projets)", len(self._snapshot.categories), self._snapshot.total_count)
+
+    # ------------------------------------------------------------------
+    # Construction des snapshots
+    # ------------------------------------------------------------------
+    def _fileSignature(self) -> tuple:
+        stat = os.stat(self.csv_path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _readSource(self) -> tuple:
+        # Cache reconstruit si le CSV a changé ; le hash est celui des octets convertis
+        df = load_dataset([COL_IDENTIFIANT] + METRICS_COLUMNS, self.csv_path)
+        return df, df.attrs["source_sha256"]
+
+    def _buildSnapshot(self, source: tuple, previous: Optional[MetricsSnapshot] = None) -> MetricsSnapshot:
+        df, content_hash = source
+        snapshot = MetricsSnapshot(df, content_hash)
+        keys = {category.lower(): category for category in df[COL_THEMATIQUE].dropna().unique()}
+        if previous is not None:
+            # Les catégories hors dataset déjà demandées restent connues
+            for key in list(previous.categories):
+                keys.setdefault(key, key)
+        rebuilt = snapshot.addCategories(list(keys.values()), previous)
+        if previous is not None:
+            logger.info("🔄 Metrics rechargées : %d/%d thématique(s) recalculée(s) %s", len(rebuilt), len(keys), rebuilt)
+        return snapshot
+
+    def reloadIfChanged(self) -> bool:
+        """Reconstruit les metrics si le CSV a changé. Retourne True si un nouveau snapshot a été publié."""
+        with self._reload_lock:
+            try:
+                signature = self._fileSignature()
+                if signature == self._file_signature:
+                    return False
+                source = self._readSource()
+                self._file_signature = signature
+                if source[1] == self._snapshot.content_hash:
+                    # Fichier touché mais contenu identique
+                    return False
+                snapshot = self._buildSnapshot(source, previous=self._snapshot)
+            except Exception as e:
+                # Export en cours d'écriture ou invalide : on garde la version actuelle
+                logger.warning("⚠️ Rechargement des metrics impossible, version précédente conservée : %s", e)
+                return False
+            # Remplacement atomique : les requêtes en cours gardent leur référence à l'ancien snapshot
+            self._snapshot = snapshot
+            return True
+
+    def startWatching(self, interval: float = RELOAD_INTERVAL):
+        """Lance la surveillance du CSV dans un thread d'arrière-plan"""
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def watch():
+            while not self._stop_watching.wait(interval):
+                self.reloadIfChanged()
+
+        self._watcher = threading.Thread(target=watch, name="metrics-reload", daemon=True)
+        self._watcher.start()
+
+    def stopWatching(self):
+        self._stop_watching.set()
+
+    # ------------------------------------------------------------------
+    # Lecture (chemin chaud)
+    # ------------------------------------------------------------------
+    def getMetricsByCategory(self, prediction_info: PredictionInfo, projectTitle: str, estimatedBudget: int) -> dict:
+        # Une seule lecture de la référence : toute la requête voit la même version
+        snapshot = self._snapshot
+        shared = self._sharedMetrics(snapshot, prediction_info.name)
+        return self._buildResponse(shared, prediction_info, projectTitle, estimatedBudget)
+
+    def getMetricsForBatch(self, prediction_infos: List[PredictionInfo], projectTitles: List[str], estimatedBudgets: List[int]) -> List[dict]:
+        """Même résultat que getMetricsByCategory pour chaque ligne, mais les metrics partagées
+        (dont le tirage des abandonnés) ne sont calculées qu'une fois par thématique du batch"""
+        snapshot = self._snapshot
+        shared_by_category = {}
+        responses = []
+        for prediction_info, projectTitle, estimatedBudget in zip(prediction_infos, projectTitles, estimatedBudgets):
+            if prediction_info.name not in shared_by_category:
+                shared_by_category[prediction_info.name] = self._sharedMetrics(snapshot, prediction_info.name)
+            shared = shared_by_category[prediction_info.name]
+            responses.append(self._buildResponse(shared, prediction_info, projectTitle, estimatedBudget))
+        return responses
+
+    def _sharedMetrics(self, snapshot: MetricsSnapshot, predictedCategory: str) -> Optional[tuple]:
+        """Partie des metrics commune à toutes les requêtes d'une thématique : (CategoryMetrics, metrics sans quartile)"""
+        key = predictedCategory.lower()
+        if key not in snapshot.categories:
+            snapshot = self._publishCategory(predictedCategory)
+        category = snapshot.categories[key]
+        if category is None:
+            return None
+
+        pool = category.abandoned_pool
+        base = category.metrics
+        metrics_data = {
+            "startingYear": base["startingYear"],
+            "endingYear": base["endingYear"],
+            "numberOfRecords": base["numberOfRecords"],
+            "breakdownByCategory": snapshot.breakdowns[key],
+            "postalCodeDistribution": base["postalCodeDistribution"],
+            "statuses": {
+                "pieChart": base["pieChart"],
+                "abandonedExamples": random.sample(pool, min(5, len(pool)))
+            },
+            "priorityArea": base["priorityArea"],
+            "budget": base["budget"]
+        }
+        return category, metrics_data
+
+    def _publishCategory(self, predictedCategory: str) -> MetricsSnapshot:
+        """Catégorie hors dataset (ex: "Inconnu") : calculée une fois dans un nouveau snapshot publié.
+        Sous le verrou de rechargement : un rechargement concurrent ne perd pas la catégorie et le
+        reprend depuis ce snapshot."""
+        with self._reload_lock:
+            snapshot = self._snapshot
+            if predictedCategory.lower() not in snapshot.categories:
+                snapshot = snapshot.withCategories([predictedCategory])
+                self._snapshot = snapshot
+            return snapshot
+
+    @staticmethod
+    def _buildResponse(shared: Optional[tuple], prediction_info: PredictionInfo, projectTitle: str, estimatedBudget: int) -> dict:
+        if shared is None:
+            return {
+                "predictedCategory": {
+                    "name": prediction_info.name,
+                    "confidence": prediction_info.confidence,
+                    "analyse": "Aucune donnée disponible pour cette catégorie prédite",
+                    "projectTitle": projectTitle,
+                    "estimatedBudget": estimatedBudget,
+                    "metrics": None
+                }
+            }
+
+        # Seule partie propre à la requête : le quartile de l'estimatedBudget
+        category, metrics_data = shared
+        estimated_budget_quartile = None
+        if category.quantiles is not None:
+            q1, q2, q3 = category.quantiles
+            if estimatedBudget <= q1:
+                estimated_budget_quartile = 1
+            elif estimatedBudget <= q2:
+                estimated_budget_quartile = 2
+            elif estimatedBudget <= q3:
+                estimated_budget_quartile = 3
+            else:
+                estimated_budget_quartile = 4
+
+        return {
+            "predictedCategory": {
+                "name": prediction_info.name,
+                "confidence": prediction_info.confidence,
+                "analyse": prediction_info.analyse,
+                "projectTitle": projectTitle,
+                "estimatedBudget": estimatedBudget,
+                "metrics": {
+                    **metrics_data,
+                    "budget": {
+                        **metrics_data["budget"],
+                        "position": {
+                            "quartiles": category.metrics["quartiles"],
+                            "estimatedBudgetQuartile": estimated_budget_quartile
+                        }
+                    }
+                }
+            }
+        }
@@ -0,0 +1,113 @@
+# Registre des classifieurs servis par api.py
+#
+# Chaque modèle (LSTM, CamemBERT, TF-IDF) est chargé en arrière-plan par son BackgroundLoader et exposé
+# sous un nom ("lstm", "camembert", "tfidf") : les routes choisissent le modèle par requête, et tous les
+# modèles d'un même processus partagent le runtime TensorFlow / ONNX Runtime, le MetricsEngine
+# et le cache de prédictions. Les forward passes tournent sur l'InferenceExecutor du processus.
+
+import os
+from functools import partial
+from fastapi import HTTPException
+
+from batching import MicroBatcher
+from data_preparation import preprocess_text
+from lazy_loading import BackgroundLoader
+from load_model import decode_predictions, load_camembert_predictor, load_lstm_predictor, load_tfidf_predictor
+from prediction_cache import predict_cached
+
+# Micro-batching CamemBERT : attente max (ms) et taille max d'un batch de prédiction
+BATCH_MAX_WAIT_MS = float(os.environ.get("CAMEMBERT_BATCH_MAX_WAIT_MS", "5"))
+BATCH_MAX_SIZE = int(os.environ.get("CAMEMBERT_BATCH_MAX_SIZE", "16"))
+
+
+class ServedModel:
+    """Un classifieur chargé : predictor, label mapping et micro-batcher éventuel"""
+
+    def __init__(self, name, label, predictor, label_mapping, batch_size, executor, batcher=None):
+        self.name = name
+        self.label = label
+        self.predictor = predictor
+        self.label_mapping = label_mapping
+        # Taille des sous-batchs envoyés au modèle par les routes batch
+        self.batch_size = batch_size
+        self.executor = executor
+        self.batcher = batcher
+
+    async def predict(self, cache, title):
+        """PredictionInfo d'un titre : cache, sinon micro-batch (CamemBERT) ou forward pass direct (LSTM)"""
+        normalized_title = preprocess_text(title)
+        proba = cache.get(self.predictor.model_id, normalized_title)
+        if proba is None:
+            if self.batcher is not None:
+                # Tokenization + prédiction mutualisées avec les requêtes simultanées
+                proba = await self.batcher.submit(normalized_title)
+            else:
+                proba = (await self.executor.run(self.predictor.predict_proba, [normalized_title]))[0]
+            cache.put(self.predictor.model_id, normalized_title, proba)
+        return decode_predictions([proba], self.label_mapping, self.label)[0]
+
+    def predict_batch(self, cache, titles):
+        """PredictionInfo d'une liste de titres (seuls les titres absents du cache passent dans le modèle)"""
+        probas = predict_cached(cache, self.predictor, titles, self.batch_size)
+        return decode_predictions(probas, self.label_mapping, self.label)
+
+
+def load_lstm(executor):
+    # Backend d'inférence choisi par INFERENCE_BACKEND ("tf" par défaut, "onnx" sans TensorFlow)
+    lstm_predictor, label_mapping = load_lstm_predictor()
+    return ServedModel("lstm", "LSTM", lstm_predictor, label_mapping, batch_size=256, executor=executor)
+
+
+def load_camembert(executor):
+    # Padding dynamique par buckets (CAMEMBERT_LENGTH_BUCKETS) et micro-batching des requêtes concurrentes
+    camembert_predictor, label_mapping = load_camembert_predictor()
+    camembert_batcher = MicroBatcher(
+        camembert_predictor.predict_proba,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_wait_ms=BATCH_MAX_WAIT_MS,
+        executor=executor
+    )
+    return ServedModel(
+        "camembert", "CamemBERT", camembert_predictor, label_mapping,
+        batch_size=32, executor=executor, batcher=camembert_batcher
+    )
+
+
+def load_tfidf(executor):
+    # TF-IDF + régression logistique en NumPy (train_tfidf.py) : sans TensorFlow, moins d'une ms par titre
+    tfidf_predictor, label_mapping = load_tfidf_predictor()
+    return ServedModel("tfidf", "TF-IDF", tfidf_predictor, label_mapping, batch_size=1024, executor=executor)
+
+
+# Modèles disponibles : nom -> fonction de chargement (prend l'InferenceExecutor partagé)
+MODEL_LOADERS = {
+    "lstm": load_lstm,
+    "camembert": load_camembert,
+    "tfidf": load_tfidf
+}
+
+
+class ModelRegistry:
+    """Modèles servis par le processus, chargés en arrière-plan"""
+
+    def __init__(self, names, executor):
+        unknown = [name for name in names if name not in MODEL_LOADERS]
+        if unknown:
+            raise ValueError(f"Modèle(s) inconnu(s) : {unknown} (disponibles : {sorted(MODEL_LOADERS)})")
+        self.loaders = {name: BackgroundLoader(name, partial(MODEL_LOADERS[name], executor)) for name in names}
+
+    @property
+    def names(self):
+        return list(self.loaders)
+
+    def __contains__(self, name):
+        return name in self.loaders
+
+    def get(self, name):
+        """ServedModel prêt, 404 si le modèle n'est pas servi, NotReadyError (503) s'il est en chargement"""
+        if name not in self.loaders:
+            raise HTTPException(status_code=404, detail=f"Modèle inconnu : {name} (servis : {self.names})")
+        return self.loaders[name].get()
+
+    def status(self):
+        return {name: loader.status() for name, loader in self.loaders.items()}
@@ -0,0 +1,131 @@
+# Cache LRU des prédictions
+#
+# Beaucoup de requêtes /predict-category répètent un titre (formulaire re-soumis, client qui
+# renvoie la même demande après avoir seulement modifié estimatedBudget). Le vecteur de
+# probabilités ne dépend que du modèle et du titre normalisé (preprocess_text, comme à
+# l'entraînement) : il est gardé en mémoire et le forward pass est évité. Le placement du
+# budget dans les quartiles reste calculé à chaque requête par le MetricsEngine.
+#
+# Réglages :
+#   PREDICTION_CACHE_MAX_ENTRIES (10000, 0 = cache désactivé)
+#   PREDICTION_CACHE_MAX_BYTES   (64 Mo)
+#   PREDICTION_CACHE_TTL         (3600 s, 0 = pas d'expiration)
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from data_preparation import preprocess_text
+
+MAX_ENTRIES = int(os.environ.get("PREDICTION_CACHE_MAX_ENTRIES", "10000"))
+MAX_BYTES = int(os.environ.get("PREDICTION_CACHE_MAX_BYTES", str(64 * 1024**2)))
+TTL = float(os.environ.get("PREDICTION_CACHE_TTL", "3600"))
+
+
+class PredictionCache:
+    """(model_id, titre normalisé) -> probabilités, borné en entrées et en octets, avec expiration"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, ttl=TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # clé -> (probabilités, expiration, taille)
+        self._bytes = 0
+        # Les routes synchrones tournent dans le threadpool de FastAPI
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _size(key, proba):
+        return sys.getsizeof(key[0]) + sys.getsizeof(key[1]) + proba.nbytes
+
+    def get(self, model_id, title):
+        """Probabilités en cache pour ce titre normalisé, ou None"""
+        key = (model_id, title)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl > 0 and entry[1] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, model_id, title, proba):
+        if self.max_entries <= 0:
+            return
+        key = (model_id, title)
+        # Copie en lecture seule : le tableau est partagé par toutes les requêtes suivantes
+        proba = np.array(proba, dtype=np.float32)
+        proba.setflags(write=False)
+        size = self._size(key, proba)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (proba, time.monotonic() + self.ttl, size)
+            self._bytes += size
+            # Eviction des entrées les moins récemment utilisées
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def invalidate(self, model_id):
+        """Supprime les prédictions d'un modèle (artefact rechargé)"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == model_id]:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxEntries": self.max_entries,
+                "maxBytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": self.hits / lookups if lookups else 0.0
+            }
+
+
+def predict_cached(cache, predictor, titles, batch_size=None):
+    """
+    Probabilités d'une liste de titres : seuls les titres normalisés absents du cache
+    (dédupliqués) passent dans le modèle, par sous-batchs de batch_size.
+    """
+    if not titles:
+        # Batch vide (POST /predict-category/batch avec "items": []) : rien à empiler
+        return np.empty((0, 0), dtype=np.float32)
+    normalized = [preprocess_text(title) for title in titles]
+    probas = [cache.get(predictor.model_id, title) for title in normalized]
+    missing = list(dict.fromkeys(title for title, proba in zip(normalized, probas) if proba is None))
+    if missing:
+        batch_size = batch_size or len(missing)
+        computed = {}
+        for i in range(0, len(missing), batch_size):
+            batch = missing[i:i + batch_size]
+            for title, proba in zip(batch, predictor.predict_proba(batch)):
+                cache.put(predictor.model_id, title, proba)
+                computed[title] = proba
+        probas = [computed[title] if proba is None else proba for title, proba in zip(normalized, probas)]
+    return np.stack(probas)
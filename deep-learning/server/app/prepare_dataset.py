@@ -0,0 +1,172 @@
+"""
+Préparation en streaming des datasets d'entraînement
+
+Remplace utils/adapt_dataset_completed.py + la relecture et le nettoyage ligne à ligne de
+train_and_save_model.py, pour des exports volumineux (plusieurs villes) :
+- lecture de l'export brut (CSV ";") par morceaux de CHUNK_SIZE lignes, seules les colonnes utiles
+- concaténation "Titre du projet lauréat" + "Titre de l'opération" (comme adapt_dataset_completed.py)
+- mêmes nettoyages que clean_dataframe (thématiques vides ou sans lettre supprimées)
+- normalisation vectorisée des titres (preprocess_series, identique à preprocess_text)
+- écriture au fil de l'eau d'un fichier Arrow compact : titre normalisé + label encodé (int16)
+
+Mémoire bornée : un seul morceau à la fois par processus. Plusieurs exports sont préparés en
+parallèle (un processus par fichier) ; leurs labels sont encodés dans un espace commun, dans
+l'ordre alphabétique comme LabelEncoder, décrit par label_mapping.json.
+
+Utilisation (depuis /app) :
+    python prepare_dataset.py                                      # export de Paris
+    python prepare_dataset.py paris.csv lyon.csv --workers 2 --chunk-size 50000
+"""
+
+import argparse
+import json
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from data_preparation import LABEL_COLUMN, TEXT_COLUMN, clean_dataframe, preprocess_series
+from dataset_cache import DATASET_PATH
+
+PREPARED_DIR = Path(__file__).parent / "../data/prepared"
+LABEL_MAPPING_FILENAME = "label_mapping.json"
+CHUNK_SIZE = int(os.environ.get("PREPARE_CHUNK_SIZE", "50000"))
+
+TITLE_COLUMNS = ["Titre du projet lauréat", "Titre de l'opération"]
+SCHEMA = pa.schema([("text", pa.string()), ("label", pa.int16())])
+
+
+def prepared_path(csv_path, output_dir=PREPARED_DIR):
+    """Fichier Arrow préparé d'un export (même nom, extension .arrow)"""
+    return Path(output_dir) / Path(csv_path).with_suffix(".arrow").name
+
+
+def prepare_chunk(chunk):
+    """Morceau de l'export brut -> DataFrame (TEXT_COLUMN normalisé, LABEL_COLUMN nettoyé)"""
+    titles = (chunk[TITLE_COLUMNS[0]].fillna('') + ' ' + chunk[TITLE_COLUMNS[1]].fillna('')).str.strip()
+    df = pd.DataFrame({
+        # Titre vide : ligne incomplète, comme après l'aller-retour CSV de adapt_dataset_completed.py
+        TEXT_COLUMN: titles.where(titles.str.len() > 0),
+        LABEL_COLUMN: chunk[LABEL_COLUMN]
+    })
+    df = clean_dataframe(df)
+    df[TEXT_COLUMN] = preprocess_series(df[TEXT_COLUMN])
+    return df
+
+
+def stream_export(csv_path, tmp_path, chunk_size=CHUNK_SIZE):
+    """
+    Première passe : prépare un export morceau par morceau dans tmp_path, avec des labels
+    numérotés dans l'ordre d'apparition. Retourne ces labels.
+    """
+    labels = {}
+    chunks = pd.read_csv(
+        csv_path, delimiter=';', encoding='utf-8',
+        usecols=TITLE_COLUMNS + [LABEL_COLUMN], chunksize=chunk_size
+    )
+    with pa.OSFile(str(tmp_path), "wb") as sink, pa.ipc.new_file(sink, SCHEMA) as writer:
+        for chunk in chunks:
+            df = prepare_chunk(chunk)
+            for label in df[LABEL_COLUMN].unique():
+                labels.setdefault(label, len(labels))
+            codes = df[LABEL_COLUMN].map(labels).to_numpy(dtype=np.int16)
+            writer.write_batch(pa.record_batch([pa.array(df[TEXT_COLUMN], pa.string()), pa.array(codes)], schema=SCHEMA))
+    return list(labels)
+
+
+def encode_export(tmp_path, output_path, remap):
+    """Seconde passe : réécrit les labels provisoires dans l'espace commun, batch par batch"""
+    remap = np.asarray(remap, dtype=np.int16)
+    with pa.memory_map(str(tmp_path)) as source, pa.OSFile(str(output_path), "wb") as sink:
+        reader = pa.ipc.open_file(source)
+        with pa.ipc.new_file(sink, SCHEMA) as writer:
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                labels = remap[batch.column(1).to_numpy(zero_copy_only=False)]
+                writer.write_batch(pa.record_batch([batch.column(0), pa.array(labels)], schema=SCHEMA))
+    os.unlink(tmp_path)
+
+
+def _map(workers, fn, *iterables):
+    if workers <= 1:
+        return list(map(fn, *iterables))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(fn, *iterables))
+
+
+def prepare_datasets(csv_paths, output_dir=PREPARED_DIR, chunk_size=CHUNK_SIZE, workers=1):
+    """Prépare chaque export en parallèle et écrit label_mapping.json. Retourne les classes."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    workers = min(workers, len(csv_paths))
+    outputs = [prepared_path(csv_path, output_dir) for csv_path in csv_paths]
+    tmp_paths = [output.with_suffix(".arrow.tmp") for output in outputs]
+
+    print(f"🔄 Préparation de {len(csv_paths)} export(s) par morceaux de {chunk_size} lignes ({workers} processus)")
+    labels_by_export = _map(workers, stream_export, csv_paths, tmp_paths, [chunk_size] * len(csv_paths))
+
+    # Espace de labels commun à tous les exports, ordre alphabétique (comme LabelEncoder)
+    classes = sorted(set().union(*labels_by_export))
+    label_to_num = {label: i for i, label in enumerate(classes)}
+    remaps = [[label_to_num[label] for label in labels] for labels in labels_by_export]
+    _map(workers, encode_export, tmp_paths, outputs, remaps)
+
+    with open(output_dir / LABEL_MAPPING_FILENAME, 'w', encoding='utf-8') as f:
+        json.dump({
+            'num_to_label': {i: label for i, label in enumerate(classes)},
+            'label_to_num': label_to_num,
+            'num_classes': len(classes),
+            'sources': {str(csv_path): output.name for csv_path, output in zip(csv_paths, outputs)}
+        }, f, ensure_ascii=False, indent=2)
+
+    for output in outputs:
+        print(f"✅ {output} : {feather.read_table(str(output), memory_map=True).num_rows} lignes")
+    print(f"✅ {len(classes)} thématiques encodées : {output_dir / LABEL_MAPPING_FILENAME}")
+    return classes
+
+
+def is_up_to_date(csv_paths, output_dir=PREPARED_DIR):
+    """True si ces exports (et eux seuls : même espace de labels) ont été préparés depuis leur dernière modification"""
+    mapping_path = Path(output_dir) / LABEL_MAPPING_FILENAME
+    if not mapping_path.exists():
+        return False
+    with open(mapping_path, encoding='utf-8') as f:
+        if set(json.load(f)['sources']) != {str(csv_path) for csv_path in csv_paths}:
+            return False
+    for csv_path in csv_paths:
+        output = prepared_path(csv_path, output_dir)
+        if not output.exists() or os.path.getmtime(output) < os.path.getmtime(csv_path):
+            return False
+    return True
+
+
+def load_prepared_dataset(csv_paths=(DATASET_PATH,), output_dir=PREPARED_DIR):
+    """Titres normalisés, labels encodés et classes des exports préparés (préparés si besoin)"""
+    csv_paths = list(csv_paths)
+    if not is_up_to_date(csv_paths, output_dir):
+        prepare_datasets(csv_paths, output_dir)
+    with open(Path(output_dir) / LABEL_MAPPING_FILENAME, encoding='utf-8') as f:
+        mapping = json.load(f)
+    classes = [mapping['num_to_label'][str(i)] for i in range(mapping['num_classes'])]
+    tables = [feather.read_table(str(prepared_path(csv_path, output_dir)), memory_map=True) for csv_path in csv_paths]
+    table = pa.concat_tables(tables)
+    texts = np.array(table.column("text").to_pylist(), dtype=object)
+    labels = table.column("label").to_numpy().astype(np.int64)
+    return texts, labels, classes
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Prépare les exports bruts en datasets d'entraînement compacts")
+    parser.add_argument("csv_paths", nargs="*", default=[str(DATASET_PATH)], help="exports bruts (CSV ';')")
+    parser.add_argument("--output-dir", default=str(PREPARED_DIR))
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    prepare_datasets(args.csv_paths, args.output_dir, args.chunk_size, args.workers)
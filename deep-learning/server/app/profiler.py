@@ -0,0 +1,190 @@
+# Profileur par échantillonnage à la demande, pour un serveur en production
+#
+# POST /admin/profile démarre une capture : un thread relève toutes les interval_ms la pile de
+# chaque thread du processus (sys._current_frames), pendant seconds secondes ou jusqu'à la fin des
+# requests prochaines requêtes de prédiction. La réponse arrive à la fin de la capture avec les
+# fonctions les plus présentes (temps propre et cumulé) ; GET /admin/profile/collapsed renvoie la
+# dernière capture au format "piles repliées" (flamegraph.pl, speedscope, inferno).
+#
+# Coût nul hors capture : pas de thread, pas de hook de profilage, un test "is None" par requête.
+# Les piles des threads inactifs (pool d'inférence en attente, boucle asyncio dans select...) sont
+# ignorées sauf avec idle=true.
+#
+# Routes protégées par ADMIN_TOKEN (en-tête "Authorization: Bearer <token>") ; sans ADMIN_TOKEN,
+# elles répondent 404.
+
+import asyncio
+import hmac
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from fastapi import Depends, FastAPI, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+MAX_SECONDS = float(os.environ.get("PROFILE_MAX_SECONDS", "300"))
+TOP_FUNCTIONS = 30
+# Dernière frame Python d'un thread qui attend : (fichier, fonction)
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("base_events.py", "_run_once"),
+}
+
+
+class ProfilerBusyError(Exception):
+    pass
+
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class ProfileCapture:
+    """Piles échantillonnées d'une capture : (nom du thread, piles racine -> feuille) -> nombre d'échantillons"""
+
+    def __init__(self, seconds, max_requests, interval, include_idle):
+        self.seconds = seconds
+        self.max_requests = max_requests
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks = Counter()
+        self.ticks = 0
+        self.requests = 0
+        self.duration = None
+        self.stop = threading.Event()
+        self.finished = threading.Event()
+
+    def collapsed(self):
+        """Une ligne par pile : "thread;racine;...;feuille nombre" """
+        lines = [
+            ";".join([thread, *map(frame_label, stack)]) + f" {count}"
+            for (thread, stack), count in self.stacks.most_common()
+        ]
+        return "\n".join(lines) + "\n"
+
+    def summary(self, limit=TOP_FUNCTIONS):
+        self_counts, total_counts = Counter(), Counter()
+        for (_, stack), count in self.stacks.items():
+            self_counts[stack[-1]] += count
+            for code in set(stack):
+                total_counts[code] += count
+        samples = sum(self.stacks.values()) or 1
+        top = [
+            {
+                "function": frame_label(code),
+                "selfSamples": self_counts[code],
+                "selfPercent": round(100 * self_counts[code] / samples, 2),
+                "totalSamples": total_counts[code],
+                "totalPercent": round(100 * total_counts[code] / samples, 2)
+            }
+            for code, _ in sorted(total_counts.items(), key=lambda item: (-self_counts[item[0]], -item[1]))[:limit]
+        ]
+        return {
+            "durationSeconds": round(self.duration or 0.0, 3),
+            "intervalMs": self.interval * 1000,
+            "ticks": self.ticks,
+            "samples": sum(self.stacks.values()),
+            "requests": self.requests,
+            "topFunctions": top
+        }
+
+
+class SamplingProfiler:
+    """Une capture à la fois ; la dernière terminée reste disponible"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._capture = None
+        self.last = None
+
+    def start(self, seconds, max_requests=None, interval=0.005, include_idle=False):
+        with self._lock:
+            if self._capture is not None:
+                raise ProfilerBusyError()
+            capture = self._capture = ProfileCapture(seconds, max_requests, interval, include_idle)
+        threading.Thread(target=self._run, args=(capture,), name="profiler", daemon=True).start()
+        return capture
+
+    def request_done(self):
+        """Appelé à la fin de chaque requête de prédiction (sans effet hors capture)"""
+        capture = self._capture
+        if capture is None:
+            return
+        with self._lock:
+            capture.requests += 1
+            if capture.max_requests and capture.requests >= capture.max_requests:
+                capture.stop.set()
+
+    def _run(self, capture):
+        own_ident = threading.get_ident()
+        start = time.perf_counter()
+        deadline = start + capture.seconds
+        try:
+            while not capture.stop.wait(capture.interval) and time.perf_counter() < deadline:
+                self._sample(capture, own_ident)
+        finally:
+            capture.duration = time.perf_counter() - start
+            with self._lock:
+                self._capture = None
+                self.last = capture
+            capture.finished.set()
+
+    @staticmethod
+    def _sample(capture, own_ident):
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        capture.ticks += 1
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            leaf = stack[0]
+            if not capture.include_idle and (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_FRAMES:
+                continue
+            stack.reverse()
+            capture.stacks[(names.get(ident, str(ident)), tuple(stack))] += 1
+
+
+def add_profiler_routes(app: FastAPI, profiler, admin_token=ADMIN_TOKEN):
+    """POST /admin/profile et GET /admin/profile/collapsed, protégées par admin_token"""
+
+    def check_token(authorization: str = Header(None)):
+        # Dépendance des routes : vérifiée avant la validation des paramètres (pas de 422 sans jeton)
+        # 404 sans jeton configuré : les routes n'existent pas pour l'extérieur
+        if not admin_token:
+            raise HTTPException(status_code=404, detail="Not Found")
+        scheme, _, token = (authorization or "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), admin_token.encode()):
+            raise HTTPException(status_code=401, detail="Jeton d'administration invalide", headers={"WWW-Authenticate": "Bearer"})
+
+    @app.post("/admin/profile", dependencies=[Depends(check_token)])
+    async def profile(
+        seconds: float = Query(10.0, gt=0, le=MAX_SECONDS),
+        requests: int = Query(None, gt=0, description="arrêt après ce nombre de requêtes de prédiction"),
+        interval_ms: float = Query(5.0, ge=1, le=1000),
+        idle: bool = False
+    ):
+        try:
+            capture = profiler.start(seconds, requests, interval_ms / 1000, idle)
+        except ProfilerBusyError:
+            raise HTTPException(status_code=409, detail="Une capture est déjà en cours")
+        # Attente hors de la boucle asyncio : les requêtes profilées continuent d'être servies
+        await asyncio.get_running_loop().run_in_executor(None, capture.finished.wait)
+        return capture.summary()
+
+    @app.get("/admin/profile/collapsed", response_class=PlainTextResponse, dependencies=[Depends(check_token)])
+    def collapsed():
+        if profiler.last is None:
+            raise HTTPException(status_code=404, detail="Aucune capture terminée")
+        return PlainTextResponse(
+            profiler.last.collapsed(),
+            headers={"Content-Disposition": 'attachment; filename="profile.collapsed.txt"'}
+        )
@@ -0,0 +1,133 @@
+"""
+Quantification INT8 post-entraînement du modèle CamemBERT
+
+Part de l'export ONNX float32 (export_onnx.py) et produit une version INT8 :
+- mode "dynamic" (défaut) : poids en INT8, activations quantifiées à la volée.
+  C'est le mode recommandé pour les transformers sur CPU.
+- mode "static" : poids et activations en INT8, avec des plages d'activation calibrées
+  sur un échantillon stratifié du train set de dataset-for-training-completed.csv
+
+Le rapport compare le modèle float et le modèle INT8 sur le même test set stratifié que
+train_and_save_model.py : accuracy (et son delta), accord des prédictions, taille et latence.
+Il est aussi écrit en json à côté du modèle.
+
+Utilisation (depuis /app) :
+    python quantize_camembert.py [--mode dynamic|static] [--calibration-size 300]
+Puis servir le modèle quantifié : INFERENCE_BACKEND=onnx CAMEMBERT_QUANTIZED=1 python api_camembert.py
+"""
+
+import argparse
+import json
+import os
+import time
+import numpy as np
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+from onnxruntime.quantization import (
+    CalibrationDataReader, QuantFormat, QuantType, quantize_dynamic, quantize_static
+)
+
+from backends import OnnxRuntimeBackend
+from data_preparation import SEED, TEXT_COLUMN, LABEL_COLUMN, load_training_dataframe, split_train_val_test
+from load_model import CamembertPredictor, ONNX_INT8_MODEL_PATH, ONNX_MODEL_PATH, load_camembert_tokenizer
+
+REPORT_PATH = "../model/camembert/camembert_quantization_report.json"
+BATCH_SIZE = 32
+CALIBRATION_BATCH_SIZE = 16
+LATENCY_SAMPLES = 200
+
+
+class TitlesCalibrationReader(CalibrationDataReader):
+    """Fournit à ONNX Runtime les entrées tokenisées de l'échantillon de calibration"""
+
+    def __init__(self, encoder, titles):
+        self._batches = iter([
+            dict(zip(("input_ids", "attention_mask"), encoder.encode(titles[i:i + CALIBRATION_BATCH_SIZE])))
+            for i in range(0, len(titles), CALIBRATION_BATCH_SIZE)
+        ])
+
+    def get_next(self):
+        return next(self._batches, None)
+
+
+def evaluate(predictor, X_test, y_test):
+    probas = np.concatenate([predictor.predict_proba(X_test[i:i + BATCH_SIZE]) for i in range(0, len(X_test), BATCH_SIZE)])
+    predictor.predict_proba(X_test[:1])
+    timings = []
+    for text in X_test[:LATENCY_SAMPLES]:
+        start = time.perf_counter()
+        predictor.predict_proba([text])
+        timings.append((time.perf_counter() - start) * 1000)
+    predictions = probas.argmax(axis=1)
+    return predictions, float((predictions == y_test).mean()), float(np.percentile(timings, 50))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantification INT8 de CamemBERT (ONNX Runtime)")
+    parser.add_argument("--mode", choices=["dynamic", "static"], default="dynamic")
+    parser.add_argument("--calibration-size", type=int, default=300, help="titres du train set pour la calibration (mode static)")
+    args = parser.parse_args()
+
+    print("📥 Reconstitution des splits d'entraînement...")
+    df = load_training_dataframe()
+    y_all = LabelEncoder().fit_transform(df[LABEL_COLUMN])
+    X_train, _, X_test, y_train, _, y_test = split_train_val_test(df[TEXT_COLUMN].values, y_all)
+
+    tokenizer_camembert = load_camembert_tokenizer()
+    encoder = CamembertPredictor(None, tokenizer_camembert)
+
+    print(f"🔄 Quantification INT8 ({args.mode})...")
+    if args.mode == "dynamic":
+        quantize_dynamic(ONNX_MODEL_PATH, ONNX_INT8_MODEL_PATH, weight_type=QuantType.QInt8)
+    else:
+        # Echantillon stratifié du train set : le test set ne sert qu'à l'évaluation
+        X_calibration, _ = train_test_split(
+            X_train, train_size=args.calibration_size, random_state=SEED, stratify=y_train
+        )
+        quantize_static(
+            ONNX_MODEL_PATH,
+            ONNX_INT8_MODEL_PATH,
+            TitlesCalibrationReader(encoder, list(X_calibration)),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8
+        )
+    print(f"✅ Modèle INT8 sauvegardé : {ONNX_INT8_MODEL_PATH}")
+
+    print("📊 Evaluation float32 vs INT8 sur le test set...")
+    float_predictor = CamembertPredictor(OnnxRuntimeBackend(ONNX_MODEL_PATH), tokenizer_camembert)
+    int8_predictor = CamembertPredictor(OnnxRuntimeBackend(ONNX_INT8_MODEL_PATH), tokenizer_camembert)
+    float_predictions, float_accuracy, float_latency = evaluate(float_predictor, X_test, y_test)
+    int8_predictions, int8_accuracy, int8_latency = evaluate(int8_predictor, X_test, y_test)
+
+    report = {
+        "mode": args.mode,
+        "test_size": len(X_test),
+        "float32": {
+            "accuracy": float_accuracy,
+            "latency_p50_ms": float_latency,
+            "size_mb": os.path.getsize(ONNX_MODEL_PATH) / (1024**2)
+        },
+        "int8": {
+            "accuracy": int8_accuracy,
+            "latency_p50_ms": int8_latency,
+            "size_mb": os.path.getsize(ONNX_INT8_MODEL_PATH) / (1024**2)
+        },
+        "accuracy_delta": int8_accuracy - float_accuracy,
+        "prediction_agreement": float((float_predictions == int8_predictions).mean())
+    }
+    if args.mode == "static":
+        report["calibration_size"] = args.calibration_size
+    with open(REPORT_PATH, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"   Accuracy float32 : {float_accuracy:.4f} | INT8 : {int8_accuracy:.4f} (delta {report['accuracy_delta']:+.4f})")
+    print(f"   Accord des prédictions : {report['prediction_agreement'] * 100:.2f}%")
+    print(f"   Taille : {report['float32']['size_mb']:.0f} MB -> {report['int8']['size_mb']:.0f} MB")
+    print(f"   Latence unitaire p50 : {float_latency:.1f} ms -> {int8_latency:.1f} ms")
+    print(f"✅ Rapport sauvegardé : {REPORT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
-from pydantic import BaseModel
+import os
+from pydantic import BaseModel, ConfigDict, Field
 from typing import List, Optional
 
+# Titres acceptés par requête /batch (au-delà : 422) : un batch n'occupe qu'une place dans la file
+# d'inférence (INFERENCE_MAX_QUEUE), sa taille doit donc rester bornée
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "256"))
+
 # ============== Utils Models ==============
 class PredictionInfo(BaseModel):
     name: str
@@ -11,6 +16,19 @@ class PredictionInfo(BaseModel):
 class PredictRequest(BaseModel):
     projectTitle: str
     estimatedBudget: int
+    model: Optional[str] = None  # "lstm", "camembert", "tfidf" ou "cascade" (api.py)
+
+class BatchPredictItem(BaseModel):
+    # Pas de champ "model" par titre : le modèle est celui du batch (champ "model" ou chemin).
+    # Un champ inconnu, dont "model", est refusé (422) plutôt qu'ignoré
+    model_config = ConfigDict(extra="forbid")
+
+    projectTitle: str
+    estimatedBudget: int
+
+class BatchPredictRequest(BaseModel):
+    items: List[BatchPredictItem] = Field(max_length=BATCH_MAX_ITEMS)
+    model: Optional[str] = None
 
 # ============== Response Models ==============
 class CategoryBreakdown(BaseModel):
@@ -80,3 +98,6 @@ class PredictedCategory(BaseModel):
 
 class PredictResponse(BaseModel):
     predictedCategory: PredictedCategory
+
+class BatchPredictResponse(BaseModel):
+    predictions: List[PredictedCategory]
@@ -0,0 +1,90 @@
+"""
+Scoring hors-ligne d'un CSV complet avec le modèle LSTM, CamemBERT ou TF-IDF
+
+Le CSV d'entrée est lu par morceaux (chunks) et chaque morceau est prédit par batchs,
+puis ajouté immédiatement au CSV de sortie : la mémoire reste bornée quelle que soit
+la taille du fichier, et un scoring interrompu garde tout ce qui a déjà été écrit.
+
+Les titres sont normalisés (preprocess_text) puis prédits par predict_cached, comme dans l'api :
+scores hors-ligne et en ligne identiques. Les titres répétés d'un morceau ne sont prédits qu'une fois.
+
+Colonnes ajoutées : predictedCategory, confidence
+(+ estimatedBudgetQuartile si une colonne de budget est fournie)
+
+Utilisation (depuis /app) :
+    python score_csv.py ../data/dataset-for-training-completed.csv predictions.csv --model lstm
+    python score_csv.py projets.csv predictions.csv --model camembert --budget-column "Budget global du projet lauréat"
+"""
+
+import argparse
+import time
+import pandas as pd
+
+from data_preparation import TEXT_COLUMN
+from backends import INFERENCE_BACKEND
+from load_model import decode_predictions, load_camembert_predictor, load_lstm_predictor, load_tfidf_predictor
+from prediction_cache import PredictionCache, predict_cached
+
+MODEL_LABELS = {"lstm": "LSTM", "camembert": "CamemBERT", "tfidf": "TF-IDF"}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Prédit la thématique de chaque ligne d'un CSV")
+    parser.add_argument("input", help="CSV à scorer")
+    parser.add_argument("output", help="CSV de sortie (écrit au fil de l'eau)")
+    parser.add_argument("--model", choices=sorted(MODEL_LABELS), default="lstm")
+    parser.add_argument("--backend", choices=["tf", "onnx"], default=INFERENCE_BACKEND)
+    parser.add_argument("--text-column", default=TEXT_COLUMN, help="colonne contenant les titres")
+    parser.add_argument("--budget-column", default=None, help="colonne de budget pour calculer le quartile")
+    parser.add_argument("--delimiter", default=",")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="lignes lues par morceau")
+    parser.add_argument("--batch-size", type=int, default=64, help="titres par forward pass")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.model == "lstm":
+        predictor, label_mapping = load_lstm_predictor(args.backend)
+    elif args.model == "tfidf":
+        predictor, label_mapping = load_tfidf_predictor()
+    else:
+        predictor, label_mapping = load_camembert_predictor(args.backend)
+    # Cache désactivé : seuls la normalisation et le dédoublonnage de predict_cached servent ici
+    cache = PredictionCache(max_entries=0)
+    metrics_engine = None
+    if args.budget_column:
+        from metrics_engine import MetricsEngine
+        metrics_engine = MetricsEngine()
+
+    print(f"🔄 Scoring de {args.input} avec le modèle {MODEL_LABELS[args.model]}...")
+    start = time.perf_counter()
+    total = 0
+    chunks = pd.read_csv(args.input, delimiter=args.delimiter, encoding='utf-8', chunksize=args.chunk_size)
+    for chunk_index, chunk in enumerate(chunks):
+        titles = chunk[args.text_column].fillna('').astype(str).tolist()
+        probas = predict_cached(cache, predictor, titles, args.batch_size)
+        prediction_infos = decode_predictions(probas, label_mapping, MODEL_LABELS[args.model])
+
+        chunk["predictedCategory"] = [info.name for info in prediction_infos]
+        chunk["confidence"] = [round(info.confidence, 4) for info in prediction_infos]
+        if metrics_engine is not None:
+            budgets = pd.to_numeric(chunk[args.budget_column], errors='coerce').fillna(0).astype(int).tolist()
+            responses = metrics_engine.getMetricsForBatch(prediction_infos, titles, budgets)
+            chunk["estimatedBudgetQuartile"] = [
+                response["predictedCategory"]["metrics"]["budget"]["position"]["estimatedBudgetQuartile"]
+                if response["predictedCategory"]["metrics"] else None
+                for response in responses
+            ]
+
+        # Ajout incrémental : l'en-tête n'est écrit qu'avec le premier morceau
+        chunk.to_csv(args.output, mode='w' if chunk_index == 0 else 'a', header=chunk_index == 0, index=False, encoding='utf-8')
+        total += len(chunk)
+        elapsed = time.perf_counter() - start
+        print(f"   {total} lignes scorées ({total / elapsed:.0f} lignes/s)")
+
+    print(f"✅ Prédictions écrites dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Service multi-processus avec poids et metrics partagés
+
+Plusieurs workers uvicorn qui chargeaient chacun leur copie du modèle et du dataset voyaient la
+mémoire croître linéairement. Ici le processus parent prépare tout une seule fois puis forke :
+- poids ONNX : copie du modèle avec poids externes (.shared.onnx + .shared.weights) que ONNX Runtime
+  mappe en mémoire dans chaque worker. Les pages appartiennent au page cache, communes à tous.
+- metrics : le MetricsEngine (dataset + metrics précalculées par thématique) est construit dans le
+  parent et hérité en copy-on-write. gc.freeze() évite que le ramasse-miettes des workers ne
+  touche ces objets et ne force la copie de leurs pages.
+- les workers acceptent les connexions sur la même socket, ouverte par le parent.
+- rechargement des metrics (METRICS_RELOAD_INTERVAL) dans le parent seul : quand le CSV change,
+  le parent reconstruit le snapshot une fois puis remplace les workers un par un. Chaque nouveau
+  worker hérite du nouveau snapshot et n'ouvre la socket qu'une fois ses chargements terminés,
+  l'ancien est alors arrêté proprement. Aucun worker ne reconstruit de copie privée des metrics.
+
+Le backend TensorFlow ne supporte pas le fork : avec INFERENCE_BACKEND=tf chaque worker charge
+sa propre copie du modèle (seules les metrics sont partagées).
+
+Un worker qui meurt est relancé. S'il meurt dans les WORKER_STARTUP_GRACE secondes suivant son
+fork (modèle introuvable, port, mémoire...), la relance attend WORKER_RESTART_BACKOFF secondes,
+doublées à chaque échec consécutif, et le service s'arrête après WORKER_MAX_STARTUP_FAILURES
+échecs de démarrage consécutifs plutôt que de reforker en boucle.
+
+Utilisation (depuis /app) :
+    INFERENCE_BACKEND=onnx python serve_multiprocess.py --workers 4 --memory-report 30
+"""
+
+import os
+
+# Avant tout import des backends : poids mappés en mémoire et un seul thread d'inférence par worker
+os.environ.setdefault("ONNX_SHARED_WEIGHTS", "1")
+os.environ.setdefault("INFERENCE_WORKERS", "1")
+
+import argparse
+import gc
+import select
+import signal
+import socket
+import sys
+import time
+import traceback
+import uvicorn
+
+from api import SERVED_MODELS, create_app
+from backends import INFERENCE_BACKEND, ONNX_SHARED_WEIGHTS, shared_weights_path
+from load_model import CAMEMBERT_QUANTIZED, ONNX_INT8_MODEL_PATH, ONNX_LSTM_PATH, ONNX_MODEL_PATH
+from metrics_engine import RELOAD_INTERVAL, MetricsEngine
+
+# Relance des workers : un arrêt avant WORKER_STARTUP_GRACE secondes compte comme un échec de démarrage
+STARTUP_GRACE = float(os.environ.get("WORKER_STARTUP_GRACE", "10"))
+RESTART_BACKOFF = float(os.environ.get("WORKER_RESTART_BACKOFF", "1"))
+MAX_RESTART_BACKOFF = 30.0
+MAX_STARTUP_FAILURES = int(os.environ.get("WORKER_MAX_STARTUP_FAILURES", "5"))
+# Délai maximal de chargement d'un worker de remplacement avant abandon du remplacement
+READY_TIMEOUT = float(os.environ.get("WORKER_READY_TIMEOUT", "300"))
+# Période de la boucle de supervision (récolte des workers, vérification du CSV)
+POLL_INTERVAL = 0.5
+
+# Artefacts ONNX servis par modèle du registre
+ONNX_PATHS = {
+    "lstm": ONNX_LSTM_PATH,
+    "camembert": ONNX_INT8_MODEL_PATH if CAMEMBERT_QUANTIZED else ONNX_MODEL_PATH
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Sert api.py sur plusieurs processus avec poids et metrics partagés")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--models", default=",".join(SERVED_MODELS), help="modèles servis (SERVED_MODELS)")
+    parser.add_argument("--memory-report", type=float, default=0, help="affiche la mémoire des workers toutes les N secondes")
+    return parser.parse_args()
+
+
+def prepare_shared_weights(models):
+    """Prépare les poids externes de chaque modèle et les précharge dans le page cache"""
+    for name in models:
+        if name not in ONNX_PATHS:
+            # TF-IDF : petits tableaux NumPy, chargés par chaque worker
+            continue
+        _, weights_path = shared_weights_path(ONNX_PATHS[name])
+        fd = os.open(weights_path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+
+
+def worker_memory(pid):
+    """Rss, Pss et mémoire privée (Mo) d'un processus, d'après /proc/<pid>/smaps_rollup"""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    }
+
+
+def print_memory_report(workers):
+    print("📊 Mémoire des workers (Mo) : RSS | PSS | privée")
+    for pid in sorted(workers):
+        try:
+            memory = worker_memory(pid)
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+        print(f"   worker {workers[pid]} (pid {pid}) : {memory['rss']:.0f} | {memory['pss']:.0f} | {memory['private']:.0f}")
+
+
+def wait_loaders(app):
+    """Lance les chargements de l'application et attend leur fin. Retourne True si tous ont réussi."""
+    for loader in app.state.loaders:
+        loader.start()
+    while any(loader.state in ("pending", "loading") for loader in app.state.loaders):
+        time.sleep(0.1)
+    return all(loader.ready for loader in app.state.loaders)
+
+
+def wait_ready(ready_fd, timeout=READY_TIMEOUT):
+    """Attend le signal d'un worker de remplacement : True s'il est prêt à servir"""
+    try:
+        readable, _, _ = select.select([ready_fd], [], [], timeout)
+        return bool(readable) and os.read(ready_fd, 1) == b"1"
+    finally:
+        os.close(ready_fd)
+
+
+def run_worker(app, sock, ready_fd=None):
+    # Gestion de SIGINT / SIGTERM par uvicorn (arrêt propre du worker)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.setitimer(signal.ITIMER_REAL, 0)
+    if ready_fd is not None:
+        # Worker de remplacement : la socket n'est servie qu'une fois les modèles chargés (pas de 503),
+        # le lifespan trouve les chargements déjà faits
+        ready = wait_loaders(app)
+        os.write(ready_fd, b"1" if ready else b"0")
+        os.close(ready_fd)
+        if not ready:
+            return
+    uvicorn.Server(uvicorn.Config(app, log_level="info")).run(sockets=[sock])
+
+
+def main():
+    args = parse_args()
+    models = args.models.split(",")
+
+    # 1. Chargements uniques dans le parent, avant le fork
+    metrics_engine = MetricsEngine()
+    if INFERENCE_BACKEND == "onnx" and ONNX_SHARED_WEIGHTS:
+        prepare_shared_weights(models)
+    else:
+        print("⚠️  Backend TensorFlow : chaque worker charge sa propre copie du modèle")
+    # Les modèles sont chargés par chaque worker (ONNX Runtime et TensorFlow ne supportent pas le fork
+    # d'une session active), mais depuis les poids mappés : pas de copie par worker
+    app = create_app(models=models, metrics_engine=metrics_engine)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    # 2. Objets existants exclus du ramasse-miettes : leurs pages restent partagées après le fork
+    gc.collect()
+    gc.freeze()
+
+    # 3. Fork des workers, relancés s'ils meurent
+    workers = {}
+    started_at = {}
+    startup_failures = [0] * args.workers
+    # Workers remplacés après un rechargement des metrics : arrêtés volontairement, pas relancés
+    retiring = set()
+    stopping = False
+    exit_code = 0
+
+    def spawn(index, wait_for_ready=False):
+        """Fork d'un worker ; wait_for_ready : retourne le descripteur signalant qu'il est prêt"""
+        ready_read, ready_write = os.pipe() if wait_for_ready else (None, None)
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                if ready_read is not None:
+                    os.close(ready_read)
+                run_worker(app, sock, ready_write)
+            except BaseException:
+                traceback.print_exc()
+                status = 1
+            finally:
+                os._exit(status)
+        workers[pid] = index
+        started_at[index] = time.monotonic()
+        if ready_write is not None:
+            os.close(ready_write)
+        return pid, ready_read
+
+    def replace_workers():
+        """Remplace chaque worker par un fork portant le nouveau snapshot, un à la fois"""
+        for old_pid, index in sorted(workers.items(), key=lambda item: item[1]):
+            if stopping:
+                return
+            if old_pid in retiring:
+                continue
+            pid, ready_fd = spawn(index, wait_for_ready=True)
+            if not wait_ready(ready_fd):
+                # L'ancien worker continue de servir l'ancien snapshot
+                print(f"⚠️  Worker {index} : remplaçant (pid {pid}) pas prêt, remplacement interrompu")
+                retiring.add(pid)
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                return
+            retiring.add(old_pid)
+            try:
+                os.kill(old_pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        print("✅ Workers relancés avec les metrics rechargées")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for index in range(args.workers):
+        spawn(index)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    if args.memory_report > 0:
+        signal.signal(signal.SIGALRM, lambda signum, frame: print_memory_report(workers))
+        signal.setitimer(signal.ITIMER_REAL, args.memory_report, args.memory_report)
+    print(f"✅ {args.workers} workers sur http://{args.host}:{args.port}")
+
+    next_reload_check = time.monotonic() + RELOAD_INTERVAL
+    while workers:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid == 0:
+            if not stopping and RELOAD_INTERVAL > 0 and time.monotonic() >= next_reload_check:
+                # Rechargement dans le parent seul, puis nouveaux forks qui partagent le nouveau snapshot
+                if metrics_engine.reloadIfChanged():
+                    gc.collect()
+                    gc.freeze()
+                    replace_workers()
+                next_reload_check = time.monotonic() + RELOAD_INTERVAL
+            time.sleep(POLL_INTERVAL)
+            continue
+        index = workers.pop(pid, None)
+        if pid in retiring:
+            retiring.discard(pid)
+            continue
+        if stopping or index is None:
+            continue
+        uptime = time.monotonic() - started_at[index]
+        if uptime >= STARTUP_GRACE:
+            startup_failures[index] = 0
+            print(f"⚠️  Worker {index} (pid {pid}) arrêté (code {os.waitstatus_to_exitcode(status)}), relance")
+            spawn(index)
+            continue
+        startup_failures[index] += 1
+        if startup_failures[index] >= MAX_STARTUP_FAILURES:
+            print(f"❌ Worker {index} : {startup_failures[index]} échecs de démarrage consécutifs, arrêt du service")
+            exit_code = 1
+            stop(None, None)
+            continue
+        delay = min(RESTART_BACKOFF * 2 ** (startup_failures[index] - 1), MAX_RESTART_BACKOFF)
+        print(
+            f"⚠️  Worker {index} (pid {pid}) arrêté après {uptime:.1f} s (code {os.waitstatus_to_exitcode(status)}),"
+            f" relance dans {delay:.1f} s ({startup_failures[index]}/{MAX_STARTUP_FAILURES})"
+        )
+        time.sleep(delay)
+        # SIGTERM reçu pendant l'attente
+        if not stopping:
+            spawn(index)
+    sock.close()
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
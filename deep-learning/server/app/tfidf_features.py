@@ -0,0 +1,137 @@
+# Modèle TF-IDF + classifieur linéaire, servi sans TensorFlow ni scikit-learn
+#
+# train_tfidf.py entraîne un FeatureUnion de deux TfidfVectorizer (n-grammes de mots et de
+# caractères "char_wb") suivi d'une LogisticRegression, puis l'exporte dans un seul .npz compressé :
+# vocabulaires (chaînes), idf et poids en float32, sans pickle. À l'inférence, TfidfEncoder
+# reproduit l'encodage scikit-learn (mêmes n-grammes, tf sublinéaire, normalisation L2 par
+# vectorizer) directement en matrice creuse CSR (indptr, indices, data), et LinearBackend
+# (backends.py) calcule softmax(X·W + b) avec NumPy seul.
+#
+# Fichiers : TFIDF_MODEL_DIR (app/model/tfidf, à côté du LSTM model/lstm2) / tfidf-titles-budgets-participatif.npz
+#            + tfidf_titles_label_mapping.json (même format que les autres modèles)
+
+import os
+import re
+import numpy as np
+from collections import Counter
+from pathlib import Path
+
+TFIDF_MODEL_DIR = Path(os.environ.get("TFIDF_MODEL_DIR", Path(__file__).parent / "model/tfidf"))
+TFIDF_MODEL_PATH = TFIDF_MODEL_DIR / "tfidf-titles-budgets-participatif.npz"
+LABEL_MAPPING_TFIDF_PATH = TFIDF_MODEL_DIR / "tfidf_titles_label_mapping.json"
+
+# token_pattern et normalisation des espaces par défaut de scikit-learn
+WORD_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+WHITE_SPACES = re.compile(r"\s\s+")
+
+
+class TfidfEncoder:
+    """Équivalent de FeatureUnion([TfidfVectorizer(mots), TfidfVectorizer(analyzer='char_wb')]).transform"""
+
+    def __init__(self, word_vocabulary, word_idf, char_vocabulary, char_idf,
+                 word_ngram_range=(1, 2), char_ngram_range=(2, 5), sublinear_tf=True):
+        # Vocabulaires dans l'ordre des colonnes ; les colonnes char suivent les colonnes mots
+        self.word_index = {term: i for i, term in enumerate(word_vocabulary)}
+        self.char_index = {term: i + len(word_vocabulary) for i, term in enumerate(char_vocabulary)}
+        self.idf = np.concatenate([word_idf, char_idf]).astype(np.float32)
+        self.word_ngram_range = tuple(word_ngram_range)
+        self.char_ngram_range = tuple(char_ngram_range)
+        self.sublinear_tf = sublinear_tf
+
+    @property
+    def num_features(self):
+        return len(self.idf)
+
+    @classmethod
+    def from_sklearn(cls, feature_union):
+        word_vectorizer, char_vectorizer = (vectorizer for _, vectorizer in feature_union.transformer_list)
+        return cls(**_vectorizer_arrays(word_vectorizer, char_vectorizer))
+
+    def word_ngrams(self, text):
+        tokens = WORD_PATTERN.findall(text.lower())
+        min_n, max_n = self.word_ngram_range
+        ngrams = list(tokens) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n, len(tokens)) + 1):
+            ngrams.extend(" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+        return ngrams
+
+    def char_ngrams(self, text):
+        """n-grammes de caractères de chaque mot entouré d'espaces (analyzer='char_wb')"""
+        min_n, max_n = self.char_ngram_range
+        ngrams = []
+        for word in WHITE_SPACES.sub(" ", text.lower()).split():
+            word = f" {word} "
+            for n in range(min_n, max_n + 1):
+                if n >= len(word):
+                    # Mot pas plus long que n : compté une seule fois, en entier
+                    ngrams.append(word)
+                    break
+                ngrams.extend(word[i:i + n] for i in range(len(word) - n + 1))
+        return ngrams
+
+    def _row(self, ngrams, index):
+        counts = Counter(column for column in map(index.get, ngrams) if column is not None)
+        if not counts:
+            return [], []
+        columns = sorted(counts)
+        tf = np.fromiter((counts[c] for c in columns), dtype=np.float32, count=len(columns))
+        if self.sublinear_tf:
+            tf = np.log(tf) + 1
+        values = tf * self.idf[columns]
+        return columns, values / np.sqrt(np.dot(values, values))
+
+    def encode(self, titles):
+        """Batch de titres -> matrice CSR (indptr, indices, data) de forme (batch, num_features)"""
+        indptr = np.zeros(len(titles) + 1, dtype=np.int32)
+        indices, data = [], []
+        for row, title in enumerate(titles):
+            length = 0
+            for ngrams, index in ((self.word_ngrams(title), self.word_index), (self.char_ngrams(title), self.char_index)):
+                columns, values = self._row(ngrams, index)
+                indices.extend(columns)
+                data.extend(values)
+                length += len(columns)
+            indptr[row + 1] = indptr[row] + length
+        return indptr, np.array(indices, dtype=np.int32), np.array(data, dtype=np.float32)
+
+
+def _vectorizer_arrays(word_vectorizer, char_vectorizer):
+    """Vocabulaires (ordonnés par colonne), idf et réglages des deux TfidfVectorizer"""
+    return {
+        "word_vocabulary": word_vectorizer.get_feature_names_out().astype(str),
+        "word_idf": word_vectorizer.idf_.astype(np.float32),
+        "char_vocabulary": char_vectorizer.get_feature_names_out().astype(str),
+        "char_idf": char_vectorizer.idf_.astype(np.float32),
+        "word_ngram_range": np.array(word_vectorizer.ngram_range),
+        "char_ngram_range": np.array(char_vectorizer.ngram_range),
+        "sublinear_tf": np.array(word_vectorizer.sublinear_tf)
+    }
+
+
+def save_tfidf_model(feature_union, classifier, path=TFIDF_MODEL_PATH):
+    """Vocabulaires, idf et poids du classifieur dans un .npz compressé (lisible sans pickle)"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    word_vectorizer, char_vectorizer = (vectorizer for _, vectorizer in feature_union.transformer_list)
+    np.savez_compressed(
+        path,
+        **_vectorizer_arrays(word_vectorizer, char_vectorizer),
+        # (num_features, num_classes) : une ligne de poids par colonne de la matrice TF-IDF
+        weights=classifier.coef_.T.astype(np.float32),
+        bias=classifier.intercept_.astype(np.float32)
+    )
+
+
+def load_tfidf_model(path=TFIDF_MODEL_PATH):
+    """.npz exporté -> (TfidfEncoder, LinearBackend)"""
+    from backends import LinearBackend
+
+    with np.load(path, allow_pickle=False) as arrays:
+        encoder = TfidfEncoder(
+            arrays["word_vocabulary"].tolist(), arrays["word_idf"],
+            arrays["char_vocabulary"].tolist(), arrays["char_idf"],
+            word_ngram_range=arrays["word_ngram_range"].tolist(),
+            char_ngram_range=arrays["char_ngram_range"].tolist(),
+            sublinear_tf=bool(arrays["sublinear_tf"])
+        )
+        backend = LinearBackend(arrays["weights"], arrays["bias"])
+    return encoder, backend
@@ -0,0 +1,126 @@
+"""
+Dataset d'entraînement CamemBERT pré-tokenizé et pipeline tf.data
+
+- cache disque des input_ids / attention_mask (npz), tokenizés une seule fois. La clé combine
+  la version du tokenizer (classe, version de transformers, empreinte du vocabulaire), MAX_LENGTH
+  et le hash des titres : un changement de l'un d'eux produit un nouveau fichier de cache.
+- pipeline tf.data : lignes ramenées à leur longueur réelle, mises en cache en mémoire, mélangées
+  à chaque epoch (train), regroupées par buckets de longueur et paddées au bucket (moins de calcul
+  sur le padding), puis prefetch pour que le CPU prépare le batch suivant pendant le calcul.
+"""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+import numpy as np
+from pathlib import Path
+
+TOKENIZED_CACHE_DIR = Path(__file__).parent / "../data/tokenized"
+# Version du format du cache (à incrémenter si son contenu change)
+CACHE_FORMAT_VERSION = 1
+# Titres tokenizés par appel au tokenizer (mémoire bornée sur les gros datasets)
+TOKENIZE_CHUNK_SIZE = 2048
+# Longueurs (en tokens) des buckets du pipeline d'entraînement
+TRAINING_LENGTH_BUCKETS = (16, 32, 64)
+
+
+def tokenizer_version(tokenizer):
+    """Identifiant du tokenizer : classe, version de transformers et empreinte du vocabulaire"""
+    import transformers
+
+    vocabulary = json.dumps(sorted(tokenizer.get_vocab().items()), ensure_ascii=False)
+    return {
+        "class": type(tokenizer).__name__,
+        "transformers": transformers.__version__,
+        "vocabulary_sha256": hashlib.sha256(vocabulary.encode("utf-8")).hexdigest()
+    }
+
+
+def dataset_hash(texts):
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(str(text).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def cache_key(tokenizer, max_length, texts):
+    key = {
+        "format": CACHE_FORMAT_VERSION,
+        "tokenizer": tokenizer_version(tokenizer),
+        "max_length": max_length,
+        "dataset_sha256": dataset_hash(texts)
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest(), key
+
+
+def tokenize(tokenizer, texts, max_length):
+    """input_ids / attention_mask (int32, paddés à max_length), par morceaux de TOKENIZE_CHUNK_SIZE titres"""
+    input_ids = np.empty((len(texts), max_length), dtype=np.int32)
+    attention_mask = np.empty((len(texts), max_length), dtype=np.int32)
+    for start in range(0, len(texts), TOKENIZE_CHUNK_SIZE):
+        tokens = tokenizer(
+            [str(text) for text in texts[start:start + TOKENIZE_CHUNK_SIZE]],
+            padding='max_length',
+            truncation=True,
+            max_length=max_length,
+            return_tensors='np'
+        )
+        end = start + len(tokens['input_ids'])
+        input_ids[start:end] = tokens['input_ids']
+        attention_mask[start:end] = tokens['attention_mask']
+    return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+
+def load_or_tokenize(tokenizer, texts, max_length, cache_dir=TOKENIZED_CACHE_DIR):
+    """Tokenization des titres, lue depuis le cache disque si elle a déjà été faite"""
+    key, description = cache_key(tokenizer, max_length, texts)
+    cache_path = Path(cache_dir) / f"camembert-tokens-{key[:16]}.npz"
+    if cache_path.exists():
+        with np.load(cache_path) as cached:
+            print(f"✅ Tokenization lue depuis le cache : {cache_path}")
+            return {"input_ids": cached["input_ids"], "attention_mask": cached["attention_mask"]}
+
+    tokens = tokenize(tokenizer, texts, max_length)
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    buffer = io.BytesIO()
+    np.savez(buffer, description=json.dumps(description), **tokens)
+    # Écriture atomique : un entraînement interrompu ne laisse pas de cache partiel
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(buffer.getvalue())
+    os.replace(tmp_path, cache_path)
+    print(f"✅ Tokenization mise en cache : {cache_path}")
+    return tokens
+
+
+def make_dataset(tokens, labels, batch_size, pad_token_id, training=False, buckets=TRAINING_LENGTH_BUCKETS, seed=None):
+    """
+    tf.data.Dataset de ((input_ids, attention_mask), label) paddés par bucket de longueur.
+    training : mélange (nouvel ordre à chaque epoch) avant le regroupement par bucket.
+    """
+    import tensorflow as tf
+
+    input_ids, attention_mask = tokens["input_ids"], tokens["attention_mask"]
+    lengths = attention_mask.sum(axis=1).astype(np.int32)
+    max_length = input_ids.shape[1]
+    boundaries = [b + 1 for b in sorted(set(buckets)) if b < max_length]
+
+    dataset = tf.data.Dataset.from_tensor_slices((input_ids, attention_mask, lengths, labels.astype(np.int32)))
+    # Chaque ligne ramenée à sa longueur réelle, une seule fois grâce au cache
+    dataset = dataset.map(
+        lambda ids, mask, length, label: ((ids[:length], mask[:length]), label),
+        num_parallel_calls=tf.data.AUTOTUNE
+    ).cache()
+    if training:
+        dataset = dataset.shuffle(len(labels), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.bucket_by_sequence_length(
+        element_length_func=lambda inputs, label: tf.shape(inputs[0])[0],
+        bucket_boundaries=boundaries,
+        bucket_batch_sizes=[batch_size] * (len(boundaries) + 1),
+        padding_values=((tf.constant(pad_token_id, tf.int32), tf.constant(0, tf.int32)), tf.constant(0, tf.int32)),
+        pad_to_bucket_boundary=False
+    )
+    return dataset.prefetch(tf.data.AUTOTUNE)
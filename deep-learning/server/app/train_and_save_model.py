@@ -11,12 +11,12 @@ Ce script:
 import os
 import json
 import numpy as np
-import pandas as pd
-import re
 
 # Configuration pour Keras 3 avec Transformers
 os.environ['TF_USE_LEGACY_KERAS'] = '1'
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
+# Kernels oneDNN (matmul, softmax... optimisés CPU) activés pour l'entraînement ; TF_ENABLE_ONEDNN_OPTS=0 les coupe
+os.environ.setdefault('TF_ENABLE_ONEDNN_OPTS', '1')
 
 import warnings
 warnings.filterwarnings('ignore')
@@ -27,17 +27,26 @@ from tensorflow.keras import layers
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
 
 from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import train_test_split
 
-from transformers import CamembertTokenizer, TFCamembertModel
+from transformers import CamembertTokenizerFast, TFCamembertModel
+
+from data_preparation import SEED, split_train_val_test
+from prepare_dataset import load_prepared_dataset
+from tokenized_dataset import load_or_tokenize, make_dataset
+from training_utils import (
+    GRADIENT_ACCUMULATION_STEPS, GradientAccumulationModel, ThroughputLogger,
+    configure_training_threads, resume_callbacks
+)
 
 # Configuration
-SEED = 42
 LEARNING_RATE = 5e-5  # Meilleur learning rate identifié
 MAX_LENGTH = 128
 BATCH_SIZE = 32
 EPOCHS = 10
 
+# Pools de threads fixés avant la première opération TensorFlow
+configure_training_threads()
+
 # Reproductibilité
 np.random.seed(SEED)
 tf.random.set_seed(SEED)
@@ -51,75 +60,44 @@ print("=" * 80)
 # 1. CHARGEMENT ET PRÉPARATION DES DONNÉES
 # =============================================================================
 
-print("\n📥 Chargement du dataset...")
-df = pd.read_csv('data/dataset-for-training-completed.csv')
-print(f"✅ Dataset chargé : {len(df)} lignes")
-
-# Nettoyage
-print("🧹 Nettoyage des données...")
-df = df.dropna()
-df['Thématique'] = df['Thématique'].str.strip()
-df = df[df['Thématique'].str.len() > 0]
-df = df[~df['Thématique'].str.match(r'^[\W_]+$')]
-print(f"✅ Après nettoyage : {len(df)} lignes")
-
-# Prétraitement du texte
-def preprocess_text(text):
-    """Normalisation du texte français"""
-    text = text.lower()
-    text = re.sub(r"[^a-zàâäæçéèêëïîôùûüÿœ'\s]", "", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
-
-print("🔄 Nettoyage des titres...")
-df['Titres opération et projet lauréat'] = df['Titres opération et projet lauréat'].apply(preprocess_text)
-print("✅ Titres nettoyés")
-
-# Encodage des labels
-print("🔢 Encodage des thématiques...")
+print("\n📥 Chargement du dataset préparé...")
+# Export brut préparé en streaming (prepare_dataset.py) : titres nettoyés et normalisés, labels
+# encodés dans l'ordre alphabétique comme LabelEncoder. Préparé ici s'il est absent ou périmé.
+X_all, y_all_encoded, classes = load_prepared_dataset()
 label_encoder = LabelEncoder()
-label_encoder.fit(df['Thématique'])
-y_all_encoded = label_encoder.transform(df['Thématique'])
+label_encoder.classes_ = np.array(classes)
 num_classes = len(label_encoder.classes_)
-print(f"✅ {num_classes} thématiques encodées")
+print(f"✅ Dataset chargé : {len(X_all)} lignes, {num_classes} thématiques encodées")
 
 # Séparation train/val/test
 print("📊 Séparation des données...")
-X_all = df['Titres opération et projet lauréat'].values
 y_all = y_all_encoded
 
-X_train_all_text, X_test_text, y_train_all, y_test = train_test_split(
-    X_all, y_all, test_size=0.3, random_state=SEED, stratify=y_all
-)
-
-X_train_text, X_val_text, y_train, y_val = train_test_split(
-    X_train_all_text, y_train_all, test_size=0.2, random_state=SEED, stratify=y_train_all
-)
+# Découpage des indices : les titres sont tokenizés une seule fois pour tout le dataset
+train_idx, val_idx, test_idx, y_train, y_val, y_test = split_train_val_test(np.arange(len(X_all)), y_all)
 
-print(f"✅ Train: {len(X_train_text)} | Val: {len(X_val_text)} | Test: {len(X_test_text)}")
+print(f"✅ Train: {len(train_idx)} | Val: {len(val_idx)} | Test: {len(test_idx)}")
 
 # =============================================================================
 # 2. TOKENIZATION AVEC CAMEMBERT
 # =============================================================================
 
 print("\n📥 Chargement du tokenizer CamemBERT...")
-tokenizer_camembert = CamembertTokenizer.from_pretrained("camembert-base")
+# Tokenizer rapide (Rust) : chaque morceau du dataset est encodé sur tous les coeurs
+tokenizer_camembert = CamembertTokenizerFast.from_pretrained("camembert-base")
 print("✅ Tokenizer chargé")
 
-def tokenize_data(texts, max_length=MAX_LENGTH):
-    """Tokenize les textes avec CamemBERT"""
-    return tokenizer_camembert(
-        texts.tolist(),
-        padding='max_length',
-        truncation=True,
-        max_length=max_length,
-        return_tensors='tf'
-    )
-
 print("🔄 Tokenization des données...")
-X_train_camembert = tokenize_data(X_train_text)
-X_val_camembert = tokenize_data(X_val_text)
-X_test_camembert = tokenize_data(X_test_text)
+# Cache disque versionné (tokenizer, MAX_LENGTH, hash des titres) : pas de re-tokenization d'un run à l'autre
+tokens_all = load_or_tokenize(tokenizer_camembert, X_all, MAX_LENGTH)
+
+def split_tokens(indices):
+    return {name: values[indices] for name, values in tokens_all.items()}
+
+# Pipelines tf.data : buckets de longueur, cache, mélange à chaque epoch (train) et prefetch
+train_dataset = make_dataset(split_tokens(train_idx), y_train, BATCH_SIZE, tokenizer_camembert.pad_token_id, training=True, seed=SEED)
+val_dataset = make_dataset(split_tokens(val_idx), y_val, BATCH_SIZE, tokenizer_camembert.pad_token_id)
+test_dataset = make_dataset(split_tokens(test_idx), y_test, BATCH_SIZE, tokenizer_camembert.pad_token_id)
 print("✅ Tokenization terminée")
 
 # =============================================================================
@@ -145,9 +123,9 @@ def creer_modele_camembert_finetuned():
         )
         camembert_backbone.trainable = True
     
-    # Architecture
-    input_ids = layers.Input(shape=(MAX_LENGTH,), dtype=tf.int32, name="input_ids")
-    attention_mask = layers.Input(shape=(MAX_LENGTH,), dtype=tf.int32, name="attention_mask")
+    # Architecture (longueur de séquence variable : batchs paddés à leur bucket)
+    input_ids = layers.Input(shape=(None,), dtype=tf.int32, name="input_ids")
+    attention_mask = layers.Input(shape=(None,), dtype=tf.int32, name="attention_mask")
     
     camembert_output = camembert_backbone(input_ids, attention_mask=attention_mask)
     cls_token = camembert_output.last_hidden_state[:, 0, :]
@@ -162,15 +140,18 @@ def creer_modele_camembert_finetuned():
     return model
 
 model = creer_modele_camembert_finetuned()
+# Modèle d'entraînement : mêmes couches, gradients accumulés sur GRADIENT_ACCUMULATION_STEPS batchs
+# (le modèle sauvegardé reste un keras.Model standard, chargé tel quel par l'API)
+training_model = GradientAccumulationModel(inputs=model.inputs, outputs=model.outputs, accumulation_steps=GRADIENT_ACCUMULATION_STEPS)
 
 # Compilation
-model.compile(
+training_model.compile(
     optimizer=keras.optimizers.Adam(learning_rate=LEARNING_RATE),
     loss='sparse_categorical_crossentropy',
     metrics=['accuracy']
 )
 
-print(f"✅ Modèle créé et compilé (Learning Rate: {LEARNING_RATE})")
+print(f"✅ Modèle créé et compilé (Learning Rate: {LEARNING_RATE}, batch effectif: {BATCH_SIZE * GRADIENT_ACCUMULATION_STEPS})")
 total_params = sum([tf.size(w).numpy() for w in model.trainable_weights])
 print(f"📊 Paramètres entraînables: {total_params:,}")
 
@@ -185,17 +166,16 @@ print("=" * 80)
 early_stop = EarlyStopping(monitor='val_loss', patience=2, restore_best_weights=True, verbose=0)
 reduce_lr = ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=1, min_lr=1e-7, verbose=0)
 
+# Sauvegarde à chaque epoch (poids, optimizer, callbacks) et reprise automatique après interruption,
+# débit en exemples/s par epoch
+callbacks = [early_stop, reduce_lr, *resume_callbacks(early_stop, reduce_lr), ThroughputLogger(len(train_idx))]
+
 # Entraînement
-history = model.fit(
-    [X_train_camembert['input_ids'], X_train_camembert['attention_mask']],
-    y_train,
-    validation_data=(
-        [X_val_camembert['input_ids'], X_val_camembert['attention_mask']],
-        y_val
-    ),
+history = training_model.fit(
+    train_dataset,
+    validation_data=val_dataset,
     epochs=EPOCHS,
-    batch_size=BATCH_SIZE,
-    callbacks=[early_stop, reduce_lr],
+    callbacks=callbacks,
     verbose=1
 )
 
@@ -203,17 +183,14 @@ print("=" * 80)
 print("✅ Entraînement terminé")
 print(f"📊 Meilleure val_accuracy: {max(history.history['val_accuracy']):.4f}")
 print(f"📊 Meilleure val_loss: {min(history.history['val_loss']):.4f}")
+print(f"📊 Débit moyen: {np.mean(history.history['examples_per_second']):.1f} exemples/s")
 
 # =============================================================================
 # 5. ÉVALUATION SUR LE TEST SET
 # =============================================================================
 
 print("\n📊 Évaluation sur le test set...")
-test_loss, test_acc = model.evaluate(
-    [X_test_camembert['input_ids'], X_test_camembert['attention_mask']],
-    y_test,
-    verbose=0
-)
+test_loss, test_acc = training_model.evaluate(test_dataset, verbose=0)
 print(f"✅ Test Loss: {test_loss:.4f}")
 print(f"✅ Test Accuracy: {test_acc:.4f} ({test_acc*100:.2f}%)")
 
@@ -251,6 +228,11 @@ with open(label_mapping_json_path, 'w', encoding='utf-8') as f:
     }, f, ensure_ascii=False, indent=2)
 
 print(f"✅ Label mapping sauvegardé: {label_mapping_json_path}")
+
+# 3. Sauvegarder le tokenizer (l'API le charge sans accès réseau ni cache Hugging Face)
+tokenizer_dir = f'{save_dir}tokenizer'
+tokenizer_camembert.save_pretrained(tokenizer_dir)
+print(f"✅ Tokenizer sauvegardé: {tokenizer_dir}")
 print("\n" + "=" * 80)
 print("🎉 ENTRAÎNEMENT ET SAUVEGARDE TERMINÉS AVEC SUCCÈS !")
 print("=" * 80)
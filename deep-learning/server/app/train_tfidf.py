@@ -0,0 +1,132 @@
+"""
+Entraînement du modèle TF-IDF + régression logistique servi sous le nom "tfidf"
+
+- dataset-for-training-completed.csv nettoyé et normalisé (load_training_dataframe), même
+  découpage train/val/test que les modèles neuronaux (split_train_val_test) : l'accuracy test est
+  directement comparable à celle du LSTM et de CamemBERT
+- features : TF-IDF des mots (1-2 grammes) et des caractères par mot (char_wb, 2-5 grammes),
+  tf sublinéaire, termes présents dans au moins --min-df titres
+- C de la régression logistique choisi sur le val set, puis modèle final réentraîné sur train + val
+- export sans pickle (tfidf_features.save_tfidf_model) dans TFIDF_MODEL_DIR (model/tfidf), label
+  mapping au format des autres modèles ; contrôle que l'encodage NumPy servi par l'api donne les
+  mêmes probabilités que scikit-learn, puis latence unitaire et taille de l'artefact
+
+Utilisation (depuis /app) : python train_tfidf.py [--c 4 10 30] [--min-df 2]
+"""
+
+import argparse
+import json
+import time
+import numpy as np
+from pathlib import Path
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import FeatureUnion
+
+from data_preparation import LABEL_COLUMN, TEXT_COLUMN, load_training_dataframe, split_train_val_test
+from tfidf_features import LABEL_MAPPING_TFIDF_PATH, TFIDF_MODEL_DIR, TFIDF_MODEL_PATH, load_tfidf_model, save_tfidf_model
+
+WORD_NGRAM_RANGE = (1, 2)
+CHAR_NGRAM_RANGE = (2, 5)
+MAX_ITER = 2000
+LATENCY_SAMPLES = 500
+# Écart maximal toléré entre les probabilités scikit-learn et celles de l'encodage NumPy
+PARITY_TOLERANCE = 1e-4
+
+
+def build_vectorizer(min_df):
+    return FeatureUnion([
+        ("word", TfidfVectorizer(ngram_range=WORD_NGRAM_RANGE, min_df=min_df, sublinear_tf=True)),
+        ("char", TfidfVectorizer(analyzer="char_wb", ngram_range=CHAR_NGRAM_RANGE, min_df=min_df, sublinear_tf=True))
+    ])
+
+
+def fit(texts, labels, c, min_df):
+    vectorizer = build_vectorizer(min_df)
+    features = vectorizer.fit_transform(texts)
+    classifier = LogisticRegression(C=c, max_iter=MAX_ITER).fit(features, labels)
+    return vectorizer, classifier
+
+
+def single_request_latency(predictor, texts):
+    predictor.predict_proba(texts[:1])
+    timings = []
+    for text in texts[:LATENCY_SAMPLES]:
+        start = time.perf_counter()
+        predictor.predict_proba([text])
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.percentile(timings, 50)), float(np.percentile(timings, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entraîne et exporte le modèle TF-IDF + régression logistique")
+    parser.add_argument("--c", type=float, nargs="+", default=[4.0, 10.0, 30.0], help="valeurs de C testées sur le val set")
+    parser.add_argument("--min-df", type=int, default=2, help="nombre minimal de titres contenant un terme")
+    parser.add_argument("--output-dir", default=str(TFIDF_MODEL_DIR))
+    args = parser.parse_args()
+
+    from load_model import TfidfPredictor
+
+    print("📥 Chargement du dataset d'entraînement...")
+    df = load_training_dataframe()
+    classes = sorted(df[LABEL_COLUMN].unique())
+    texts = df[TEXT_COLUMN].to_numpy()
+    labels = df[LABEL_COLUMN].map({label: i for i, label in enumerate(classes)}).to_numpy()
+    X_train, X_val, X_test, y_train, y_val, y_test = split_train_val_test(texts, labels)
+    print(f"✅ Train: {len(X_train)} | Val: {len(X_val)} | Test: {len(X_test)} | {len(classes)} thématiques")
+
+    val_scores = {}
+    for c in args.c:
+        start = time.perf_counter()
+        vectorizer, classifier = fit(X_train, y_train, c, args.min_df)
+        val_scores[c] = float((classifier.predict(vectorizer.transform(X_val)) == y_val).mean())
+        print(f"   C={c:<6g}: val accuracy {val_scores[c]:.4f} ({time.perf_counter() - start:.1f} s)")
+    best_c = max(val_scores, key=val_scores.get)
+
+    print(f"🔨 Modèle final (C={best_c:g}) entraîné sur train + val...")
+    start = time.perf_counter()
+    vectorizer, classifier = fit(np.concatenate([X_train, X_val]), np.concatenate([y_train, y_val]), best_c, args.min_df)
+    train_seconds = time.perf_counter() - start
+    sklearn_probas = classifier.predict_proba(vectorizer.transform(X_test))
+    test_accuracy = float((sklearn_probas.argmax(axis=1) == y_test).mean())
+
+    output_dir = Path(args.output_dir)
+    model_path = output_dir / TFIDF_MODEL_PATH.name
+    save_tfidf_model(vectorizer, classifier, model_path)
+
+    # Même chemin que l'api : encodage NumPy + LinearBackend
+    encoder, backend = load_tfidf_model(model_path)
+    predictor = TfidfPredictor(backend, encoder)
+    served_probas = predictor.predict_proba(list(X_test))
+    parity = float(np.abs(served_probas - sklearn_probas).max())
+    if parity > PARITY_TOLERANCE:
+        raise ValueError(f"L'encodage servi diverge de scikit-learn (écart max {parity:.2e})")
+    p50, p95 = single_request_latency(predictor, list(X_test))
+
+    metadata = {
+        'C': best_c,
+        'min_df': args.min_df,
+        'num_features': encoder.num_features,
+        'val_accuracy': val_scores[best_c],
+        'test_accuracy': test_accuracy,
+        'latency_p50_ms': p50,
+        'latency_p95_ms': p95,
+        'size_mb': model_path.stat().st_size / (1024**2)
+    }
+    with open(output_dir / LABEL_MAPPING_TFIDF_PATH.name, 'w', encoding='utf-8') as f:
+        json.dump({
+            'num_to_label': {int(i): str(label) for i, label in enumerate(classes)},
+            'label_to_num': {str(label): int(i) for i, label in enumerate(classes)},
+            'num_classes': len(classes),
+            **metadata
+        }, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ Modèle sauvegardé dans {output_dir} ({train_seconds:.1f} s d'entraînement)")
+    print(f"   Test accuracy : {test_accuracy:.4f} | {encoder.num_features} features | {metadata['size_mb']:.1f} MB")
+    print(f"   Latence unitaire : p50 {p50:.2f} ms | p95 {p95:.2f} ms | écart max avec scikit-learn {parity:.1e}")
+    print(f"\n💡 Servir le modèle : SERVED_MODELS=tfidf python api.py (ou python api_tfidf.py)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Outils d'entraînement CPU : threads, accumulation de gradients, reprise après interruption, débit
+
+- configure_training_threads() : pools de threads TensorFlow (TRAIN_INTRA_OP_THREADS,
+  TRAIN_INTER_OP_THREADS, 0 = choix de TensorFlow), à appeler avant la première opération TF
+- GradientAccumulationModel : applique la moyenne des gradients de GRADIENT_ACCUMULATION_STEPS
+  batchs, pour un batch effectif plus grand sans plus de mémoire. Les gradients creux des
+  embeddings (IndexedSlices) restent creux : accumulés ligne à ligne, appliqués sur les seules
+  lignes touchées.
+- resume_callbacks() : sauvegarde à chaque epoch des poids, de l'état de l'optimizer et de l'epoch
+  (BackupAndRestore) ainsi que de l'état d'EarlyStopping / ReduceLROnPlateau. Un entraînement
+  interrompu reprend automatiquement à la dernière epoch terminée ; la sauvegarde est supprimée
+  quand l'entraînement va au bout.
+- ThroughputLogger : exemples/s de chaque epoch (hors validation), ajoutés à l'historique
+"""
+
+import json
+import os
+import shutil
+import time
+import numpy as np
+import tensorflow as tf
+from pathlib import Path
+from tensorflow import keras
+
+TRAIN_INTRA_OP_THREADS = int(os.environ.get("TRAIN_INTRA_OP_THREADS", "0"))
+TRAIN_INTER_OP_THREADS = int(os.environ.get("TRAIN_INTER_OP_THREADS", "0"))
+GRADIENT_ACCUMULATION_STEPS = int(os.environ.get("GRADIENT_ACCUMULATION_STEPS", "1"))
+CHECKPOINT_DIR = Path(os.environ.get("TRAIN_CHECKPOINT_DIR", Path(__file__).parent / "../model/camembert/checkpoints"))
+
+# Attributs des callbacks sauvegardés pour la reprise (les autres sont recalculés)
+EARLY_STOPPING_STATE = ("wait", "best", "best_epoch", "stopped_epoch")
+REDUCE_LR_STATE = ("wait", "best", "cooldown_counter")
+
+
+def configure_training_threads():
+    if TRAIN_INTRA_OP_THREADS > 0:
+        tf.config.threading.set_intra_op_parallelism_threads(TRAIN_INTRA_OP_THREADS)
+    if TRAIN_INTER_OP_THREADS > 0:
+        tf.config.threading.set_inter_op_parallelism_threads(TRAIN_INTER_OP_THREADS)
+    print(
+        f"🧵 Threads TensorFlow : intra-op {TRAIN_INTRA_OP_THREADS or 'auto'}, inter-op {TRAIN_INTER_OP_THREADS or 'auto'}"
+        f" | oneDNN : {os.environ.get('TF_ENABLE_ONEDNN_OPTS', 'défaut')}"
+    )
+
+
+class GradientAccumulationModel(keras.Model):
+    """Modèle fonctionnel dont les gradients sont accumulés sur accumulation_steps batchs avant mise à jour"""
+
+    def __init__(self, *args, accumulation_steps=GRADIENT_ACCUMULATION_STEPS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.accumulation_steps = accumulation_steps
+        self.accumulation_counter = tf.Variable(0, dtype=tf.int64, trainable=False, name="accumulation_counter")
+        self.accumulated_gradients = [
+            tf.Variable(tf.zeros_like(variable), trainable=False, name=f"accumulated_{i}")
+            for i, variable in enumerate(self.trainable_variables)
+        ]
+        # Lignes ayant reçu un gradient creux (IndexedSlices, ex: embeddings) depuis la dernière mise à jour
+        self.touched_rows = [
+            tf.Variable(tf.zeros(variable.shape[:1], dtype=tf.int32), trainable=False, name=f"touched_rows_{i}")
+            for i, variable in enumerate(self.trainable_variables)
+        ]
+
+    def train_step(self, data):
+        x, y = data
+        with tf.GradientTape() as tape:
+            y_pred = self(x, training=True)
+            loss = self.compute_loss(x, y, y_pred)
+        gradients = tape.gradient(loss, self.trainable_variables)
+
+        # Variables sans gradient (ex: pooler de CamemBERT, inutilisé) : ignorées, comme par fit()
+        pairs = [
+            (g, v, acc, rows) for g, v, acc, rows
+            in zip(gradients, self.trainable_variables, self.accumulated_gradients, self.touched_rows) if g is not None
+        ]
+        if self.accumulation_steps <= 1:
+            self.optimizer.apply_gradients([(g, v) for g, v, _, _ in pairs])
+            return self.compute_metrics(x, y, y_pred, None)
+
+        for gradient, _, accumulated, touched in pairs:
+            if isinstance(gradient, tf.IndexedSlices):
+                # Embeddings : seules les lignes des tokens du batch sont ajoutées, sans gradient dense
+                accumulated.scatter_add(tf.IndexedSlices(gradient.values / self.accumulation_steps, gradient.indices))
+                touched.scatter_update(tf.IndexedSlices(tf.ones_like(gradient.indices, dtype=tf.int32), gradient.indices))
+            else:
+                accumulated.assign_add(gradient / self.accumulation_steps)
+        self.accumulation_counter.assign_add(1)
+        # Variables de l'optimizer créées hors du tf.cond (une seule fois, au premier traçage)
+        self.optimizer.build([v for _, v, _, _ in pairs])
+
+        def apply_accumulated():
+            grads_and_vars, sparse_rows = [], []
+            for gradient, variable, accumulated, touched in pairs:
+                if isinstance(gradient, tf.IndexedSlices):
+                    # Mise à jour creuse, limitée aux lignes touchées pendant l'accumulation
+                    rows = tf.reshape(tf.where(touched > 0), [-1])
+                    values = tf.gather(accumulated, rows)
+                    grads_and_vars.append((tf.IndexedSlices(values, rows, tf.shape(accumulated, out_type=tf.int64)), variable))
+                    sparse_rows.append((accumulated, touched, rows, values))
+                else:
+                    grads_and_vars.append((accumulated.read_value(), variable))
+            self.optimizer.apply_gradients(grads_and_vars)
+            for gradient, _, accumulated, _ in pairs:
+                if not isinstance(gradient, tf.IndexedSlices):
+                    accumulated.assign(tf.zeros_like(accumulated))
+            for accumulated, touched, rows, values in sparse_rows:
+                accumulated.scatter_update(tf.IndexedSlices(tf.zeros_like(values), rows))
+                touched.assign(tf.zeros_like(touched))
+            return tf.constant(True)
+
+        tf.cond(self.accumulation_counter % self.accumulation_steps == 0, apply_accumulated, lambda: tf.constant(False))
+        return self.compute_metrics(x, y, y_pred, None)
+
+
+class CallbackStateCheckpoint(keras.callbacks.Callback):
+    """Sauvegarde et restaure l'état d'EarlyStopping / ReduceLROnPlateau (meilleurs poids compris)"""
+
+    def __init__(self, directory, early_stopping, reduce_lr):
+        super().__init__()
+        self.directory = Path(directory)
+        self.early_stopping = early_stopping
+        self.reduce_lr = reduce_lr
+        self._saved_best_epoch = None
+
+    @property
+    def state_path(self):
+        return self.directory / "callbacks_state.json"
+
+    @property
+    def best_weights_path(self):
+        return self.directory / "best_weights.npz"
+
+    def on_train_begin(self, logs=None):
+        # Appelé après le on_train_begin des callbacks suivis, qui remettent leur état à zéro
+        if not self.state_path.exists():
+            return
+        with open(self.state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        for name in EARLY_STOPPING_STATE:
+            setattr(self.early_stopping, name, state["early_stopping"][name])
+        for name in REDUCE_LR_STATE:
+            setattr(self.reduce_lr, name, state["reduce_lr"][name])
+        if self.early_stopping.restore_best_weights and self.best_weights_path.exists():
+            with np.load(self.best_weights_path) as best:
+                self.early_stopping.best_weights = [best[f"arr_{i}"] for i in range(len(best.files))]
+            self._saved_best_epoch = self.early_stopping.best_epoch
+        print(f"🔁 État des callbacks restauré (meilleure val_loss : {self.early_stopping.best:.4f})")
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.early_stopping.best_weights is not None and self.early_stopping.best_epoch != self._saved_best_epoch:
+            _atomic_write(self.best_weights_path, lambda f: np.savez(f, *self.early_stopping.best_weights))
+            self._saved_best_epoch = self.early_stopping.best_epoch
+        state = {
+            "early_stopping": {name: _plain(getattr(self.early_stopping, name)) for name in EARLY_STOPPING_STATE},
+            "reduce_lr": {name: _plain(getattr(self.reduce_lr, name)) for name in REDUCE_LR_STATE}
+        }
+        _atomic_write(self.state_path, lambda f: f.write(json.dumps(state).encode("utf-8")))
+
+    def on_train_end(self, logs=None):
+        # Entraînement terminé : plus rien à reprendre (comme BackupAndRestore)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def resume_callbacks(early_stopping, reduce_lr, directory=CHECKPOINT_DIR):
+    """Callbacks de reprise à placer après early_stopping et reduce_lr dans la liste de fit()"""
+    directory = Path(directory)
+    if (directory / "backup").exists():
+        print(f"🔁 Reprise de l'entraînement depuis {directory}")
+    return [
+        CallbackStateCheckpoint(directory / "callbacks", early_stopping, reduce_lr),
+        keras.callbacks.BackupAndRestore(str(directory / "backup"), save_freq="epoch", delete_checkpoint=True)
+    ]
+
+
+class ThroughputLogger(keras.callbacks.Callback):
+    """Exemples d'entraînement traités par seconde à chaque epoch (validation exclue)"""
+
+    def __init__(self, examples_per_epoch):
+        super().__init__()
+        self.examples_per_epoch = examples_per_epoch
+        self._epoch_start = None
+        self._train_seconds = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._epoch_start = time.perf_counter()
+        self._train_seconds = None
+
+    def on_test_begin(self, logs=None):
+        # Début de la validation de fin d'epoch
+        if self._epoch_start is not None and self._train_seconds is None:
+            self._train_seconds = time.perf_counter() - self._epoch_start
+
+    def on_epoch_end(self, epoch, logs=None):
+        seconds = self._train_seconds or (time.perf_counter() - self._epoch_start)
+        rate = self.examples_per_epoch / seconds
+        if logs is not None:
+            logs["examples_per_second"] = rate
+        print(f"\n⏱️  Epoch {epoch + 1} : {rate:.1f} exemples/s ({seconds:.0f} s d'entraînement)")
+
+
+def _plain(value):
+    """Valeur JSON (les callbacks stockent des scalaires NumPy)"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _atomic_write(path, write):
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,70 @@
+"""
+Validation du padding dynamique CamemBERT
+
+Compare, sur le test set utilisé à l'entraînement, les prédictions du chemin historique
+(padding fixe à 128 tokens) et du chemin par buckets de longueur.
+Les deux chemins doivent donner exactement la même thématique pour chaque titre.
+
+Utilisation (depuis /app) : python validate_dynamic_padding.py
+"""
+
+import sys
+import time
+import numpy as np
+from sklearn.preprocessing import LabelEncoder
+
+from data_preparation import TEXT_COLUMN, LABEL_COLUMN, load_training_dataframe, split_train_val_test
+from backends import TensorFlowBackend
+from load_model import load_camembert_model, CamembertPredictor, LENGTH_BUCKETS, MAX_LEN_CAMEMBERT
+
+BATCH_SIZE = 32
+
+
+def predict_all(predictor, texts):
+    probas = []
+    start = time.perf_counter()
+    for i in range(0, len(texts), BATCH_SIZE):
+        probas.append(predictor.predict_proba(texts[i:i + BATCH_SIZE]))
+    return np.concatenate(probas), time.perf_counter() - start
+
+
+def main():
+    print("📥 Reconstitution du test set...")
+    df = load_training_dataframe()
+    y_all = LabelEncoder().fit_transform(df[LABEL_COLUMN])
+    _, _, X_test, _, _, y_test = split_train_val_test(df[TEXT_COLUMN].values, y_all)
+    print(f"✅ {len(X_test)} titres de test")
+
+    camembert_model, tokenizer_camembert, _, _ = load_camembert_model()
+    backend = TensorFlowBackend(camembert_model)
+    fixed = CamembertPredictor(backend, tokenizer_camembert, buckets=(MAX_LEN_CAMEMBERT,))
+    bucketed = CamembertPredictor(backend, tokenizer_camembert, buckets=LENGTH_BUCKETS)
+
+    # Un premier passage pour tracer les graphes avant de chronométrer
+    for predictor in (fixed, bucketed):
+        predict_all(predictor, X_test[:BATCH_SIZE * 4])
+
+    proba_fixed, time_fixed = predict_all(fixed, X_test)
+    proba_bucketed, time_bucketed = predict_all(bucketed, X_test)
+
+    pred_fixed = proba_fixed.argmax(axis=1)
+    pred_bucketed = proba_bucketed.argmax(axis=1)
+    mismatches = int((pred_fixed != pred_bucketed).sum())
+
+    print("\n📊 Résultats")
+    print(f"   Buckets testés        : {bucketed.buckets}")
+    print(f"   Accuracy padding 128  : {(pred_fixed == y_test).mean():.4f} ({time_fixed:.1f}s)")
+    print(f"   Accuracy buckets      : {(pred_bucketed == y_test).mean():.4f} ({time_bucketed:.1f}s)")
+    print(f"   Accélération          : x{time_fixed / time_bucketed:.2f}")
+    print(f"   Ecart max de proba    : {np.abs(proba_fixed - proba_bucketed).max():.2e}")
+    print(f"   Argmax différents     : {mismatches}/{len(X_test)}")
+
+    if mismatches:
+        print("❌ Le padding dynamique ne reproduit pas les prédictions à 128 tokens")
+        return False
+    print("✅ Prédictions identiques au padding fixe à 128 tokens")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,345 @@
+"""
+Test de charge de bout en bout de l'api (api_lstm, api_camembert ou api)
+
+- démarre l'application demandée avec uvicorn sur un port local, attend /readyz, vérifie les
+  requêtes limites (batch vide) puis la chauffe
+- rejoue des requêtes POST /predict-category : titres tirés de dataset-for-training-completed.csv,
+  budgets tirés de la colonne budget de l'export brut (le dataset d'entraînement n'en a pas)
+- scénarios :
+  - boucle fermée (--concurrency 1,8) : N clients qui enchaînent les requêtes
+  - boucle ouverte (--rates 20,50) : arrivées de Poisson (ou régulières) à R req/s, indépendantes
+    des réponses. La latence est mesurée depuis l'heure d'arrivée prévue : l'attente côté client
+    d'un serveur saturé est comptée (pas d'omission coordonnée).
+- par scénario : débit, latences p50/p95/p99, taux de succès, CPU du serveur (% d'un coeur) et
+  RSS (courant et pic depuis le démarrage, lus dans /proc : Linux)
+
+Résultats en JSON (bench_results.py), comparables à une baseline :
+    python bench_api.py --app api_lstm --concurrency 1,8 --rates 20,50 --duration 20
+    python bench_api.py --app api_lstm --baseline results/baseline-lstm.json
+
+Les variables d'environnement (INFERENCE_BACKEND, INFERENCE_WORKERS...) sont transmises au serveur.
+Micro-benchmarks par étape (tokenize, predict, metrics, serialize) : bench_stages.py.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from bench_results import DEFAULT_TOLERANCE, compare_results, load_results, save_results
+
+APP_DIR = Path(__file__).parent.parent / "app"
+sys.path.insert(0, str(APP_DIR))
+
+from data_preparation import TEXT_COLUMN, TRAINING_DATASET_PATH
+from dataset_cache import load_dataset
+
+APPS = ("api_lstm", "api_camembert", "api_tfidf", "api")
+COL_BUDGET = "Budget global du projet lauréat"
+HOST = "127.0.0.1"
+SEED = 42
+# Clients simultanés maximum en boucle ouverte (au-delà, les arrivées attendent un client libre)
+MAX_IN_FLIGHT = 256
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def sample_workload(size, seed=SEED):
+    """size couples (titre, budget) : titres bruts du dataset d'entraînement, budgets réels de l'export"""
+    rng = np.random.default_rng(seed)
+    titles = pd.read_csv(TRAINING_DATASET_PATH)[TEXT_COLUMN].dropna().astype(str).to_numpy()
+    budgets = load_dataset([COL_BUDGET])[COL_BUDGET].dropna().to_numpy()
+    return list(zip(rng.choice(titles, size).tolist(), rng.choice(budgets, size).astype(int).tolist()))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+class Server:
+    """Application FastAPI lancée dans un processus uvicorn séparé (cwd = /app, comme en production)"""
+
+    def __init__(self, app, port, env=None):
+        self.port = port
+        # api n'expose que la fabrique create_app, les raccourcis api_* une application construite
+        target = ["api:create_app", "--factory"] if app == "api" else [f"{app}:app"]
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", *target, "--host", HOST, "--port", str(port), "--log-level", "warning"],
+            cwd=APP_DIR, env={**os.environ, **(env or {})}
+        )
+
+    def wait_ready(self, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Le serveur s'est arrêté (code {self.process.returncode})")
+            try:
+                connection = connect(self.port)
+                status, body = request(connection, "GET", "/readyz")
+                connection.close()
+                if status == 200:
+                    return
+                if json.loads(body).get("status") == "failed":
+                    raise RuntimeError(f"Chargement en échec : {body.decode()}")
+            except OSError:
+                pass
+            time.sleep(0.5)
+        raise TimeoutError(f"Serveur non prêt après {timeout} s")
+
+    def cpu_seconds(self):
+        """Temps CPU user + system du serveur (/proc/<pid>/stat)"""
+        try:
+            with open(f"/proc/{self.process.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        except OSError:
+            return None
+
+    def memory_mb(self):
+        """RSS courant et pic de RSS du serveur (/proc/<pid>/status)"""
+        values = {}
+        try:
+            with open(f"/proc/{self.process.pid}/status") as f:
+                for line in f:
+                    if line.startswith(("VmRSS:", "VmHWM:")):
+                        key, value = line.split(":")
+                        values[key] = int(value.split()[0]) / 1024
+        except OSError:
+            pass
+        return values.get("VmRSS"), values.get("VmHWM")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+def connect(port):
+    return http.client.HTTPConnection(HOST, port, timeout=60)
+
+
+def request(connection, method, path, body=None):
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    connection.request(method, path, body=body, headers=headers)
+    response = connection.getresponse()
+    return response.status, response.read()
+
+
+class Client:
+    """Connexions keep-alive, une par thread, vers la route de prédiction"""
+
+    def __init__(self, port, path, bodies):
+        self.port = port
+        self.path = path
+        self.bodies = bodies
+        self._local = threading.local()
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def next_body(self):
+        with self._lock:
+            body = self.bodies[self._next % len(self.bodies)]
+            self._next += 1
+        return body
+
+    def send(self):
+        """Une requête -> code HTTP (0 : erreur réseau)"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = connect(self.port)
+        try:
+            status, _ = request(connection, "POST", self.path, self.next_body())
+            return status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            self._local.connection = None
+            return 0
+
+
+def request_bodies(workload, batch_size=None, model=None):
+    """Corps JSON des requêtes : un titre par requête, ou exactement batch_size titres (route /batch)"""
+    bodies = [{"projectTitle": title, "estimatedBudget": budget} for title, budget in workload]
+    if batch_size:
+        # Batch incomplet final écarté : titles_per_second = requêtes x batch_size
+        bodies = [{"items": bodies[i:i + batch_size]} for i in range(0, len(bodies) - batch_size + 1, batch_size)]
+    if model:
+        bodies = [{**body, "model": model} for body in bodies]
+    return [json.dumps(body).encode() for body in bodies]
+
+
+def check_edge_cases(port, model=None):
+    """Requêtes limites qui ne doivent pas provoquer de 500 (vérifiées avant les mesures)"""
+    body = {"items": [], **({"model": model} if model else {})}
+    connection = connect(port)
+    try:
+        status, payload = request(connection, "POST", "/predict-category/batch", json.dumps(body).encode())
+    finally:
+        connection.close()
+    if status != 200 or json.loads(payload) != {"predictions": []}:
+        raise RuntimeError(f"Batch vide : HTTP {status} {payload[:200]!r}")
+
+
+def closed_loop(client, concurrency, duration):
+    """concurrency clients qui envoient chacun leur requête suivante dès la réponse reçue"""
+    records = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        local = []
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status = client.send()
+            local.append((time.perf_counter() - start, status))
+        with lock:
+            records.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return records
+
+
+def open_loop(client, rate, duration, arrival="poisson", seed=SEED):
+    """Requêtes émises à rate req/s quel que soit le temps de réponse du serveur"""
+    rng = np.random.default_rng(seed)
+    count = int(rate * duration)
+    gaps = rng.exponential(1 / rate, count) if arrival == "poisson" else np.full(count, 1 / rate)
+    schedule = np.cumsum(gaps)
+    records = []
+    lock = threading.Lock()
+
+    def send(scheduled):
+        status = client.send()
+        with lock:
+            records.append((time.perf_counter() - scheduled, status))
+
+    with ThreadPoolExecutor(max_workers=MAX_IN_FLIGHT) as pool:
+        origin = time.perf_counter()
+        for offset in schedule:
+            scheduled = origin + offset
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, scheduled)
+    return records
+
+
+def summarize(records, elapsed, server, cpu_before, titles_per_request=1):
+    latencies = np.array([latency for latency, status in records if status == 200]) * 1000
+    errors = sum(1 for _, status in records if status != 200)
+    cpu_after = server.cpu_seconds()
+    rss, peak_rss = server.memory_mb()
+    return {
+        "requests": len(records),
+        "errors": errors,
+        "success_rate": (len(records) - errors) / len(records) if records else 0.0,
+        "duration_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed,
+        # Comparable entre route unitaire et /batch (throughput_rps compte les requêtes)
+        "titles_per_second": len(latencies) * titles_per_request / elapsed,
+        "latency_p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+        "latency_p95_ms": float(np.percentile(latencies, 95)) if len(latencies) else None,
+        "latency_p99_ms": float(np.percentile(latencies, 99)) if len(latencies) else None,
+        "server_cpu_percent": (cpu_after - cpu_before) / elapsed * 100 if cpu_before is not None else None,
+        "server_rss_mb": rss,
+        "server_peak_rss_mb": peak_rss
+    }
+
+
+def run_scenario(name, server, run, titles_per_request=1):
+    cpu_before = server.cpu_seconds()
+    start = time.perf_counter()
+    records = run()
+    summary = summarize(records, time.perf_counter() - start, server, cpu_before, titles_per_request)
+    latencies = " | ".join(
+        f"{key} {summary[f'latency_{key}_ms']:.1f} ms" for key in ("p50", "p95", "p99")
+        if summary[f"latency_{key}_ms"] is not None
+    )
+    print(
+        f"   {name:<12}: {summary['throughput_rps']:>7.1f} req/s ({summary['titles_per_second']:.1f} titres/s) | {latencies} | erreurs {summary['errors']}"
+        f" | CPU {summary['server_cpu_percent'] or 0:.0f}% | RSS {summary['server_rss_mb'] or 0:.0f} MB"
+    )
+    return summary
+
+
+def parse_list(value):
+    return [float(v) for v in value.split(",") if v.strip()] if value else []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de l'api de prédiction")
+    parser.add_argument("--app", choices=APPS, default="api_lstm")
+    parser.add_argument("--model", help="modèle demandé dans le body (api : lstm, camembert ou cascade)")
+    parser.add_argument("--batch", action="store_true", help="route /predict-category/batch (--batch-size titres par requête)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--concurrency", default="1,8", help="scénarios en boucle fermée (clients simultanés)")
+    parser.add_argument("--rates", default="", help="scénarios en boucle ouverte (req/s)")
+    parser.add_argument("--arrival", choices=["poisson", "constant"], default="poisson")
+    parser.add_argument("--duration", type=float, default=20, help="durée de chaque scénario (s)")
+    parser.add_argument("--warmup", type=int, default=50, help="requêtes de chauffe avant les mesures")
+    parser.add_argument("--samples", type=int, default=5000, help="taille du jeu de titres rejoué")
+    parser.add_argument("--no-prediction-cache", action="store_true", help="désactive le cache de prédictions du serveur")
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--output", help="fichier JSON du run (défaut : results/api-<date>.json)")
+    parser.add_argument("--baseline", help="run JSON de référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    path = "/predict-category/batch" if args.batch else "/predict-category"
+    titles_per_request = args.batch_size if args.batch else 1
+    bodies = request_bodies(sample_workload(args.samples), args.batch_size if args.batch else None, args.model)
+
+    env = {"PREDICTION_CACHE_MAX_ENTRIES": "0"} if args.no_prediction_cache else {}
+    server = Server(args.app, free_port(), env)
+    client = Client(server.port, path, bodies)
+    try:
+        print(f"🔄 Démarrage de {args.app} sur le port {server.port}...")
+        start = time.perf_counter()
+        server.wait_ready(args.startup_timeout)
+        startup = time.perf_counter() - start
+        print(f"✅ Serveur prêt en {startup:.1f} s")
+        check_edge_cases(server.port, args.model)
+        for _ in range(args.warmup):
+            client.send()
+
+        results = {}
+        print(f"\n⏱️  {path} ({args.duration:.0f} s par scénario)")
+        for concurrency in parse_list(args.concurrency):
+            name = f"closed-c{int(concurrency)}"
+            results[name] = {"concurrency": int(concurrency), **run_scenario(
+                name, server, lambda: closed_loop(client, int(concurrency), args.duration), titles_per_request
+            )}
+        for rate in parse_list(args.rates):
+            name = f"open-r{rate:g}"
+            results[name] = {"target_rps": rate, **run_scenario(
+                name, server, lambda: open_loop(client, rate, args.duration, args.arrival), titles_per_request
+            )}
+        results["startup"] = {"ready_s": startup, "server_peak_rss_mb": server.memory_mb()[1]}
+    finally:
+        server.stop()
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "tolerance")}
+    save_results("api", config, results, args.output)
+    if args.baseline:
+        return compare_results(load_results(args.baseline), {"kind": "api", "config": config, "results": results}, args.tolerance)
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,105 @@
+"""
+Benchmark du tokenizer CamemBERT : CamembertTokenizer (SentencePiece, Python) vs CamembertTokenizerFast (Rust)
+
+- vérifie que input_ids et attention_mask sont identiques sur tous les titres de
+  dataset-for-training-completed.csv, bruts et normalisés, avec le padding de l'entraînement
+  (max_length) et celui du service (longest + bucket, CamembertPredictor.encode)
+- compare le débit d'encodage :
+  - entraînement : tout le dataset par morceaux de TOKENIZE_CHUNK_SIZE titres (tokenized_dataset.py)
+  - service : CamembertPredictor.encode par batchs de 1 et 16 titres (requête seule, micro-batch)
+
+Le tokenizer rapide encode un batch sur RAYON_NUM_THREADS threads (tous les coeurs par défaut ici,
+comme à l'entraînement ; l'api le limite à INTRA_OP_THREADS).
+
+Utilisation (depuis /benchmarks) : python bench_camembert_tokenizer.py
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+# Avant l'import de backends.py, qui sinon le fixe à INTRA_OP_THREADS
+os.environ.setdefault("RAYON_NUM_THREADS", str(os.cpu_count() or 1))
+
+from data_preparation import TEXT_COLUMN, TRAINING_DATASET_PATH, preprocess_text
+from load_model import MAX_LEN_CAMEMBERT, CamembertPredictor, load_camembert_tokenizer
+from tokenized_dataset import tokenize
+
+SERVING_BATCH_SIZES = [1, 16]
+REPEATS = 3
+
+
+def best_time(fn):
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def serve(predictor, titles, batch_size):
+    for i in range(0, len(titles), batch_size):
+        predictor.encode(titles[i:i + batch_size])
+
+
+def check_parity(slow, fast, corpora):
+    print("🔍 Parité input_ids / attention_mask")
+    slow_predictor, fast_predictor = CamembertPredictor(None, slow), CamembertPredictor(None, fast)
+    for name, titles in corpora.items():
+        expected, got = tokenize(slow, titles, MAX_LEN_CAMEMBERT), tokenize(fast, titles, MAX_LEN_CAMEMBERT)
+        identical = all(np.array_equal(expected[key], got[key]) for key in expected)
+        for batch_size in SERVING_BATCH_SIZES:
+            for i in range(0, len(titles), batch_size):
+                batch = titles[i:i + batch_size]
+                identical = identical and all(
+                    np.array_equal(a, b) for a, b in zip(slow_predictor.encode(batch), fast_predictor.encode(batch))
+                )
+        print(f"   Titres {name:<11}: {'identiques' if identical else 'DIFFERENTS'} ({len(titles)} titres)")
+        if not identical:
+            return False
+    return True
+
+
+def main():
+    raw_titles = pd.read_csv(TRAINING_DATASET_PATH)[TEXT_COLUMN].fillna('').astype(str).tolist()
+    corpora = {"bruts": raw_titles, "normalisés": [preprocess_text(t) for t in raw_titles]}
+
+    start = time.perf_counter()
+    slow = load_camembert_tokenizer(fast=False)
+    slow_load = time.perf_counter() - start
+    start = time.perf_counter()
+    fast = load_camembert_tokenizer(fast=True)
+    fast_load = time.perf_counter() - start
+
+    if not check_parity(slow, fast, corpora):
+        return False
+
+    print("\n⏱️  Chargement")
+    print(f"   SentencePiece : {slow_load * 1000:.0f} ms")
+    print(f"   Rust          : {fast_load * 1000:.0f} ms")
+
+    titles = corpora["normalisés"]
+    print(f"\n⏱️  Entraînement : {len(titles)} titres paddés à {MAX_LEN_CAMEMBERT} (titres/s)")
+    slow_rate = len(titles) / best_time(lambda: tokenize(slow, titles, MAX_LEN_CAMEMBERT))
+    fast_rate = len(titles) / best_time(lambda: tokenize(fast, titles, MAX_LEN_CAMEMBERT))
+    print(f"   SentencePiece : {slow_rate:>10.0f}")
+    print(f"   Rust          : {fast_rate:>10.0f}  (x{fast_rate / slow_rate:.1f})")
+
+    print("\n⏱️  Service : CamembertPredictor.encode (titres/s)")
+    print(f"   {'batch':>6} | {'SentencePiece':>13} | {'Rust':>10} | gain")
+    slow_predictor, fast_predictor = CamembertPredictor(None, slow), CamembertPredictor(None, fast)
+    for batch_size in SERVING_BATCH_SIZES:
+        slow_rate = len(titles) / best_time(lambda: serve(slow_predictor, titles, batch_size))
+        fast_rate = len(titles) / best_time(lambda: serve(fast_predictor, titles, batch_size))
+        print(f"   {batch_size:>6} | {slow_rate:>13.0f} | {fast_rate:>10.0f} | x{fast_rate / slow_rate:.2f}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
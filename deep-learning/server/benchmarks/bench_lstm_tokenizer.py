@@ -0,0 +1,83 @@
+"""
+Benchmark de l'encodeur LSTM : tokenizer Keras picklé vs vocabulaire json (lstm_tokenizer.py)
+
+- vérifie que les deux encodages sont identiques bit à bit (valeurs, forme et dtype)
+  sur tous les titres de dataset-for-training-completed.csv, bruts et normalisés
+- compare le temps de chargement et le débit d'encodage par taille de batch
+
+Utilisation (depuis /benchmarks) : python bench_lstm_tokenizer.py
+"""
+
+import pickle
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from data_preparation import TEXT_COLUMN, TRAINING_DATASET_PATH, preprocess_text
+from load_model import TOKENIZER_LSTM_PATH
+from lstm_tokenizer import LstmEncoder, MAX_LEN_LSTM, VOCABULARY_LSTM_PATH
+
+BATCH_SIZES = [1, 16, 64, 1024]
+REPEATS = 3
+
+
+def keras_encode(tokenizer, titles):
+    from tensorflow.keras.preprocessing.sequence import pad_sequences
+
+    return pad_sequences(tokenizer.texts_to_sequences(titles), maxlen=MAX_LEN_LSTM, padding='post')
+
+
+def throughput(encode, titles, batch_size):
+    """Titres encodés par seconde (meilleur de REPEATS passages)"""
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        for i in range(0, len(titles), batch_size):
+            encode(titles[i:i + batch_size])
+        best = min(best, time.perf_counter() - start)
+    return len(titles) / best
+
+
+def main():
+    raw_titles = pd.read_csv(TRAINING_DATASET_PATH)[TEXT_COLUMN].fillna('').astype(str).tolist()
+    corpora = {"bruts": raw_titles, "normalisés": [preprocess_text(t) for t in raw_titles]}
+
+    start = time.perf_counter()
+    with open(TOKENIZER_LSTM_PATH, "rb") as f:
+        tokenizer_lstm = pickle.load(f)
+    keras_load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    encoder = LstmEncoder.from_json(VOCABULARY_LSTM_PATH)
+    json_load = time.perf_counter() - start
+
+    print("🔍 Parité bit à bit")
+    for name, titles in corpora.items():
+        expected = keras_encode(tokenizer_lstm, titles)
+        got = encoder.encode(titles)
+        identical = expected.dtype == got.dtype and expected.shape == got.shape and np.array_equal(expected, got)
+        print(f"   Titres {name:<11}: {'identiques' if identical else 'DIFFERENTS'} ({len(titles)} titres)")
+        if not identical:
+            return False
+
+    print("\n⏱️  Chargement (import TensorFlow compris pour le pickle)")
+    print(f"   Tokenizer picklé : {keras_load * 1000:.0f} ms")
+    print(f"   Vocabulaire json : {json_load * 1000:.0f} ms")
+
+    titles = corpora["normalisés"]
+    print("\n⏱️  Débit d'encodage (titres/s)")
+    print(f"   {'batch':>6} | {'Keras':>10} | {'json':>10} | gain")
+    for batch_size in BATCH_SIZES:
+        keras_rate = throughput(lambda batch: keras_encode(tokenizer_lstm, batch), titles, batch_size)
+        json_rate = throughput(encoder.encode, titles, batch_size)
+        print(f"   {batch_size:>6} | {keras_rate:>10.0f} | {json_rate:>10.0f} | x{json_rate / keras_rate:.2f}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
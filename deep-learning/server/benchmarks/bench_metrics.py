@@ -0,0 +1,110 @@
+"""
+Benchmark des metrics par thématique : get_metrics.getMetricsByCategory vs MetricsEngine
+
+- get_metrics : un filtre et des str.contains par statistique, exemples construits avec iterrows,
+  pour une thématique à la fois (la lecture du dataset est exclue de la mesure)
+- MetricsEngine : toutes les thématiques en un passage groupby, statuts classés une fois par ligne
+
+Sur le dataset réel puis sur un agrandissement synthétique (x100 par défaut : mêmes lignes,
+identifiants uniques, budgets bruités). Les deux implémentations sont d'abord comparées sur le
+dataset réel (tous les champs sauf le tirage aléatoire des abandonedExamples).
+
+Utilisation (depuis /benchmarks) : python bench_metrics.py [--scale 100]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+import get_metrics
+from dataset_cache import load_dataset
+from metrics_engine import COL_BUDGET, COL_IDENTIFIANT, COL_THEMATIQUE, METRICS_COLUMNS, MetricsEngine, MetricsSnapshot
+from schemas import PredictionInfo, PredictResponse
+
+
+def legacy_metrics(df, category):
+    """get_metrics.getMetricsByCategory sur un DataFrame déjà chargé (sans ses print)"""
+    prediction_info = PredictionInfo(name=category, confidence=1.0, analyse="")
+    with mock.patch.object(get_metrics, "load_dataset", return_value=df), contextlib.redirect_stdout(io.StringIO()):
+        return get_metrics.getMetricsByCategory(prediction_info, "titre", 100000)
+
+
+def comparable(response):
+    """Réponse validée par le schéma, sans le tirage aléatoire des projets abandonnés"""
+    response = PredictResponse(**response).model_dump()
+    metrics = response["predictedCategory"]["metrics"]
+    if metrics is not None:
+        metrics["statuses"]["abandonedExamples"] = len(metrics["statuses"]["abandonedExamples"])
+    return json.dumps(response, sort_keys=True)
+
+
+def check_parity(df, categories):
+    engine = MetricsEngine()
+    for category in categories + ["Inconnu"]:
+        prediction_info = PredictionInfo(name=category, confidence=1.0, analyse="")
+        expected = comparable(legacy_metrics(df, category))
+        got = comparable(engine.getMetricsByCategory(prediction_info, "titre", 100000))
+        if expected != got:
+            print(f"   {category:<25}: DIFFERENT")
+            return False
+    print(f"   {len(categories) + 1} thématiques : réponses identiques")
+    return True
+
+
+def enlarge(df, scale, seed=0):
+    """Dataset x scale : lignes dupliquées, identifiants uniques, budgets bruités de +/- 10%"""
+    rng = np.random.default_rng(seed)
+    big = pd.concat([df] * scale, ignore_index=True)
+    big[COL_IDENTIFIANT] = np.arange(len(big))
+    big[COL_BUDGET] = (big[COL_BUDGET] * rng.uniform(0.9, 1.1, len(big))).round()
+    return big
+
+
+def bench(df, categories, label):
+    start = time.perf_counter()
+    for category in categories:
+        legacy_metrics(df, category)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    snapshot = MetricsSnapshot(df, "bench")
+    prepared = time.perf_counter() - start
+    start = time.perf_counter()
+    snapshot.addCategories(categories)
+    grouped = time.perf_counter() - start
+
+    print(f"\n⏱️  {label} : {len(df)} lignes, {len(categories)} thématiques")
+    print(f"   get_metrics (une thématique à la fois) : {legacy * 1000:8.0f} ms ({legacy / len(categories) * 1000:.0f} ms/thématique)")
+    print(f"   MetricsEngine : préparation des lignes   {prepared * 1000:8.0f} ms")
+    print(f"                   groupby toutes thématiques {grouped * 1000:6.0f} ms")
+    print(f"   gain sur le calcul des metrics : x{legacy / grouped:.1f} (x{legacy / (prepared + grouped):.1f} préparation comprise)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des metrics par thématique")
+    parser.add_argument("--scale", type=int, default=100, help="facteur d'agrandissement du dataset synthétique")
+    args = parser.parse_args()
+
+    df = load_dataset([COL_IDENTIFIANT] + METRICS_COLUMNS)
+    categories = list(df[COL_THEMATIQUE].dropna().unique())
+
+    print("🔍 Parité avec get_metrics.getMetricsByCategory")
+    if not check_parity(df, categories):
+        return False
+    bench(df, categories, "Dataset réel")
+    bench(enlarge(df, args.scale), categories, f"Dataset synthétique x{args.scale}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,122 @@
+"""
+Résultats de benchmark en JSON et comparaison à une baseline
+
+Chaque run (bench_api.py, bench_stages.py) écrit un fichier :
+    {"kind", "environment", "config", "results": {scénario: {métrique: valeur}}}
+environment : commit git, date, machine, Python et variables de configuration du serveur.
+
+Deux runs ne sont comparés que s'ils mesurent la même charge : même type et mêmes paramètres
+WORKLOAD_CONFIG (application, modèle, route unitaire ou /batch, taille de batch, cache) ; sinon
+la comparaison échoue. Elle associe les scénarios et métriques présents dans les deux fichiers. Le sens de
+chaque métrique est donné par son nom (débit : plus haut = mieux ; latences, CPU, RSS : plus bas =
+mieux) ; un écart défavorable au-delà de la tolérance est une régression.
+
+Utilisation (depuis /benchmarks) : python bench_results.py baseline.json run.json [--tolerance 0.1]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).parent / "results"
+DEFAULT_TOLERANCE = 0.10
+# Variables qui changent les performances du serveur : gardées avec chaque run
+CONFIG_ENV_PREFIXES = (
+    "INFERENCE_", "INTRA_OP_", "INTER_OP_", "ONNX_", "CAMEMBERT_", "LSTM_", "PREDICTION_CACHE_",
+    "SERVED_MODELS", "DEFAULT_MODEL", "CASCADE_", "TF_ENABLE_ONEDNN_OPTS", "RAYON_NUM_THREADS"
+)
+# Métriques dont une valeur plus élevée est meilleure (toutes les autres : plus basse = mieux)
+HIGHER_IS_BETTER = ("throughput_rps", "success_rate", "titles_per_second")
+# Paramètres qui changent la charge mesurée : deux runs qui en diffèrent ne sont pas comparables
+WORKLOAD_CONFIG = ("app", "model", "batch", "batch_size", "no_prediction_cache")
+# Métriques descriptives, jamais comparées
+NOT_COMPARED = ("requests", "errors", "duration_s", "samples", "target_rps", "concurrency")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent,
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "env": {k: v for k, v in sorted(os.environ.items()) if k.startswith(CONFIG_ENV_PREFIXES)}
+    }
+
+
+def save_results(kind, config, results, output=None):
+    """Écrit le run dans output (par défaut results/<kind>-<date>.json) et retourne son chemin"""
+    output = Path(output) if output else RESULTS_DIR / f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"kind": kind, "environment": environment(), "config": config, "results": results}, f, indent=2)
+    print(f"✅ Résultats sauvegardés : {output}")
+    return output
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_results(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """Affiche les écarts run / baseline ; False si une métrique régresse au-delà de la tolérance"""
+    if baseline["kind"] != current["kind"]:
+        print(f"❌ Runs de types différents, non comparables : {baseline['kind']} / {current['kind']}")
+        return False
+    baseline_config, current_config = baseline.get("config", {}), current.get("config", {})
+    differences = [
+        f"{key} {baseline_config.get(key)!r} -> {current_config.get(key)!r}"
+        for key in WORKLOAD_CONFIG if baseline_config.get(key) != current_config.get(key)
+    ]
+    if differences:
+        print(f"❌ Charges différentes, runs non comparables : {', '.join(differences)}")
+        return False
+    print(f"🔍 Comparaison à la baseline {baseline['environment'].get('commit')} ({baseline['environment']['timestamp']})")
+    regressions = []
+    for scenario, metrics in current["results"].items():
+        reference = baseline["results"].get(scenario)
+        if reference is None:
+            print(f"   {scenario} : absent de la baseline")
+            continue
+        print(f"   {scenario}")
+        for name, value in metrics.items():
+            base = reference.get(name)
+            if name in NOT_COMPARED or not isinstance(value, (int, float)) or not isinstance(base, (int, float)) or base == 0:
+                continue
+            change = (value - base) / abs(base)
+            worse = -change if name in HIGHER_IS_BETTER else change
+            flag = "⚠️ " if worse > tolerance else "  "
+            if worse > tolerance:
+                regressions.append(f"{scenario}.{name}")
+            print(f"   {flag} {name:<22} {base:>12.2f} -> {value:>12.2f} ({change:+.1%})")
+    if regressions:
+        print(f"⚠️  {len(regressions)} régression(s) au-delà de {tolerance:.0%} : {', '.join(regressions)}")
+    else:
+        print(f"✅ Aucune régression au-delà de {tolerance:.0%}")
+    return not regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare un run de benchmark à une baseline")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="écart relatif toléré (0.1 = 10%%)")
+    args = parser.parse_args()
+    sys.exit(0 if compare_results(load_results(args.baseline), load_results(args.current), args.tolerance) else 1)
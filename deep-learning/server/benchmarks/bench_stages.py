@@ -0,0 +1,144 @@
+"""
+Micro-benchmarks des étapes d'une requête POST /predict-category, dans le processus courant
+
+Pour chaque titre (mêmes tirages que bench_api.py), le temps de chaque étape du chemin de l'api :
+- normalize : preprocess_text (clé du cache de prédictions)
+- tokenize  : encodage du modèle (LstmEncoder, tokenizer CamemBERT + bucket, TfidfEncoder)
+- predict   : forward pass du backend (INFERENCE_BACKEND) + decode_predictions
+- metrics   : MetricsEngine.getMetricsByCategory
+- serialize : validation PredictResponse + JSON, comme la réponse FastAPI
+
+Par étape : moyenne et p50/p95/p99 en ms, et titres/s. Résultats en JSON comparables à une
+baseline (bench_results.py).
+
+Utilisation (depuis /benchmarks) :
+    python bench_stages.py --model lstm [--batch-size 1] [--samples 500] [--baseline results/stages.json]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from bench_api import sample_workload
+from bench_results import DEFAULT_TOLERANCE, compare_results, load_results, save_results
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+
+from data_preparation import preprocess_text
+from schemas import PredictResponse
+
+MODEL_LABELS = {"lstm": "LSTM", "camembert": "CamemBERT", "tfidf": "TF-IDF"}
+STAGES = ("normalize", "tokenize", "predict", "metrics", "serialize")
+WARMUP_BATCHES = 5
+
+
+def load_predictor(model_name):
+    from load_model import load_camembert_predictor, load_lstm_predictor, load_tfidf_predictor
+
+    loaders = {"lstm": load_lstm_predictor, "camembert": load_camembert_predictor, "tfidf": load_tfidf_predictor}
+    return loaders[model_name]()
+
+
+def backend_inputs(encoded):
+    """Sortie de predictor.encode -> entrées de backend.run (LSTM : une matrice, CamemBERT : un tuple)"""
+    return list(encoded) if isinstance(encoded, tuple) else [encoded]
+
+
+def run_stages(predictor, label_mapping, model_label, metrics_engine, batches):
+    """Durées (s) de chaque étape, par batch de titres"""
+    from load_model import decode_predictions
+
+    timings = {stage: [] for stage in STAGES}
+    for titles, budgets in batches:
+        start = time.perf_counter()
+        normalized = [preprocess_text(title) for title in titles]
+        timings["normalize"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        inputs = backend_inputs(predictor.encode(normalized))
+        timings["tokenize"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        prediction_infos = decode_predictions(predictor.backend.run(inputs), label_mapping, model_label)
+        timings["predict"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        responses = [
+            metrics_engine.getMetricsByCategory(info, title, budget)
+            for info, title, budget in zip(prediction_infos, titles, budgets)
+        ]
+        timings["metrics"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for response in responses:
+            PredictResponse(**response).model_dump_json()
+        timings["serialize"].append(time.perf_counter() - start)
+    return timings
+
+
+def summarize(durations, batch_size):
+    ms = np.array(durations) * 1000
+    return {
+        "samples": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "titles_per_second": batch_size * len(ms) / (ms.sum() / 1000)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks des étapes de prédiction")
+    parser.add_argument("--model", choices=sorted(MODEL_LABELS), default="lstm")
+    parser.add_argument("--batch-size", type=int, default=1, help="titres par batch (1 = route unitaire)")
+    parser.add_argument("--samples", type=int, default=500, help="titres mesurés")
+    parser.add_argument("--output", help="fichier JSON du run (défaut : results/stages-<date>.json)")
+    parser.add_argument("--baseline", help="run JSON de référence à comparer")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    from metrics_engine import MetricsEngine
+
+    workload = sample_workload(args.samples)
+    batches = [
+        ([title for title, _ in workload[i:i + args.batch_size]], [budget for _, budget in workload[i:i + args.batch_size]])
+        for i in range(0, len(workload), args.batch_size)
+    ]
+
+    print(f"🔄 Chargement du modèle {args.model} et des metrics...")
+    start = time.perf_counter()
+    predictor, label_mapping = load_predictor(args.model)
+    load_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    metrics_engine = MetricsEngine()
+    metrics_seconds = time.perf_counter() - start
+
+    # Chauffe : traçage des graphes TF, sessions ONNX, caches pandas
+    run_stages(predictor, label_mapping, MODEL_LABELS[args.model], metrics_engine, batches[:WARMUP_BATCHES])
+    timings = run_stages(predictor, label_mapping, MODEL_LABELS[args.model], metrics_engine, batches)
+
+    results = {stage: summarize(timings[stage], args.batch_size) for stage in STAGES}
+    total = np.sum([timings[stage] for stage in STAGES], axis=0)
+    results["total"] = summarize(total, args.batch_size)
+    results["startup"] = {"model_load_s": load_seconds, "metrics_load_s": metrics_seconds}
+
+    print(f"\n⏱️  Etapes par batch de {args.batch_size} titre(s), {len(batches)} batchs (ms)")
+    print(f"   {'étape':<10} | {'moyenne':>8} | {'p50':>8} | {'p95':>8} | {'p99':>8} | titres/s")
+    for stage in (*STAGES, "total"):
+        r = results[stage]
+        print(f"   {stage:<10} | {r['mean_ms']:>8.2f} | {r['p50_ms']:>8.2f} | {r['p95_ms']:>8.2f} | {r['p99_ms']:>8.2f} | {r['titles_per_second']:>8.0f}")
+    print(f"   Chargement : modèle {load_seconds:.1f} s | metrics {metrics_seconds:.1f} s")
+
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "tolerance")}
+    save_results("stages", config, results, args.output)
+    if args.baseline:
+        return compare_results(load_results(args.baseline), {"kind": "stages", "config": config, "results": results}, args.tolerance)
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -1,12 +1,15 @@
-import pandas as pd
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent / "app"))
+from dataset_cache import load_dataset
+
 # Chemins des fichiers
-input_file = Path(__file__).parent / "data" / "initial-budget-participatif.csv"
-output_file = Path(__file__).parent / "data" / "dataset-for-training-completed.csv"
+input_file = Path(__file__).parent.parent / "data" / "initial-budget-participatif.csv"
+output_file = Path(__file__).parent.parent / "data" / "dataset-for-training-completed.csv"
 
-# Lire le fichier CSV d'origine avec le bon délimiteur (point-virgule)
-df = pd.read_csv(input_file, delimiter=';', encoding='utf-8')
+# Lire uniquement les colonnes utiles depuis le cache colonnaire du CSV d'origine
+df = load_dataset(["Titre du projet lauréat", "Titre de l'opération", "Thématique"], input_file)
 
 # Créer une nouvelle colonne en concaténant "Titre du projet lauréat" et "Titre de l'opération"
 # Remplir les NaN avec des chaînes vides avant la concaténation
@@ -0,0 +1,328 @@
+"""
+Sélection de modèle no-show : Random Forest et Gradient Boosting, en script
+
+Remplace les GridSearchCV interactifs de attempt_random_forest.ipynb et attempt_gradient_boost.ipynb :
+- nettoyage commun aux deux notebooks (rename, âges négatifs et RDV aberrants supprimés, dates
+  remises à 00h00, DaysUntilAppointement, nb_pathologies, SMS_received retirée), puis split
+  train/test stratifié (identique pour les deux familles)
+- features propres à chaque famille, comme dans son notebook :
+  - Random Forest : liste fixe de attempt_random_forest.ipynb
+  - Gradient Boosting : attempt_gradient_boost.ipynb retire Diabetes, Hypertension et Alcoholism
+    (déjà comptées dans nb_pathologies) et les features de |corrélation| < 0.02 avec No-show, puis
+    classe catégorielles (texte ou <= 10 valeurs) et numériques. Écart au notebook : la
+    corrélation est calculée sur le train seul (le notebook inclut le test set)
+- encodage (OrdinalEncoder + StandardScaler) de chaque famille mis en cache disque (joblib.Memory,
+  CACHE_DIR) : un run suivant sur le même no-show.csv ne refait ni la lecture ni l'encodage
+- recherche par successive halving (HalvingGridSearchCV) sur les grilles des notebooks : tous les
+  candidats sont évalués sur un petit échantillon, seul le meilleur tiers passe à l'itération
+  suivante avec 3 fois plus de lignes. Les fits sont répartis sur tous les cœurs (n_jobs=-1) ;
+  le Gradient Boosting s'arrête de lui-même quand son score de validation ne progresse plus
+  (n_iter_no_change)
+- chaque candidat de chaque itération est affiché et écrit dans model/model_selection_candidates.csv
+  (lignes, paramètres, score CV, temps de fit)
+- métrique : f1 par défaut pour les deux familles (celle du notebook Gradient Boosting). Avec ~20%
+  de RDV manqués, l'accuracy du notebook Random Forest favorise un modèle qui prédit toujours
+  "honoré" (accuracy ~0.8, f1 nul) : elle reste disponible par --scoring accuracy
+- le vainqueur (meilleur score CV sur cette métrique, toutes familles confondues) est exporté avec son preprocessing
+  en un seul Pipeline scikit-learn : model/no_show_model.joblib, et ses métadonnées (features,
+  paramètres, scores test) dans model/no_show_model.json
+
+Utilisation : python model_selection.py [--data no-show.csv] [--scoring f1] [--models rf gb]
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (active HalvingGridSearchCV)
+from sklearn.metrics import accuracy_score, balanced_accuracy_score, f1_score, precision_score, recall_score
+from sklearn.model_selection import HalvingGridSearchCV, ParameterGrid, StratifiedKFold, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OrdinalEncoder, StandardScaler
+
+BASE_DIR = Path(__file__).parent
+DATA_PATH = Path(os.environ.get("NO_SHOW_DATA", BASE_DIR / "no-show.csv"))
+CACHE_DIR = Path(os.environ.get("MODEL_SELECTION_CACHE", BASE_DIR / ".cache"))
+MODEL_DIR = Path(os.environ.get("MODEL_SELECTION_OUTPUT", BASE_DIR / "model"))
+MODEL_FILENAME = "no_show_model.joblib"
+METADATA_FILENAME = "no_show_model.json"
+CANDIDATES_FILENAME = "model_selection_candidates.csv"
+
+RANDOM_STATE = 42
+TEST_SIZE = 0.2
+CV_SPLITS = 5
+# Facteur du successive halving : 1/FACTOR des candidats survivent, avec FACTOR fois plus de lignes
+HALVING_FACTOR = 3
+
+SCORING = "f1"
+
+# Colonnes produites par prepare_dataframe ; chaque famille en utilise tout ou partie
+CATEGORICAL_FEATURES = ['Neighbourhood', 'Gender', 'Scholarship', 'Hypertension', 'Diabetes', 'Alcoholism', 'Handicap', 'nb_pathologies']
+NUMERICAL_FEATURES = ['Age', 'DaysUntilAppointement']
+FEATURES = CATEGORICAL_FEATURES + NUMERICAL_FEATURES
+LABEL = 'No-show'
+
+# Sélection de features du notebook Gradient Boosting
+REDUNDANT_FEATURES = ['Diabetes', 'Hypertension', 'Alcoholism']  # déjà comptées dans nb_pathologies
+MIN_ABS_CORRELATION = 0.02
+MAX_CATEGORICAL_VALUES = 10
+
+
+def random_forest_features(train_df):
+    """Features fixes de attempt_random_forest.ipynb : (catégorielles, numériques)"""
+    return CATEGORICAL_FEATURES, NUMERICAL_FEATURES
+
+
+def gradient_boost_features(train_df):
+    """
+    Sélection de attempt_gradient_boost.ipynb : sans les pathologies redondantes ni les features de
+    |corrélation| < MIN_ABS_CORRELATION avec le label, Neighbourhood en codes alphabétiques (LabelEncoder)
+    et Gender en 0/1 pour le calcul. Catégorielles : texte ou au plus MAX_CATEGORICAL_VALUES valeurs.
+    """
+    encoded = train_df.copy()
+    encoded['Neighbourhood'] = encoded['Neighbourhood'].astype('category').cat.codes
+    encoded['Gender'] = (encoded['Gender'] == 'M').astype(int)
+    correlations = encoded.corr()[LABEL]
+    kept = [
+        feature for feature in FEATURES
+        if feature not in REDUNDANT_FEATURES and abs(correlations[feature]) >= MIN_ABS_CORRELATION
+    ]
+    # Neighbourhood (texte) reste catégorielle : ses codes ordinaux sont ceux du LabelEncoder du
+    # notebook, et la standardisation qu'il leur applique ne change rien aux arbres
+    categorical = [
+        feature for feature in kept
+        if train_df[feature].dtype == object or train_df[feature].nunique() <= MAX_CATEGORICAL_VALUES
+    ]
+    return categorical, [feature for feature in kept if feature not in categorical]
+
+
+# Grilles et features des notebooks
+MODELS = {
+    "rf": (
+        "RandomForestClassifier",
+        random_forest_features,
+        RandomForestClassifier(random_state=RANDOM_STATE, n_jobs=1),
+        {
+            'n_estimators': [50, 100, 200],
+            'max_depth': [None, 10, 20, 30],
+            'min_samples_split': [2, 5],
+            'min_samples_leaf': [1, 2, 4]
+        }
+    ),
+    "gb": (
+        "GradientBoostingClassifier",
+        gradient_boost_features,
+        # n_estimators devient un maximum : arrêt après 10 arbres sans gain sur 10% de validation
+        GradientBoostingClassifier(random_state=RANDOM_STATE, n_iter_no_change=10, validation_fraction=0.1),
+        {
+            'n_estimators': [200, 300],
+            'learning_rate': [0.05, 0.1],
+            'max_depth': [5, 7],
+            'min_samples_split': [10, 20],
+            'min_samples_leaf': [5],
+            'subsample': [0.8]
+        }
+    )
+}
+
+memory = joblib.Memory(CACHE_DIR, verbose=0)
+
+
+def prepare_dataframe(df):
+    """Nettoyage et features des notebooks : DataFrame brut de no-show.csv -> FEATURES + LABEL (0/1)"""
+    # rename car y a des titres mal orthographiés
+    df = df.rename(columns={'Handcap': 'Handicap', 'Hipertension': 'Hypertension'})
+    df = df[['No-show', 'Scholarship', 'Gender', 'Age', 'Hypertension', 'Diabetes', 'Alcoholism',
+             'Handicap', 'ScheduledDay', 'AppointmentDay', 'Neighbourhood']].copy()
+    # Âges négatifs aberrants
+    df = df[df['Age'] >= 0]
+
+    # Les heures de AppointmentDay sont à 00h00, pas celles de ScheduledDay : on remet les deux à niveau
+    df['ScheduledDay'] = pd.to_datetime(df['ScheduledDay']).dt.normalize()
+    df['AppointmentDay'] = pd.to_datetime(df['AppointmentDay']).dt.normalize()
+    df = df[df['AppointmentDay'] >= df['ScheduledDay']]
+
+    df['DaysUntilAppointement'] = np.ceil(
+        (df['AppointmentDay'] - df['ScheduledDay']).dt.total_seconds() / (24 * 3600)
+    ).astype(int)
+    df['nb_pathologies'] = df['Hypertension'] + df['Diabetes'] + df['Alcoholism']
+    df[LABEL] = (df[LABEL] == 'Yes').astype(int)
+    return df[FEATURES + [LABEL]]
+
+
+def build_preprocessor(categorical_features, numerical_features):
+    return ColumnTransformer(transformers=[
+        ('cat', OrdinalEncoder(handle_unknown='use_encoded_value', unknown_value=-1), categorical_features),
+        ('num', StandardScaler(), numerical_features)
+    ])
+
+
+@memory.cache
+def encoded_dataset(data_path, data_signature, model_key, test_size=TEST_SIZE, random_state=RANDOM_STATE):
+    """
+    Split train/test, features de la famille model_key et matrices encodées, mis en cache par joblib.Memory.
+    data_signature (taille, date de modification) invalide le cache quand le csv change ; joblib
+    l'invalide aussi quand le code de cette fonction change (pas celui de prepare_dataframe ni des
+    sélections de features : vider CACHE_DIR après les avoir modifiées)
+    """
+    df = prepare_dataframe(pd.read_csv(data_path))
+    # Même split pour toutes les familles : mêmes lignes, même random_state
+    train_df, test_df = train_test_split(df, test_size=test_size, random_state=random_state, stratify=df[LABEL])
+    categorical_features, numerical_features = MODELS[model_key][1](train_df)
+    features = categorical_features + numerical_features
+    # Preprocessing ajusté sur le train seul, une fois pour tous les candidats (comme le notebook
+    # Random Forest) : les arbres sont insensibles à la standardisation, seul l'OrdinalEncoder voit
+    # les quartiers de tous les folds
+    preprocessor = build_preprocessor(categorical_features, numerical_features)
+    return {
+        "preprocessor": preprocessor,
+        "categorical_features": categorical_features,
+        "numerical_features": numerical_features,
+        "X_train": preprocessor.fit_transform(train_df[features]),
+        "X_test": preprocessor.transform(test_df[features]),
+        "y_train": train_df[LABEL].to_numpy(),
+        "y_test": test_df[LABEL].to_numpy()
+    }
+
+
+def load_dataset(data_path, model_key):
+    data_path = Path(data_path).resolve()
+    stat = data_path.stat()
+    start = time.perf_counter()
+    cached = encoded_dataset.check_call_in_cache(str(data_path), (stat.st_size, stat.st_mtime_ns), model_key)
+    dataset = encoded_dataset(str(data_path), (stat.st_size, stat.st_mtime_ns), model_key)
+    source = "cache" if cached else "csv"
+    print(f"✅ Données {MODELS[model_key][0]} chargées depuis le {source} en {time.perf_counter() - start:.2f} s "
+          f"(train : {len(dataset['y_train'])}, test : {len(dataset['y_test'])})")
+    print(f"   features catégorielles : {dataset['categorical_features']} | numériques : {dataset['numerical_features']}")
+    return dataset
+
+
+def test_scores(y_true, y_pred):
+    return {
+        "accuracy": accuracy_score(y_true, y_pred),
+        "balanced_accuracy": balanced_accuracy_score(y_true, y_pred),
+        "precision": precision_score(y_true, y_pred, zero_division=0),
+        "recall": recall_score(y_true, y_pred),
+        "f1": f1_score(y_true, y_pred)
+    }
+
+
+def candidate_rows(model_name, search):
+    """Une ligne par candidat et par itération du successive halving"""
+    results = search.cv_results_
+    return [
+        {
+            "model": model_name,
+            "iteration": int(results["iter"][i]),
+            "n_samples": int(results["n_resources"][i]),
+            "params": json.dumps(results["params"][i], sort_keys=True),
+            "cv_score": float(results["mean_test_score"][i]),
+            "cv_score_std": float(results["std_test_score"][i]),
+            "fit_seconds": float(results["mean_fit_time"][i]),
+            "score_seconds": float(results["mean_score_time"][i])
+        }
+        for i in np.lexsort((-results["mean_test_score"], results["iter"]))
+    ]
+
+
+def run_search(model_name, estimator, param_grid, dataset, scoring, n_jobs):
+    search = HalvingGridSearchCV(
+        estimator=estimator,
+        param_grid=param_grid,
+        factor=HALVING_FACTOR,
+        cv=StratifiedKFold(n_splits=CV_SPLITS, shuffle=True, random_state=RANDOM_STATE),
+        scoring=scoring,
+        n_jobs=n_jobs,
+        random_state=RANDOM_STATE
+    )
+    print(f"\n🔄 {model_name} : {len(ParameterGrid(param_grid))} candidats, "
+          f"successive halving (facteur {HALVING_FACTOR}, {CV_SPLITS} folds, scoring {scoring})")
+    start = time.perf_counter()
+    search.fit(dataset["X_train"], dataset["y_train"])
+    elapsed = time.perf_counter() - start
+
+    rows = candidate_rows(model_name, search)
+    print(f"   {'iter':>4} | {'lignes':>7} | {scoring:>9} | {'fit (s)':>7} | paramètres")
+    for row in rows:
+        print(f"   {row['iteration']:>4} | {row['n_samples']:>7} | {row['cv_score']:>9.4f} | "
+              f"{row['fit_seconds']:>7.2f} | {row['params']}")
+
+    scores = test_scores(dataset["y_test"], search.best_estimator_.predict(dataset["X_test"]))
+    print(f"⏱️  {model_name} : {elapsed:.1f} s, {len(rows)} fits de candidats sur {search.n_iterations_} itérations")
+    print(f"✅ Meilleur {model_name} : {scoring} CV {search.best_score_:.4f} | accuracy test {scores['accuracy']:.4f} "
+          f"| f1 test {scores['f1']:.4f} | {search.best_params_}")
+    return search, rows, scores, elapsed
+
+
+def export_winner(winner, scoring, output_dir):
+    """Pipeline preprocessing + classifier déjà ajustés : attend les colonnes de prepare_dataframe"""
+    model_name, search, scores, elapsed, dataset = winner
+    output_dir.mkdir(parents=True, exist_ok=True)
+    pipeline = Pipeline(steps=[
+        ('preprocessor', dataset["preprocessor"]),
+        ('classifier', search.best_estimator_)
+    ])
+    joblib.dump(pipeline, output_dir / MODEL_FILENAME, compress=3)
+
+    metadata = {
+        "model": model_name,
+        "params": search.best_params_,
+        "scoring": scoring,
+        "cv_score": search.best_score_,
+        "test_scores": scores,
+        "search_seconds": elapsed,
+        "features": dataset["categorical_features"] + dataset["numerical_features"],
+        "categorical_features": dataset["categorical_features"],
+        "numerical_features": dataset["numerical_features"],
+        "labels": {"0": "RDV honoré", "1": "RDV manqué"},
+        "sklearn_version": sklearn.__version__,
+        "trained_at": datetime.now().isoformat(timespec="seconds")
+    }
+    with open(output_dir / METADATA_FILENAME, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2, default=str)
+    size_kb = (output_dir / MODEL_FILENAME).stat().st_size / 1024
+    print(f"✅ Modèle exporté : {output_dir / MODEL_FILENAME} ({size_kb:.0f} Ko) + {METADATA_FILENAME}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sélection de modèle no-show par successive halving")
+    parser.add_argument("--data", default=str(DATA_PATH), help="csv Kaggle no-show (défaut : no-show.csv)")
+    parser.add_argument("--models", nargs="+", choices=sorted(MODELS), default=sorted(MODELS, reverse=True))
+    parser.add_argument("--scoring", default=SCORING,
+                        help="métrique scikit-learn de la recherche et du choix du vainqueur (f1, balanced_accuracy, roc_auc, accuracy...)")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="processus de la recherche (-1 : tous les cœurs)")
+    parser.add_argument("--output-dir", default=str(MODEL_DIR))
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir)
+
+    searches, all_rows = [], []
+    for key in args.models:
+        model_name, _, estimator, param_grid = MODELS[key]
+        dataset = load_dataset(args.data, key)
+        search, rows, scores, elapsed = run_search(model_name, estimator, param_grid, dataset, args.scoring, args.n_jobs)
+        searches.append((model_name, search, scores, elapsed, dataset))
+        all_rows.extend(rows)
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(all_rows).to_csv(output_dir / CANDIDATES_FILENAME, index=False)
+    print(f"\n✅ {len(all_rows)} candidats journalisés dans {output_dir / CANDIDATES_FILENAME}")
+
+    # Vainqueur sur le score CV de la métrique de recherche : le test set ne sert qu'au rapport
+    winner = max(searches, key=lambda item: item[1].best_score_)
+    print(f"🔍 Vainqueur : {winner[0]} ({args.scoring} CV {winner[1].best_score_:.4f})")
+    export_winner(winner, args.scoring, output_dir)
+
+
+if __name__ == "__main__":
+    main()